@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from thuis_analyse_utils import bereken_relatie_duur, langste_relaties, top_k
+
+# (seizoen, persoon_nr1, persoon_nr2), met dubbels, omgekeerde paren en een relatie van een personage met zichzelf
+RELATIE_ARR = np.array([
+    (1, 0, 1), (2, 0, 1), (2, 1, 0), (3, 0, 1), (5, 0, 1), (6, 1, 0),       # 0-1: 1-3 en 5-6
+    (4, 3, 2),                                                              # 2-3: enkel seizoen 4
+    (7, 2, 1), (9, 1, 2), (10, 2, 1), (11, 1, 2), (12, 1, 2), (12, 2, 1),   # 1-2: 7 en 9-12
+    (3, 4, 4),
+], dtype=np.uint8)
+
+def test_relatie_duur():
+    duur = bereken_relatie_duur(RELATIE_ARR)
+    assert duur.persoon_nr1.tolist() == [0, 1, 2]
+    assert duur.persoon_nr2.tolist() == [1, 2, 3]
+    assert duur.totaal.tolist() == [5, 5, 1]
+    assert duur.langste_reeks.tolist() == [3, 4, 1]
+    assert duur.eerste.tolist() == [1, 7, 4]
+    assert duur.laatste.tolist() == [6, 12, 4]
+
+@pytest.mark.parametrize('relatie_arr', [np.empty((0, 3), dtype=np.uint8), np.array([(1, 2, 2), (3, 0, 0)])])
+def test_relatie_duur_zonder_relaties(relatie_arr):
+    duur = bereken_relatie_duur(relatie_arr)
+    assert all(len(kolom) == 0 for kolom in duur)
+    assert langste_relaties(relatie_arr) == []
+
+def test_langste_relaties():
+    assert langste_relaties(RELATIE_ARR, k=2, consecutief=True) == [(1, 2, 4), (0, 1, 3)]
+    assert sorted(langste_relaties(RELATIE_ARR, k=2)) == [(0, 1, 5), (1, 2, 5)]
+    assert len(langste_relaties(RELATIE_ARR, k=10)) == 3
+
+def test_top_k():
+    waarden = np.array([3, 9, 1, 7, 5])
+    assert top_k(waarden, 3).tolist() == [1, 3, 4]
+    assert top_k(waarden, 0).tolist() == []
@@ -0,0 +1,59 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from thuis_graaf_utils import (maak_csr, naar_dense, lijst_driehoeken, tel_driehoeken, tel_driehoeken_matrix, tel_driehoeken_per_seizoen,
+                               driehoeken_per_personage, tel_vierhoeken)
+
+AANTAL_PERSONAGES = 14
+
+def _relatie_arr(seed:int, aantal_relaties:int) -> np.ndarray:
+    """Willekeurige relaties over 5 seizoenen, met dubbels en relaties van een personage met zichzelf"""
+    rng = np.random.default_rng(seed)
+    return np.column_stack((rng.integers(1, 6, aantal_relaties),
+                            rng.integers(0, AANTAL_PERSONAGES, aantal_relaties),
+                            rng.integers(0, AANTAL_PERSONAGES, aantal_relaties)))
+
+def _adjacency(csr) -> np.ndarray:
+    return (naar_dense(csr) > 0).astype(np.int64)
+
+def _vierhoeken(adjacency:np.ndarray) -> int:
+    #per 4 personages zijn er 3 mogelijke cycli: a-b-c-d, a-b-d-c en a-c-b-d
+    aantal = 0
+    for a, b, c, d in combinations(range(len(adjacency)), 4):
+        for p, q, r, s in ((a, b, c, d), (a, b, d, c), (a, c, b, d)):
+            aantal += adjacency[p, q] * adjacency[q, r] * adjacency[r, s] * adjacency[s, p]
+    return int(aantal)
+
+@pytest.mark.parametrize('seed, aantal_relaties', [(0, 0), (1, 10), (2, 40), (3, 80), (4, 300)])
+def test_driehoeken_zoals_matrixmethode(seed, aantal_relaties):
+    csr = maak_csr(_relatie_arr(seed, aantal_relaties), AANTAL_PERSONAGES)
+    adjacency = _adjacency(csr)
+    derde_macht = adjacency @ adjacency @ adjacency
+    assert tel_driehoeken(csr) == np.trace(derde_macht) // 6 == tel_driehoeken_matrix(csr)
+    assert np.array_equal(driehoeken_per_personage(csr), np.diag(derde_macht) // 2)
+    verwacht = [driehoek for driehoek in combinations(range(AANTAL_PERSONAGES), 3)
+                if adjacency[driehoek[0], driehoek[1]] and adjacency[driehoek[1], driehoek[2]] and adjacency[driehoek[0], driehoek[2]]]
+    assert lijst_driehoeken(csr).tolist() == [list(driehoek) for driehoek in verwacht]
+
+@pytest.mark.parametrize('seed, aantal_relaties', [(0, 0), (1, 10), (2, 40), (3, 80), (4, 300)])
+def test_vierhoeken_zoals_brute_force(seed, aantal_relaties):
+    csr = maak_csr(_relatie_arr(seed, aantal_relaties), AANTAL_PERSONAGES)
+    assert tel_vierhoeken(csr) == _vierhoeken(_adjacency(csr))
+
+def test_volledige_graaf():
+    #in een volledige graaf met n personages: C(n, 3) driehoeken en 3 * C(n, 4) vierhoeken
+    n = 7
+    relatie_arr = np.array([(1, p1, p2) for p1, p2 in combinations(range(n), 2)])
+    csr = maak_csr(relatie_arr)
+    assert tel_driehoeken(csr) == 35
+    assert tel_vierhoeken(csr) == 3 * 35
+    assert driehoeken_per_personage(csr).tolist() == [15] * n
+
+def test_driehoeken_per_seizoen():
+    relatie_arr = _relatie_arr(5, 200)
+    per_seizoen = tel_driehoeken_per_seizoen(relatie_arr, AANTAL_PERSONAGES)
+    assert sorted(per_seizoen) == [1, 2, 3, 4, 5]
+    for seizoen, aantal in per_seizoen.items():
+        assert aantal == tel_driehoeken_matrix(maak_csr(relatie_arr, AANTAL_PERSONAGES, seizoen, seizoen))
@@ -0,0 +1,63 @@
+import os
+import sqlite3
+from csv import DictWriter
+
+import pytest
+
+import thuis_http_utils
+from thuis_http_utils import (CACHE_DIR_NAME, INDEX_DB_NAME, INDEX_FILE_HEADERS, INDEX_FILE_NAME, INDEX_MIGRATIE_SUFFIX,
+                              get_fileinfo, get_url)
+
+# Een index.csv zoals de vorige versies ze schreven, met bestanden in de oude layout (ruwe HTML)
+RECORDS = [
+    {'url': 'https://thuis.test/nl/wiki/Frank', 'bestandsnaam': 'Frank.html',
+     'laatste_wijziging': 'Mon, 01 Jan 2024 00:00:00 GMT', 'redirect_url': 'https://thuis.test/nl/wiki/Frank'},
+    {'url': 'https://thuis.test/nl/wiki/Franky', 'bestandsnaam': 'Kaat.html',
+     'laatste_wijziging': 'Tue, 02 Jan 2024 00:00:00 GMT', 'redirect_url': 'https://thuis.test/nl/wiki/Kaat'},
+]
+
+@pytest.fixture
+def cachedir(tmp_path, monkeypatch):
+    cachedir = os.path.join(tmp_path, CACHE_DIR_NAME)
+    os.mkdir(cachedir)
+    with open(os.path.join(cachedir, INDEX_FILE_NAME), mode='w', newline='', encoding='utf-8') as f:
+        writer = DictWriter(f, delimiter=';', fieldnames=INDEX_FILE_HEADERS)
+        writer.writeheader()
+        writer.writerows(RECORDS)
+    for record in RECORDS:
+        with open(os.path.join(cachedir, record['bestandsnaam']), mode='w', encoding='utf-8') as f:
+            f.write(f"<html>{record['bestandsnaam']}</html>")
+    monkeypatch.setattr(thuis_http_utils, 'CACHE_DIR_PATH', cachedir)
+    yield cachedir
+    _sluit_index()
+
+def _sluit_index():
+    #de volgende _init opent de index opnieuw
+    if thuis_http_utils._index_conn is not None:
+        thuis_http_utils._index_conn.close()
+    thuis_http_utils._index_conn = None
+    thuis_http_utils._index_pad = None
+
+def test_migreer_index_csv(cachedir):
+    assert thuis_http_utils._init() == os.path.join(cachedir, INDEX_DB_NAME)
+    assert not os.path.exists(os.path.join(cachedir, INDEX_FILE_NAME))
+    assert os.path.isfile(os.path.join(cachedir, INDEX_FILE_NAME + INDEX_MIGRATIE_SUFFIX))
+    for record in RECORDS:
+        assert get_fileinfo(record['url']) == record
+        assert get_url(record['url']) == f"<html>{record['bestandsnaam']}</html>"
+    #een url die enkel als redirect_url bekend is, vindt het record ook
+    assert get_fileinfo('https://thuis.test/nl/wiki/Kaat')['url'] == 'https://thuis.test/nl/wiki/Franky'
+    with sqlite3.connect(os.path.join(cachedir, INDEX_DB_NAME)) as conn:
+        assert conn.execute(thuis_http_utils.SQL_SELECT_CACHE_INDEX).fetchall() == [tuple(record.values()) for record in RECORDS]
+
+def test_migratie_gebeurt_eenmalig(cachedir, monkeypatch):
+    thuis_http_utils._init()
+    #opnieuw openen (bv. een nieuwe sessie) leest de databank, het hernoemde bestand wordt niet opnieuw gemigreerd
+    _sluit_index()
+    monkeypatch.setattr(thuis_http_utils, '_read_index', lambda index_file: pytest.fail(f"{index_file} opnieuw gelezen"))
+    thuis_http_utils._init()
+    assert [get_fileinfo(record['url']) for record in RECORDS] == RECORDS
+
+def test_niet_in_cache(cachedir):
+    with pytest.raises(IndexError):
+        get_fileinfo('https://thuis.test/nl/wiki/Onbekend')
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+import thuis_pad_utils
+from thuis_graaf_utils import maak_csr
+from thuis_pad_utils import ONBEREIKBAAR, Padzoeker, afstanden_vanaf, alle_afstanden, kortste_pad, tabel_onbereikbaar
+
+LENGTE = 300     # langer dan 255: de afstanden passen niet meer in een uint8-tabel
+
+def _relatie_arr() -> np.ndarray:
+    """Een ketting van LENGTE personages, een los paar (300, 301) en een personage zonder relaties (302)"""
+    ketting = [(1, nr, nr + 1) for nr in range(LENGTE - 1)]
+    return np.array(ketting + [(1, LENGTE, LENGTE + 1), (1, LENGTE + 2, LENGTE + 2)])
+
+def _zonder_tabelwaarde(tabel:np.ndarray, rij:int) -> np.ndarray:
+    afstanden = tabel[rij].astype(np.int64)
+    afstanden[afstanden == tabel_onbereikbaar(tabel)] = ONBEREIKBAAR
+    return afstanden
+
+@pytest.mark.parametrize('bronnen_per_blok', [64, 1024])
+def test_alle_afstanden_lange_ketting(monkeypatch, bronnen_per_blok):
+    #met blokken van 64 bronnen zitten er blokken met en zonder afstanden van 255 of meer in dezelfde tabel
+    monkeypatch.setattr(thuis_pad_utils, 'BRONNEN_PER_BLOK', bronnen_per_blok)
+    csr = maak_csr(_relatie_arr())
+    tabel = alle_afstanden(csr)
+    assert tabel.dtype == np.uint16
+    assert tabel[0, LENGTE - 1] == LENGTE - 1
+    assert tabel[0, LENGTE] == tabel_onbereikbaar(tabel) == np.iinfo(np.uint16).max
+    for bron in range(csr.aantal_personages):
+        assert np.array_equal(_zonder_tabelwaarde(tabel, bron), afstanden_vanaf(csr, bron)), bron
+
+def test_kortste_pad_lange_ketting():
+    csr = maak_csr(_relatie_arr())
+    tabel = alle_afstanden(csr)
+    assert kortste_pad(csr, 0, LENGTE - 1, _zonder_tabelwaarde(tabel, 0)) == list(range(LENGTE))
+    assert kortste_pad(csr, 0, LENGTE - 1) == list(range(LENGTE))
+    assert kortste_pad(csr, 0, LENGTE, _zonder_tabelwaarde(tabel, 0)) == []
+
+def test_padzoeker_met_tabel():
+    zoeker = Padzoeker(_relatie_arr())
+    zonder_tabel = (zoeker.afstand(0, LENGTE - 1), zoeker.kortste_pad(5, LENGTE - 1), zoeker.afstand(0, LENGTE))
+    zoeker.bereken_alle_afstanden()
+    assert (zoeker.afstand(0, LENGTE - 1), zoeker.kortste_pad(5, LENGTE - 1), zoeker.afstand(0, LENGTE)) == zonder_tabel
+    assert zonder_tabel == (LENGTE - 1, list(range(5, LENGTE)), ONBEREIKBAAR)
+    assert zoeker.kortste_pad(LENGTE - 1, LENGTE + 1) == []
+
+def test_korte_afstanden_blijven_uint8():
+    csr = maak_csr(np.array([(1, 0, 1), (1, 1, 2), (2, 4, 5)]))
+    tabel = alle_afstanden(csr)
+    assert tabel.dtype == np.uint8
+    assert tabel[0, 2] == 2 and tabel[0, 4] == tabel_onbereikbaar(tabel) == 255
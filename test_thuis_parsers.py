@@ -0,0 +1,70 @@
+import re
+
+import pytest
+
+import thuis_benchmark
+import thuis_html_lxml_utils
+import thuis_html_utils
+import thuis_http_utils
+from thuis_html_utils import (HOOFDPERSONAGES_URL, NEVENERSONAGES_URL, RELATIE_URL, PARSER_BS4, PARSER_LXML, MAX_WORKERS,
+                              vergelijk_parsers, _lees_hoofdpersonages, _lees_nevenpersonages, _lees_relaties_pagina)
+
+# Personages uit het synthetische corpus die de namen van de uitzonderingen krijgen (zie thuis_uitzonderingen_utils),
+# op de detailpagina's en in de relaties
+UITZONDERINGEN = {
+    'Voornaam0': 'Tim', 'Achternaam0': 'Cremers',       #seizoen 13 ervoor
+    'Voornaam1': 'Nand', 'Achternaam1': 'Reimers',      #seizoenen vervangen
+    'Voornaam2': 'Angele',
+    'Voornaam3': 'Franky',
+    'Voornaam4': 'Aisha',
+    'Voornaam5': 'Britney',
+    'Voornaam6 Achternaam6': 'Kazàn', 'Voornaam6': 'Kazàn',     #zonder achternaam
+}
+VOORNAMEN = {'Tim', 'Nand', 'Angèle', 'Kaat', 'Aïsha', 'Britt', 'Kasper'} | {f'Voornaam{nr}' for nr in range(7, 60)}
+
+def _met_uitzonderingen(html:str) -> str:
+    for naam, uitzondering in UITZONDERINGEN.items():
+        html = re.sub(rf'\b{naam}\b', uitzondering, html)
+    return html
+
+@pytest.fixture
+def cache(tmp_path):
+    """Een tijdelijke cache met het synthetische corpus, de namen van de uitzonderingen en de url van Pips"""
+    corpus = thuis_benchmark.maak_corpus(aantal_personages=60, aantal_seizoenen=8)
+    corpus[NEVENERSONAGES_URL] = corpus[NEVENERSONAGES_URL].replace(
+        '</tbody></table>', '<tr><td>99</td><td>Acteur</td><td><a href="/nl/wiki/Pips">Pips</a></td></tr></tbody></table>')
+    with thuis_benchmark._tijdelijke_omgeving(str(tmp_path)):
+        for url, html in corpus.items():
+            thuis_http_utils._add_to_cache(url, {'url': url, 'content': _met_uitzonderingen(html).encode('utf-8'),
+                                                 'laatste_wijziging': thuis_benchmark.CORPUS_LAATSTE_WIJZIGING})
+        yield corpus
+
+def test_parsers_geven_dezelfde_csv(cache):
+    assert vergelijk_parsers() == []
+
+@pytest.mark.parametrize('parser', [PARSER_BS4, PARSER_LXML])
+def test_uitzonderingen_personages(cache, parser):
+    personages = _lees_hoofdpersonages(False, MAX_WORKERS, parser) + _lees_nevenpersonages(False, MAX_WORKERS, parser)
+    per_naam = {(personage['voornaam'], personage['achternaam']): personage['seizoenen'] for personage in personages}
+    assert per_naam[('Tim', 'Cremers')][0] == 13
+    assert per_naam[('Nand', 'Reimers')] == [10, 11, 12, 13]
+    assert ('Angèle', 'Achternaam2') in per_naam
+    assert ('Kaat', 'Achternaam3') in per_naam
+    assert ('Aïsha', 'Achternaam4') in per_naam
+    assert ('Britt', 'Achternaam5') in per_naam
+    assert ('Kasper', 'Onbekend') in per_naam
+    assert len(personages) == 60     #Pips heeft geen detailpagina
+
+@pytest.mark.parametrize('parser', [PARSER_BS4, PARSER_LXML])
+def test_uitzonderingen_relaties(cache, parser):
+    namen = {naam for relatie in _lees_relaties_pagina(False, parser) for naam in (relatie['persoon_1'], relatie['persoon_2'])}
+    assert namen.isdisjoint({'Angele', 'Franky', 'Aisha', 'Britney', 'Kazàn'})
+    assert namen <= VOORNAMEN
+
+def test_parsers_op_dezelfde_pagina():
+    corpus = {url: _met_uitzonderingen(html) for url, html in thuis_benchmark.maak_corpus(aantal_personages=30, aantal_seizoenen=5).items()}
+    assert thuis_html_utils._lees_relaties(corpus[RELATIE_URL]) == thuis_html_lxml_utils._lees_relaties(corpus[RELATIE_URL])
+    assert (thuis_html_utils._lees_hoofdpersonage_urls(corpus[HOOFDPERSONAGES_URL]) ==
+            thuis_html_lxml_utils._lees_hoofdpersonage_urls(corpus[HOOFDPERSONAGES_URL]))
+    assert (thuis_html_utils._lees_nevenpersonage_urls(corpus[NEVENERSONAGES_URL]) ==
+            thuis_html_lxml_utils._lees_nevenpersonage_urls(corpus[NEVENERSONAGES_URL]))
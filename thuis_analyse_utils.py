@@ -0,0 +1,83 @@
+import logging
+from typing import NamedTuple
+
+import numpy as np
+
+from thuis_graaf_utils import unieke_relaties, KOLOM_SEIZOEN, KOLOM_PERSOON_NR1, KOLOM_PERSOON_NR2
+
+logger = logging.getLogger(__name__)
+
+class RelatieDuur(NamedTuple):
+    """De duur van elke relatie (één element per paar personages met persoon_nr1 < persoon_nr2)"""
+    persoon_nr1: np.ndarray
+    persoon_nr2: np.ndarray
+    totaal: np.ndarray           # aantal seizoenen met de relatie
+    langste_reeks: np.ndarray    # langste aantal opeenvolgende seizoenen
+    eerste: np.ndarray           # eerste seizoen
+    laatste: np.ndarray          # laatste seizoen
+
+def bereken_relatie_duur(relatie_arr:np.ndarray) -> RelatieDuur:
+    """Berekent de duur van elke relatie rechtstreeks op de lijst met relaties (zonder n x n matrix)
+
+    Parameters
+    ----------
+    relatie_arr: np.ndarray
+         de relaties (seizoen, persoon_nr1, persoon_nr2), zie thuis_graaf_utils.lees_relatie_arr
+
+    Returns
+    -------
+    RelatieDuur
+         per paar personages het totaal aantal seizoenen, de langste reeks opeenvolgende seizoenen
+         en het eerste en laatste seizoen
+    """
+    relaties = unieke_relaties(relatie_arr).astype(np.int64)
+    if len(relaties) == 0:
+        leeg = np.empty(0, dtype=np.int64)
+        return RelatieDuur(leeg, leeg, leeg, leeg, leeg, leeg)
+    seizoenen = relaties[:, KOLOM_SEIZOEN]
+    p1 = relaties[:, KOLOM_PERSOON_NR1]
+    p2 = relaties[:, KOLOM_PERSOON_NR2]
+    #sorteer op paar en daarbinnen op seizoen
+    volgorde = np.lexsort((seizoenen, p2, p1))
+    seizoenen, p1, p2 = seizoenen[volgorde], p1[volgorde], p2[volgorde]
+    nieuw_paar = np.ones(len(seizoenen), dtype=bool)
+    nieuw_paar[1:] = (p1[1:] != p1[:-1]) | (p2[1:] != p2[:-1])
+    paar_begin = np.nonzero(nieuw_paar)[0]
+    paar_einde = np.append(paar_begin[1:], len(seizoenen))
+    #een reeks stopt bij een nieuw paar of bij een ontbrekend seizoen
+    nieuwe_reeks = nieuw_paar.copy()
+    nieuwe_reeks[1:] |= seizoenen[1:] != seizoenen[:-1] + 1
+    reeks_begin = np.nonzero(nieuwe_reeks)[0]
+    reeks_lengte = np.diff(np.append(reeks_begin, len(seizoenen)))
+    eerste_reeks_van_paar = np.searchsorted(reeks_begin, paar_begin)
+    langste_reeks = np.maximum.reduceat(reeks_lengte, eerste_reeks_van_paar) if len(reeks_lengte) > 0 else reeks_lengte
+    return RelatieDuur(p1[paar_begin], p2[paar_begin], paar_einde - paar_begin, langste_reeks,
+                       seizoenen[paar_begin], seizoenen[paar_einde - 1])
+
+def top_k(waarden:np.ndarray, k:int=10) -> np.ndarray:
+    """Geeft de indices van de k grootste waarden, van groot naar klein
+
+    Enkel de k grootste waarden worden gesorteerd (np.argpartition), de kost groeit dus met het aantal
+    relaties en niet met het aantal personages².
+    """
+    k = min(k, len(waarden))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    kandidaten = np.argpartition(waarden, len(waarden) - k)[len(waarden) - k:]
+    return kandidaten[np.argsort(waarden[kandidaten], kind='stable')[::-1]]
+
+def langste_relaties(relatie_arr:np.ndarray, k:int=10, consecutief:bool=False) -> list[tuple[int, int, int]]:
+    """Geeft de k langste relaties als (persoon_nr1, persoon_nr2, aantal seizoenen)
+
+    Parameters
+    ----------
+    relatie_arr: np.ndarray
+         de relaties (seizoen, persoon_nr1, persoon_nr2)
+    k: int, optional
+         het aantal relaties
+    consecutief: bool, optional
+         False => totaal aantal seizoenen, True => langste reeks opeenvolgende seizoenen
+    """
+    duur = bereken_relatie_duur(relatie_arr)
+    waarden = duur.langste_reeks if consecutief else duur.totaal
+    return [(int(duur.persoon_nr1[i]), int(duur.persoon_nr2[i]), int(waarden[i])) for i in top_k(waarden, k)]
@@ -0,0 +1,392 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import chain
+from typing import Iterator, Optional
+
+import numpy as np
+
+import thuis_analyse_utils
+import thuis_db_utils
+import thuis_graaf_utils
+import thuis_html_lxml_utils
+import thuis_html_utils
+import thuis_http_utils
+from thuis_typing import PersonageData
+
+# ongeveer de omvang van de echte gegevens
+BASIS_AANTAL_PERSONAGES = 400
+BASIS_AANTAL_RELATIES = 800
+BASIS_AANTAL_SEIZOENEN = 30
+DENSE_LIMIET = 500_000_000     # de dense matrix (seizoenen x n x n uint8) wordt enkel gemaakt onder deze grootte in bytes
+
+BENCHMARK_JSONL = 'benchmark_resultaten.jsonl'   # één regel per uitvoering, om regressies te zien
+REGRESSIE_DREMPEL = 1.25       # een stap is een regressie wanneer ze meer dan 25% trager is dan de vorige uitvoering
+CORPUS_LAATSTE_WIJZIGING = 'Mon, 01 Jan 2024 00:00:00 GMT'
+
+# Het budget in ms voor het importeren van elke module in een nieuw proces (inclusief numpy voor de analysemodules).
+# Geen enkele module mag bij het importeren al één van de ZWARE_MODULES inladen: die horen enkel bij het downloaden en parsen.
+IMPORT_BUDGET_MS = {
+    'thuis_http_utils': 75,
+    'thuis_html_utils': 100,
+    'thuis_db_utils': 250,
+    'thuis_graaf_utils': 250,
+    'thuis_seizoen_utils': 250,
+    'thuis_snapshot_utils': 250,
+    'thuis_pad_utils': 250,
+    'thuis_cluster_utils': 250,
+    'thuis_pipeline': 350,
+    'thuis_ververs_utils': 350
+}
+ZWARE_MODULES = ('bs4', 'lxml', 'requests', 'multiprocessing')
+IMPORTTIME_REGEL = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+logger = logging.getLogger(__name__)
+
+def benchmark_bewaar_personages(aantal=10_000, aantal_seizoenen=30) -> dict[str, float]:
+    """Vergelijkt bewaar_personage_lijst per rij met de bulk-insert in een tijdelijke databank
+
+    Parameters
+    ----------
+    aantal: int, optional
+         het aantal personages
+    aantal_seizoenen: int, optional
+         het aantal seizoenen waaruit de seizoenen van elk personage gekozen worden
+
+    Returns
+    -------
+    dict[str, float]
+         de duur in seconden voor 'per_rij' en 'bulk'
+    """
+    resultaat = {}
+    oude_db_bestand = thuis_db_utils.DB_BESTAND
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        try:
+            for naam, bulk in (('per_rij', False), ('bulk', True)):
+                thuis_db_utils.DB_BESTAND = os.path.join(tmp_dir, f"{naam}.db")
+                thuis_db_utils.init_db()
+                personages = _maak_personages(aantal, aantal_seizoenen)
+                start = time.perf_counter()
+                thuis_db_utils.bewaar_personage_lijst(personages, bulk=bulk)
+                resultaat[naam] = time.perf_counter() - start
+                thuis_db_utils.sluit_db()
+        finally:
+            thuis_db_utils.DB_BESTAND = oude_db_bestand
+    logger.info("bewaar_personage_lijst met %s personages: %s", aantal, resultaat)
+    return resultaat
+
+def benchmark_graaf(factoren=(1, 10, 100)) -> list[dict]:
+    """Vergelijkt de dense adjacency-matrix (seizoenen x n x n) met de sparse matrix van thuis_graaf_utils
+
+    Parameters
+    ----------
+    factoren: tuple[int], optional
+         het aantal personages en relaties als veelvoud van de echte gegevens
+
+    Returns
+    -------
+    list[dict]
+         per factor de duur in seconden van de dense en de sparse berekening van het aantal relaties per personage
+         (None wanneer de dense matrix te groot is) en het geheugen in bytes
+    """
+    resultaten = []
+    for factor in factoren:
+        n = BASIS_AANTAL_PERSONAGES * factor
+        relatie_arr = maak_relatie_arr(n, BASIS_AANTAL_SEIZOENEN, BASIS_AANTAL_RELATIES * factor)
+        resultaat = {'factor': factor, 'personages': n, 'relaties': len(relatie_arr)}
+        start = time.perf_counter()
+        csr = thuis_graaf_utils.maak_csr(relatie_arr, n)
+        thuis_graaf_utils.graad(csr)
+        resultaat['sparse_s'] = time.perf_counter() - start
+        resultaat['sparse_bytes'] = csr.indptr.nbytes + csr.indices.nbytes + csr.gewichten.nbytes
+        dense_bytes = BASIS_AANTAL_SEIZOENEN * n * n
+        resultaat['dense_bytes'] = dense_bytes
+        resultaat['dense_s'] = None
+        if dense_bytes <= DENSE_LIMIET:
+            start = time.perf_counter()
+            adjacency_arr = np.zeros((BASIS_AANTAL_SEIZOENEN, n, n), dtype=np.uint8)
+            for relatie in relatie_arr:
+                adjacency_arr[relatie[0]-1, relatie[1], relatie[2]] = 1
+                adjacency_arr[relatie[0]-1, relatie[2], relatie[1]] = 1
+            adjacency_arr.any(0).astype(np.uint8).sum(axis=0)
+            resultaat['dense_s'] = time.perf_counter() - start
+            del adjacency_arr
+        logger.info("graaf: %s", resultaat)
+        resultaten.append(resultaat)
+    return resultaten
+
+def maak_relatie_arr(aantal_personages:int, aantal_seizoenen:int, aantal_relaties:int, seed=0) -> np.ndarray:
+    """Maakt synthetische relaties (seizoen, persoon_nr1, persoon_nr2) zonder relaties met zichzelf
+
+    Een deel van de relaties duurt meerdere seizoenen, zoals in de echte gegevens.
+    """
+    rnd = np.random.default_rng(seed)
+    p1 = rnd.integers(0, aantal_personages, aantal_relaties)
+    p2 = (p1 + rnd.integers(1, aantal_personages, aantal_relaties)) % aantal_personages
+    eerste = rnd.integers(1, aantal_seizoenen + 1, aantal_relaties)
+    duur = np.minimum(rnd.geometric(0.5, aantal_relaties), aantal_seizoenen - eerste + 1)
+    rij = np.repeat(np.arange(aantal_relaties), duur)
+    seizoen = eerste[rij] + (np.arange(len(rij)) - np.repeat(np.cumsum(duur) - duur, duur))
+    relatie_arr = np.column_stack((seizoen, p1[rij], p2[rij]))
+    return relatie_arr[np.argsort(relatie_arr[:, 0], kind='stable')]
+
+def _maak_personages(aantal:int, aantal_seizoenen:int) -> list[PersonageData]:
+    rnd = random.Random(aantal)
+    personages:list[PersonageData] = []
+    for nr in range(aantal):
+        eerste = rnd.randint(1, aantal_seizoenen)
+        laatste = rnd.randint(eerste, min(aantal_seizoenen, eerste + 10))
+        personages.append({'voornaam': f"Voornaam{nr}", 'achternaam': f"Achternaam{nr}", 'seizoenen': list(range(eerste, laatste + 1))})
+    return personages
+
+def maak_corpus(aantal_personages=10_000, aantal_seizoenen=120, seed=0) -> dict[str, str]:
+    """Maakt synthetische pagina's met dezelfde HTML-structuur als de fandom website
+
+    De pagina's Hoofdpersonages (gallery-0 en gallery-1), Nevenpersonages (gallery-0 en een tabel sortable),
+    een detailpagina per personage (titel mw-page-title-main en een tabel userbox met de seizoenen) en
+    Relaties (gallery-1 tot gallery-N voor de vorige seizoenen en gallery-0 voor het laatste seizoen, met
+    een <b>-tag per relatie in lightbox-caption). Er zijn ongeveer twee relaties per personage, zoals in de
+    echte gegevens.
+
+    Returns
+    -------
+    dict[str, str]
+         de HTML-tekst per url
+    """
+    rnd = random.Random(seed)
+    paginas:dict[str, str] = {}
+    actief:list[list[int]] = [[] for _ in range(aantal_seizoenen + 1)]
+    detail_urls = []
+    for nr in range(aantal_personages):
+        eerste = rnd.randint(1, aantal_seizoenen)
+        laatste = rnd.randint(eerste, min(aantal_seizoenen, eerste + 10))
+        seizoenen = range(eerste, laatste + 1)
+        for seizoen in seizoenen:
+            actief[seizoen].append(nr)
+        url = f"/nl/wiki/Personage_{nr}"
+        detail_urls.append(url)
+        seizoen_links = ' '.join(f'<a href="/nl/wiki/Seizoen_{seizoen}" title="Seizoen {seizoen}">{seizoen}</a>' for seizoen in seizoenen)
+        paginas[thuis_html_utils.BASIS_URL + url] = (
+            f'<html><head><title>{_corpus_naam(nr)}</title></head><body>'
+            f'<h1 class="page-header__title"><span class="mw-page-title-main">{_corpus_naam(nr)}</span></h1>'
+            f'<table class="userbox"><tbody><tr><td>Seizoenen</td><td>{seizoen_links}</td></tr></tbody></table>'
+            f'<p>{"Synthetische tekst. " * 20}</p></body></html>')
+    aantal_hoofd = max(2, aantal_personages // 10)
+    helft = aantal_hoofd // 2
+    paginas[thuis_html_utils.HOOFDPERSONAGES_URL] = (
+        '<html><body>' + _corpus_galerij(0, detail_urls[:helft]) + _corpus_galerij(1, detail_urls[helft:aantal_hoofd]) + '</body></html>')
+    neven_urls = detail_urls[aantal_hoofd:]
+    huidig = len(neven_urls) // 2
+    rijen = ''.join(f'<tr><td>{nr}</td><td>Acteur {nr}</td><td><a href="{url}">Personage</a></td></tr>' for nr, url in enumerate(neven_urls[huidig:]))
+    paginas[thuis_html_utils.NEVENERSONAGES_URL] = (
+        '<html><body>' + _corpus_galerij(0, neven_urls[:huidig]) +
+        f'<table class="wikitable sortable"><tbody><tr><th>Nr</th><th>Acteur</th><th>Personage</th></tr>{rijen}</tbody></table></body></html>')
+    relaties_per_seizoen = max(1, 2 * aantal_personages // aantal_seizoenen)
+    galerijen = []
+    for seizoen in range(1, aantal_seizoenen + 1):
+        kandidaten = actief[seizoen]
+        bijschriften = []
+        if len(kandidaten) >= 2:
+            for _ in range(relaties_per_seizoen):
+                nr1, nr2 = rnd.sample(kandidaten, 2)
+                bijschriften.append(f'<b>{_corpus_voornaam(nr1)} en {_corpus_voornaam(nr2)}</b>')
+        #het laatste seizoen staat in gallery-0, de vorige seizoenen in gallery-1, gallery-2, ...
+        galerijen.append(_corpus_galerij(seizoen % aantal_seizoenen, ['/nl/wiki/Relatie'] * len(bijschriften), bijschriften))
+    paginas[thuis_html_utils.RELATIE_URL] = '<html><body>' + ''.join(galerijen) + '</body></html>'
+    return paginas
+
+def benchmark_corpus(aantal_personages=10_000, aantal_seizoenen=120, bestandsnaam:Optional[str]=BENCHMARK_JSONL) -> dict:
+    """Meet elke stap op een synthetisch corpus (zie maak_corpus) in een tijdelijke cache en databank
+
+    De stappen: de cache vullen, de cache opzoeken, de pagina's parsen met BeautifulSoup en met lxml,
+    de extract-stap met een lege en een gevulde memo, de personages in de databank bewaren, de voornamen
+    koppelen aan personagenummers, dezelfde drie stappen als één stroom naar de databank en de graafanalyses. Het resultaat wordt toegevoegd aan bestandsnaam
+    en vergeleken met de vorige uitvoering met dezelfde omvang.
+
+    Returns
+    -------
+    dict
+         de omvang, de duur per stap in seconden ('stappen') en de stappen die trager zijn dan de
+         vorige uitvoering ('regressies')
+    """
+    stappen:dict[str, float] = {}
+    corpus = maak_corpus(aantal_personages, aantal_seizoenen)
+    with tempfile.TemporaryDirectory() as tmp_dir, _tijdelijke_omgeving(tmp_dir):
+        with _meet(stappen, 'cache_vullen'):
+            for url, html in corpus.items():
+                thuis_http_utils._add_to_cache(url, {'url': url, 'content': html.encode('utf-8'), 'laatste_wijziging': CORPUS_LAATSTE_WIJZIGING})
+        with _meet(stappen, 'cache_opzoeken'):
+            fileinfos = thuis_http_utils.get_fileinfos(list(corpus), download=False)
+        detail_html = [html for url, html in corpus.items() if '/Personage_' in url]
+        for naam, module in (('bs4', thuis_html_utils), ('lxml', thuis_html_lxml_utils)):
+            with _meet(stappen, f'parse_{naam}'):
+                module._lees_hoofdpersonage_urls(corpus[thuis_html_utils.HOOFDPERSONAGES_URL])
+                module._lees_nevenpersonage_urls(corpus[thuis_html_utils.NEVENERSONAGES_URL])
+                for html in detail_html:
+                    module._lees_personage_details(html)
+                module._lees_relaties(corpus[thuis_html_utils.RELATIE_URL])
+        for naam in ('extract_koud', 'extract_warm'):
+            with _meet(stappen, naam):
+                personages = (thuis_html_utils._lees_hoofdpersonages(False, thuis_http_utils.MAX_WORKERS, thuis_html_utils.PARSER_LXML) +
+                              thuis_html_utils._lees_nevenpersonages(False, thuis_http_utils.MAX_WORKERS, thuis_html_utils.PARSER_LXML))
+                relaties = thuis_html_utils._lees_relaties_pagina(False, thuis_html_utils.PARSER_LXML)
+        with _meet(stappen, 'db_laden'):
+            thuis_db_utils.init_db()
+            thuis_db_utils.bewaar_personage_lijst(personages)
+        with _meet(stappen, 'namen_koppelen'):
+            relatie_nrs, _ = thuis_db_utils.zoek_relatie_nrs(relaties, thuis_db_utils.lees_personage_index())
+        with _meet(stappen, 'stroom_naar_db'):
+            #extract_warm + db_laden + namen_koppelen zonder tussenliggende lijsten
+            thuis_db_utils.init_db()
+            thuis_db_utils.bewaar_personage_stroom(chain(thuis_html_utils.stroom_hoofdpersonages(parser=thuis_html_utils.PARSER_LXML),
+                                                         thuis_html_utils.stroom_nevenpersonages(parser=thuis_html_utils.PARSER_LXML)))
+            thuis_db_utils.bewaar_relatie_stroom(thuis_html_utils.stroom_relaties(parser=thuis_html_utils.PARSER_LXML))
+        relatie_arr = np.array([[relatie['seizoen'], relatie['persoon_nr1'], relatie['persoon_nr2']] for relatie in relatie_nrs], dtype=np.int64).reshape(-1, 3)
+        with _meet(stappen, 'graaf_csr'):
+            csr = thuis_graaf_utils.maak_csr(relatie_arr, len(personages))
+        with _meet(stappen, 'graaf_driehoeken'):
+            thuis_graaf_utils.tel_driehoeken(csr)
+        with _meet(stappen, 'graaf_vierhoeken'):
+            thuis_graaf_utils.tel_vierhoeken(csr)
+        with _meet(stappen, 'relatie_duur'):
+            thuis_analyse_utils.langste_relaties(relatie_arr, k=10, consecutief=True)
+    resultaat = {
+        'datum': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'personages': aantal_personages,
+        'seizoenen': aantal_seizoenen,
+        'paginas': len(fileinfos),
+        'relaties': len(relatie_nrs),
+        'stappen': stappen
+    }
+    resultaat['regressies'] = []
+    if bestandsnaam is not None:
+        vorige = lees_vorige_resultaat(bestandsnaam, aantal_personages, aantal_seizoenen)
+        if vorige is not None:
+            resultaat['regressies'] = vergelijk_resultaten(vorige['stappen'], stappen)
+        with open(bestandsnaam, mode='a', encoding='utf-8') as f:
+            f.write(json.dumps(resultaat) + '\n')
+    for stap in resultaat['regressies']:
+        logger.warning("regressie in stap %s: %.3fs, vorige uitvoering %.3fs", stap, stappen[stap], vorige['stappen'][stap])
+    logger.info("corpus met %d personages en %d seizoenen: %s", aantal_personages, aantal_seizoenen, stappen)
+    return resultaat
+
+def benchmark_import(budget:dict[str, float]=IMPORT_BUDGET_MS, herhalingen=5) -> dict:
+    """Meet de importtijd van elke module in een nieuw proces met python -X importtime en vergelijkt ze met het budget
+
+    De kortste van herhalingen metingen telt: de eerste bevat ook het compileren van de bytecode.
+
+    Returns
+    -------
+    dict
+         per module de importtijd in ms ('importtijd_ms') en de ingeladen ZWARE_MODULES ('zware_modules'), en de
+         modules die trager zijn dan hun budget of een zware module inladen ('overschrijdingen')
+    """
+    importtijden:dict[str, float] = {}
+    zware_modules:dict[str, list[str]] = {}
+    for module in budget:
+        metingen = [meet_import(module) for _ in range(herhalingen)]
+        importtijden[module] = min(ms for ms, _ in metingen)
+        zware_modules[module] = sorted(set(metingen[0][1]) & set(ZWARE_MODULES))
+    overschrijdingen = [module for module in budget if importtijden[module] > budget[module] or zware_modules[module]]
+    for module in overschrijdingen:
+        logger.warning("import %s: %.1f ms (budget %.0f ms), zware modules %s", module, importtijden[module], budget[module], zware_modules[module])
+    logger.info("importtijden in ms: %s", importtijden)
+    return {'importtijd_ms': importtijden, 'zware_modules': zware_modules, 'overschrijdingen': overschrijdingen}
+
+def meet_import(module:str) -> tuple[float, list[str]]:
+    """Importeert de module in een nieuw proces met -X importtime
+
+    Returns
+    -------
+    tuple[float, list[str]]
+         de cumulatieve importtijd van de module in ms en de namen van de ingeladen modules op het hoogste niveau (bv. 'bs4' en niet 'bs4.element')
+    """
+    resultaat = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], capture_output=True, text=True, check=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    importtijd = 0.0
+    ingeladen = set()
+    for regel in resultaat.stderr.splitlines():
+        match = IMPORTTIME_REGEL.match(regel)
+        if match is None:
+            continue
+        ingeladen.add(match.group(4).split('.')[0])
+        if match.group(4) == module and match.group(3) == ' ':
+            importtijd = int(match.group(2)) / 1000
+    return importtijd, sorted(ingeladen)
+
+def lees_vorige_resultaat(bestandsnaam:str, aantal_personages:int, aantal_seizoenen:int) -> Optional[dict]:
+    """Geeft de laatste uitvoering van benchmark_corpus met dezelfde omvang, of None"""
+    if not os.path.exists(bestandsnaam):
+        return None
+    vorige = None
+    with open(bestandsnaam, mode='r', encoding='utf-8') as f:
+        for regel in f:
+            resultaat = json.loads(regel)
+            if resultaat['personages'] == aantal_personages and resultaat['seizoenen'] == aantal_seizoenen:
+                vorige = resultaat
+    return vorige
+
+def vergelijk_resultaten(vorige:dict[str, float], huidige:dict[str, float], drempel:float=REGRESSIE_DREMPEL) -> list[str]:
+    """Geeft de stappen die meer dan drempel keer trager zijn dan in de vorige uitvoering"""
+    return [stap for stap, duur in huidige.items() if stap in vorige and duur > vorige[stap] * drempel]
+
+@contextmanager
+def _meet(stappen:dict[str, float], naam:str) -> Iterator[None]:
+    start = time.perf_counter()
+    yield
+    stappen[naam] = time.perf_counter() - start
+    logger.debug("%s: %.3fs", naam, stappen[naam])
+
+@contextmanager
+def _tijdelijke_omgeving(tmp_dir:str) -> Iterator[None]:
+    """Gebruikt een cache, memo en databank in tmp_dir zodat de echte gegevens niet aangeraakt worden"""
+    oude_cache_dir = thuis_http_utils.CACHE_DIR_PATH
+    oude_db_bestand = thuis_db_utils.DB_BESTAND
+    thuis_http_utils.CACHE_DIR_PATH = os.path.join(tmp_dir, thuis_http_utils.CACHE_DIR_NAME)
+    thuis_db_utils.DB_BESTAND = os.path.join(tmp_dir, thuis_db_utils.DB_BESTAND)
+    try:
+        yield
+    finally:
+        thuis_db_utils.sluit_db()
+        thuis_http_utils.CACHE_DIR_PATH = oude_cache_dir
+        thuis_db_utils.DB_BESTAND = oude_db_bestand
+
+def _corpus_voornaam(nr:int) -> str:
+    return f"Voornaam{nr}"
+
+def _corpus_naam(nr:int) -> str:
+    return f"{_corpus_voornaam(nr)} Achternaam{nr}"
+
+def _corpus_galerij(nr:int, urls:list[str], bijschriften:Optional[list[str]]=None) -> str:
+    if bijschriften is None:
+        bijschriften = ['Personage'] * len(urls)
+    items = ''.join(f'<div class="wikia-gallery-item"><div class="thumb"><a href="{url}" class="image"><img src="x.png"></a></div>'
+                    f'<div class="lightbox-caption">{bijschrift}</div></div>' for url, bijschrift in zip(urls, bijschriften))
+    return f'<div id="gallery-{nr}" class="wikia-gallery wikia-gallery-caption-below">{items}</div>'
+
+if __name__ == '__main__':
+    argument_parser = argparse.ArgumentParser(description="Benchmarks van de Thuis-analyse")
+    argument_parser.add_argument('--import', dest='enkel_import', action='store_true',
+                                 help="meet enkel de importtijden (exit code 1 bij een overschrijding van IMPORT_BUDGET_MS)")
+    args = argument_parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    import_resultaat = benchmark_import()
+    print(import_resultaat)
+    if args.enkel_import:
+        sys.exit(1 if import_resultaat['overschrijdingen'] else 0)
+    for aantal in (1_000, 10_000):
+        print(aantal, benchmark_bewaar_personages(aantal))
+    for resultaat in benchmark_graaf():
+        print(resultaat)
+    print(benchmark_corpus())
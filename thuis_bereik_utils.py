@@ -0,0 +1,150 @@
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from thuis_graaf_utils import lees_relatie_arr, unieke_relaties, KOLOM_SEIZOEN, KOLOM_PERSOON_NR1, KOLOM_PERSOON_NR2, _aantal_personages, _kleinste_dtype
+
+# Vragen over een bereik van seizoenen (seizoen_van tot en met seizoen_tot) zonder de relaties in het bereik
+# opnieuw op te tellen. Per paar personages met een relatie wordt één keer het cumulatieve aantal seizoenen met
+# de relatie berekend (een prefixsom over de seizoenen). Het aantal seizoenen in een bereik is dan het verschil
+# van twee kolommen, en de relatie bestaat in het bereik wanneer dat verschil groter is dan 0. Per personage en
+# voor alle relaties samen gebeurt hetzelfde met het aantal relaties per seizoen.
+CACHE_GROOTTE = 64     # aantal bereiken waarvoor een SeizoenBereik de graad van alle personages bijhoudt
+
+logger = logging.getLogger(__name__)
+
+class SeizoenBereik:
+    """Beantwoordt vragen over een bereik van seizoenen in constante tijd per paar of per personage
+
+    Zonder seizoen_van begint het bereik bij het eerste seizoen, zonder seizoen_tot loopt het tot het laatste.
+    Het aantal verschillende partners (graad) is geen verschil van twee prefixsommen: de eerste vraag voor een
+    bereik berekent de graad van alle personages in O(aantal relaties), daarna is elke vraag voor dat bereik
+    één opzoeking (LRU-cache van cache_grootte bereiken).
+
+    Voorbeeld::
+
+        bereik = SeizoenBereik()
+        bereik.duur(12, 40, seizoen_van=5, seizoen_tot=10)
+        bereik.graad(12, seizoen_van=5, seizoen_tot=10)
+    """
+
+    def __init__(self, relatie_arr:Optional[np.ndarray]=None, aantal_personages:Optional[int]=None, cache_grootte:int=CACHE_GROOTTE):
+        if relatie_arr is None:
+            relatie_arr = lees_relatie_arr()
+        if aantal_personages is None:
+            aantal_personages = _aantal_personages(relatie_arr)
+        relaties = unieke_relaties(relatie_arr).astype(np.int64)
+        seizoenen = relaties[:, KOLOM_SEIZOEN]
+        p1 = relaties[:, KOLOM_PERSOON_NR1]
+        p2 = relaties[:, KOLOM_PERSOON_NR2]
+        self.aantal_personages = aantal_personages
+        self.aantal_seizoenen = int(seizoenen.max()) if len(seizoenen) > 0 else 0
+        self.cache_grootte = cache_grootte
+        #één rij per paar (persoon_nr1 < persoon_nr2), gesorteerd op sleutel persoon_nr1 * aantal_personages + persoon_nr2
+        self._sleutels, paar = np.unique(p1 * aantal_personages + p2, return_inverse=True)
+        self.persoon_nr1 = self._sleutels // aantal_personages if aantal_personages > 0 else self._sleutels
+        self.persoon_nr2 = self._sleutels % aantal_personages if aantal_personages > 0 else self._sleutels
+        self._paar_index = dict(zip(zip(self.persoon_nr1.tolist(), self.persoon_nr2.tolist()), range(len(self._sleutels))))
+        #kolom s van een prefixsom is het aantal tot en met seizoen s (kolom 0 is altijd 0)
+        dtype = _kleinste_dtype([self.aantal_seizoenen])
+        per_paar = np.zeros((len(self._sleutels), self.aantal_seizoenen + 1), dtype=dtype)
+        per_paar[paar, seizoenen] = 1
+        self._paar_prefix = np.cumsum(per_paar, axis=1, dtype=dtype)
+        per_personage = np.zeros((aantal_personages, self.aantal_seizoenen + 1), dtype=np.int64)
+        np.add.at(per_personage, (p1, seizoenen), 1)
+        np.add.at(per_personage, (p2, seizoenen), 1)
+        self._personage_prefix = np.cumsum(per_personage, axis=1).astype(_kleinste_dtype(per_personage.sum(axis=1)), copy=False)
+        self._totaal_prefix = np.cumsum(np.bincount(seizoenen, minlength=self.aantal_seizoenen + 1))
+        self._graden:OrderedDict[tuple[int, int], np.ndarray] = OrderedDict()
+        logger.debug("seizoenbereik met %d paren over %d seizoenen: %.1f MB", len(self._sleutels), self.aantal_seizoenen,
+                     (self._paar_prefix.nbytes + self._personage_prefix.nbytes) / 1e6)
+
+    def duur(self, persoon_nr1:int, persoon_nr2:int, seizoen_van:Optional[int]=None, seizoen_tot:Optional[int]=None) -> int:
+        """Geeft het aantal seizoenen in het bereik met een relatie tussen de twee personages"""
+        van, tot = self._bereik(seizoen_van, seizoen_tot, persoon_nr1, persoon_nr2)
+        rij = self._paar_index.get((min(persoon_nr1, persoon_nr2), max(persoon_nr1, persoon_nr2)))
+        if rij is None or van > tot:
+            return 0
+        return int(self._paar_prefix[rij, tot]) - int(self._paar_prefix[rij, van - 1])
+
+    def bestaat(self, persoon_nr1:int, persoon_nr2:int, seizoen_van:Optional[int]=None, seizoen_tot:Optional[int]=None) -> bool:
+        """Geeft aan of de twee personages in minstens één seizoen van het bereik een relatie hadden"""
+        return self.duur(persoon_nr1, persoon_nr2, seizoen_van, seizoen_tot) > 0
+
+    def relatie_seizoenen(self, persoon_nr:int, seizoen_van:Optional[int]=None, seizoen_tot:Optional[int]=None) -> int:
+        """Geeft het aantal (partner, seizoen)-combinaties van een personage in het bereik"""
+        van, tot = self._bereik(seizoen_van, seizoen_tot, persoon_nr)
+        if van > tot:
+            return 0
+        return int(self._personage_prefix[persoon_nr, tot]) - int(self._personage_prefix[persoon_nr, van - 1])
+
+    def aantal_relaties(self, seizoen_van:Optional[int]=None, seizoen_tot:Optional[int]=None) -> int:
+        """Geeft het aantal relaties in het bereik, één per paar en per seizoen"""
+        van, tot = self._bereik(seizoen_van, seizoen_tot)
+        if van > tot:
+            return 0
+        return int(self._totaal_prefix[tot] - self._totaal_prefix[van - 1])
+
+    def graad(self, persoon_nr:int, seizoen_van:Optional[int]=None, seizoen_tot:Optional[int]=None) -> int:
+        """Geeft het aantal verschillende personages waarmee een personage in het bereik een relatie had"""
+        self._bereik(seizoen_van, seizoen_tot, persoon_nr)
+        return int(self.graden(seizoen_van, seizoen_tot)[persoon_nr])
+
+    def graden(self, seizoen_van:Optional[int]=None, seizoen_tot:Optional[int]=None) -> np.ndarray:
+        """Geeft de graad van elk personage in het bereik (zie graad)"""
+        bereik = self._bereik(seizoen_van, seizoen_tot)
+        graden = self._graden.get(bereik)
+        if graden is not None:
+            self._graden.move_to_end(bereik)
+            return graden
+        actief = self._duur_alle_paren(*bereik) > 0
+        graden = (np.bincount(self.persoon_nr1[actief], minlength=self.aantal_personages) +
+                  np.bincount(self.persoon_nr2[actief], minlength=self.aantal_personages))
+        graden.flags.writeable = False
+        self._graden[bereik] = graden
+        if len(self._graden) > self.cache_grootte:
+            self._graden.popitem(last=False)
+        return graden
+
+    def duur_paren(self, persoon_nrs1:np.ndarray, persoon_nrs2:np.ndarray,
+                   seizoen_van:Optional[int]=None, seizoen_tot:Optional[int]=None) -> np.ndarray:
+        """Geeft de duur in het bereik voor veel paren tegelijk (0 voor een paar zonder relatie)"""
+        persoon_nrs1, persoon_nrs2 = np.asarray(persoon_nrs1, dtype=np.int64), np.asarray(persoon_nrs2, dtype=np.int64)
+        van, tot = self._bereik(seizoen_van, seizoen_tot, *np.concatenate((persoon_nrs1, persoon_nrs2)).tolist())
+        duur = np.zeros(len(persoon_nrs1), dtype=np.int64)
+        if van > tot or len(self._sleutels) == 0:
+            return duur
+        gezocht = np.minimum(persoon_nrs1, persoon_nrs2) * self.aantal_personages + np.maximum(persoon_nrs1, persoon_nrs2)
+        rijen = np.minimum(np.searchsorted(self._sleutels, gezocht), len(self._sleutels) - 1)
+        gevonden = self._sleutels[rijen] == gezocht
+        rijen = rijen[gevonden]
+        duur[gevonden] = self._paar_prefix[rijen, tot].astype(np.int64) - self._paar_prefix[rijen, van - 1]
+        return duur
+
+    def actieve_relaties(self, seizoen_van:Optional[int]=None, seizoen_tot:Optional[int]=None) -> np.ndarray:
+        """Geeft de paren met een relatie in het bereik
+
+        Returns
+        -------
+        np.ndarray
+             array (aantal paren, 3) met persoon_nr1 < persoon_nr2 en het aantal seizoenen in het bereik, gesorteerd op de personages
+        """
+        duur = self._duur_alle_paren(*self._bereik(seizoen_van, seizoen_tot))
+        actief = duur > 0
+        return np.column_stack((self.persoon_nr1[actief], self.persoon_nr2[actief], duur[actief]))
+
+    def _duur_alle_paren(self, van:int, tot:int) -> np.ndarray:
+        if van > tot:
+            return np.zeros(len(self._sleutels), dtype=np.int64)
+        return self._paar_prefix[:, tot].astype(np.int64) - self._paar_prefix[:, van - 1]
+
+    def _bereik(self, seizoen_van:Optional[int], seizoen_tot:Optional[int], *persoon_nrs:int) -> tuple[int, int]:
+        for persoon_nr in persoon_nrs:
+            if not 0 <= persoon_nr < self.aantal_personages:
+                raise ValueError(f"personagenummer {persoon_nr} bestaat niet (0 tot {self.aantal_personages - 1})")
+        #de seizoenen beginnen bij 1; een bereik buiten de seizoenen wordt afgekapt
+        van = max(1, 1 if seizoen_van is None else int(seizoen_van))
+        tot = min(self.aantal_seizoenen, self.aantal_seizoenen if seizoen_tot is None else int(seizoen_tot))
+        return van, tot
@@ -0,0 +1,137 @@
+import logging
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from thuis_graaf_utils import unieke_relaties, KOLOM_SEIZOEN, KOLOM_PERSOON_NR1, KOLOM_PERSOON_NR2, _aantal_personages
+
+# Clusters (groepen personages die via relaties met elkaar verbonden zijn) met een union-find die de
+# seizoenen één na één toevoegt. De union gebeurt op grootte en zonder padcompressie: een personage krijgt
+# dan maar één keer een ouder, en het seizoen waarin dat gebeurt wordt bewaard. Zo kunnen de clusters na
+# elk seizoen achteraf opgevraagd worden zonder ze opnieuw te berekenen.
+NOOIT = np.iinfo(np.int32).max     # samengevoegd_in van een personage dat tot het einde een cluster vertegenwoordigt
+
+logger = logging.getLogger(__name__)
+
+class ClusterGeschiedenis(NamedTuple):
+    """De clusters na elk seizoen (cumulatief, alle relaties tot en met het seizoen) en binnen elk seizoen
+
+    Een cluster wordt aangeduid met het nummer van één van zijn personages (de wortel).
+    """
+    seizoenen: np.ndarray          # de seizoenen met relaties, oplopend
+    ouder: np.ndarray              # per personage het personage waarin zijn cluster opging (zichzelf voor een wortel)
+    samengevoegd_in: np.ndarray    # per personage het seizoen waarin het geen wortel meer was (NOOIT)
+    aantal_clusters: np.ndarray    # per seizoen het aantal cumulatieve clusters met minstens twee personages
+    grootste_cluster: np.ndarray   # per seizoen de grootte van de grootste cumulatieve cluster
+    samenvoegingen: np.ndarray     # (seizoen, wortel, opgenomen wortel, nieuwe grootte) per samenvoeging van twee clusters
+    per_seizoen: dict[int, list[np.ndarray]]   # per seizoen de clusters binnen dat seizoen, van groot naar klein
+
+    def wortels(self, seizoen:int) -> np.ndarray:
+        """Geeft per personage de wortel van zijn cumulatieve cluster na het seizoen
+
+        Elke stap volgt voor alle personages tegelijk de ouder zolang die al gekozen was in het seizoen.
+        Door de union op grootte zijn er hoogstens log2(aantal personages) stappen.
+        """
+        wortels = np.arange(len(self.ouder))
+        verder = self.samengevoegd_in <= seizoen
+        while verder.any():
+            wortels[verder] = self.ouder[wortels[verder]]
+            verder = self.samengevoegd_in[wortels] <= seizoen
+        return wortels
+
+    def groottes(self, seizoen:int) -> np.ndarray:
+        """Geeft per personage de grootte van zijn cumulatieve cluster na het seizoen (1 zonder relaties)"""
+        wortels = self.wortels(seizoen)
+        return np.bincount(wortels, minlength=len(wortels))[wortels]
+
+    def clusters(self, seizoen:int, min_grootte:int=2) -> list[np.ndarray]:
+        """Geeft de cumulatieve clusters na het seizoen als gesorteerde personagenummers, van groot naar klein"""
+        return _groepeer(np.arange(len(self.ouder)), self.wortels(seizoen), min_grootte)
+
+def maak_cluster_geschiedenis(relatie_arr:np.ndarray, aantal_personages:Optional[int]=None) -> ClusterGeschiedenis:
+    """Berekent de clusters na elk seizoen en binnen elk seizoen in één doorgang over de relaties
+
+    Parameters
+    ----------
+    relatie_arr: np.ndarray
+         de relaties (seizoen, persoon_nr1, persoon_nr2), zie thuis_graaf_utils.lees_relatie_arr
+    aantal_personages: int, optional
+         standaard het hoogste personagenummer + 1
+
+    Returns
+    -------
+    ClusterGeschiedenis
+         de geschiedenis. De kost is O(aantal relaties * log(aantal personages)) plus het sorteren van de relaties
+    """
+    if aantal_personages is None:
+        aantal_personages = _aantal_personages(relatie_arr)
+    relaties = unieke_relaties(relatie_arr)
+    seizoenen = relaties[:, KOLOM_SEIZOEN].tolist()
+    p1 = relaties[:, KOLOM_PERSOON_NR1].tolist()
+    p2 = relaties[:, KOLOM_PERSOON_NR2].tolist()
+    ouder = list(range(aantal_personages))
+    grootte = [1] * aantal_personages
+    samengevoegd_in = [int(NOOIT)] * aantal_personages
+    samenvoegingen = []
+    seizoen_lijst, aantal_clusters, grootste_cluster = [], [], []
+    per_seizoen:dict[int, list[np.ndarray]] = {}
+    clusters = 0
+    grootste = 1
+    begin = 0
+    while begin < len(seizoenen):
+        seizoen = seizoenen[begin]
+        einde = begin
+        seizoen_ouder:dict[int, int] = {}      #union-find binnen het seizoen, enkel voor de personages van het seizoen
+        while einde < len(seizoenen) and seizoenen[einde] == seizoen:
+            a, b = p1[einde], p2[einde]
+            _verenig_seizoen(seizoen_ouder, a, b)
+            a, b = _wortel(ouder, a), _wortel(ouder, b)
+            if a != b:
+                if grootte[a] < grootte[b]:
+                    a, b = b, a
+                clusters += 1 - (grootte[a] >= 2) - (grootte[b] >= 2)
+                ouder[b] = a
+                grootte[a] += grootte[b]
+                samengevoegd_in[b] = seizoen
+                grootste = max(grootste, grootte[a])
+                samenvoegingen.append((seizoen, a, b, grootte[a]))
+            einde += 1
+        personages = np.fromiter(seizoen_ouder, dtype=np.int64, count=len(seizoen_ouder))
+        per_seizoen[seizoen] = _groepeer(personages, np.array([_wortel_seizoen(seizoen_ouder, nr) for nr in personages.tolist()], dtype=np.int64), 2)
+        seizoen_lijst.append(seizoen)
+        aantal_clusters.append(clusters)
+        grootste_cluster.append(grootste)
+        begin = einde
+    logger.debug("%d samenvoegingen over %d seizoenen, %d clusters op het einde", len(samenvoegingen), len(seizoen_lijst), clusters)
+    return ClusterGeschiedenis(np.array(seizoen_lijst, dtype=np.int64), np.array(ouder, dtype=np.int64),
+                               np.array(samengevoegd_in, dtype=np.int32), np.array(aantal_clusters, dtype=np.int64),
+                               np.array(grootste_cluster, dtype=np.int64), np.array(samenvoegingen, dtype=np.int64).reshape(-1, 4),
+                               per_seizoen)
+
+def _wortel(ouder:list[int], nr:int) -> int:
+    #zonder padcompressie: de ouders en samengevoegd_in moeten de geschiedenis blijven beschrijven
+    while ouder[nr] != nr:
+        nr = ouder[nr]
+    return nr
+
+def _wortel_seizoen(ouder:dict[int, int], nr:int) -> int:
+    #binnen een seizoen mag het pad wel ingekort worden (halvering): enkel het resultaat wordt bewaard
+    while ouder[nr] != nr:
+        ouder[nr] = ouder[ouder[nr]]
+        nr = ouder[nr]
+    return nr
+
+def _verenig_seizoen(ouder:dict[int, int], a:int, b:int) -> None:
+    ouder.setdefault(a, a)
+    ouder.setdefault(b, b)
+    a, b = _wortel_seizoen(ouder, a), _wortel_seizoen(ouder, b)
+    if a != b:
+        ouder[max(a, b)] = min(a, b)
+
+def _groepeer(personages:np.ndarray, wortels:np.ndarray, min_grootte:int) -> list[np.ndarray]:
+    #groepeert de personages per wortel, van grote naar kleine groep (bij gelijke grootte op wortel)
+    volgorde = np.lexsort((personages, wortels))
+    personages, wortels = personages[volgorde], wortels[volgorde]
+    _, begin, aantallen = np.unique(wortels, return_index=True, return_counts=True)
+    groepen = [personages[b:b + a] for b, a in zip(begin.tolist(), aantallen.tolist()) if a >= min_grootte]
+    return sorted(groepen, key=len, reverse=True)
@@ -1,6 +1,21 @@
+import os
 import sqlite3
 import logging
 import json
+from csv import DictReader, DictWriter
+import threading
+from collections import defaultdict
+from contextlib import contextmanager, ExitStack
+from itertools import chain, islice
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+import thuis_metrics_utils
+from thuis_metrics_utils import tel, DB_STATEMENTS, DB_RIJEN, RESOLVER_OPZOEKINGEN, RESOLVER_ONOPGELOST
+from thuis_seizoen_utils import naar_masker, seizoen_bits_uit_paren
+from thuis_uitzonderingen_utils import naam_sleutel, naam_sleutels
+from thuis_typing import PersonageData, PersonageRecord, RelatiePersoonData, RelatieNrsData, OnopgelostPersonage
 
 
 DB_BESTAND ="thuis.db"
@@ -20,9 +35,89 @@ SQL_INSERT_PERSONAGE = \
 f"""INSERT INTO {TBL_PERSONAGE} (VOORNAAM, ACHTERNAAM, SEIZOENEN)
 VALUES (:voornaam, :achternaam, :seizoenen)
 """
+SQL_UPDATE_PERSONAGE = \
+f"""UPDATE {TBL_PERSONAGE} SET VOORNAAM = :voornaam, ACHTERNAAM = :achternaam, SEIZOENEN = :seizoenen
+WHERE ID = :id
+"""
+SQL_DELETE_PERSONAGE = f"DELETE FROM {TBL_PERSONAGE} WHERE ID = :id"
 SQL_SELECT_PERSONAGE_LIJST = f"SELECT ID, VOORNAAM, ACHTERNAAM, SEIZOENEN FROM {TBL_PERSONAGE}"
 
 SQL_SELECT_PERSONAGE_VOORNAAM = SQL_SELECT_PERSONAGE_LIJST + " WHERE VOORNAAM = :voornaam"
+SQL_SELECT_PERSONAGE_MAX_ID = f"SELECT COALESCE(MAX(ID), 0) FROM {TBL_PERSONAGE}"
+SQL_SELECT_PERSONAGE_IDS_VANAF = f"SELECT ID FROM {TBL_PERSONAGE} WHERE ID > :vorige_id ORDER BY ID"
+SQL_SELECT_PERSONAGE_TELLING = f"SELECT COUNT(*), COALESCE(MAX(ID), 0) FROM {TBL_PERSONAGE}"
+
+RELATIES_NRS_CSV = 'relaties_nrs.csv'
+RELATIE_NRS_HEADERS = list(RelatieNrsData.__annotations__.keys())
+BATCH_GROOTTE = 1000     # aantal rijen per executemany bij het bewaren van een stroom
+
+TBL_PERSONAGE_SEIZOEN = "PERSONAGE_SEIZOEN"
+SQL_CREATE_TBL_PERSONAGE_SEIZOEN = \
+f"""CREATE TABLE IF NOT EXISTS {TBL_PERSONAGE_SEIZOEN}(
+         PERSONAGE_ID INTEGER NOT NULL REFERENCES {TBL_PERSONAGE}(ID),
+         SEIZOEN INTEGER NOT NULL,
+         PRIMARY KEY (PERSONAGE_ID, SEIZOEN)
+) WITHOUT ROWID"""
+SQL_CREATE_IDX_PERSONAGE_SEIZOEN = f"CREATE INDEX idx_seizoen_personage ON {TBL_PERSONAGE_SEIZOEN} (SEIZOEN, PERSONAGE_ID)"
+SQL_DROP_TBL_PERSONAGE_SEIZOEN = f"DROP TABLE IF EXISTS {TBL_PERSONAGE_SEIZOEN}"
+SQL_INSERT_PERSONAGE_SEIZOEN = \
+f"""INSERT OR IGNORE INTO {TBL_PERSONAGE_SEIZOEN} (PERSONAGE_ID, SEIZOEN)
+VALUES (:personage_id, :seizoen)
+"""
+SQL_DELETE_PERSONAGE_SEIZOEN = f"DELETE FROM {TBL_PERSONAGE_SEIZOEN} WHERE PERSONAGE_ID = :id"
+SQL_SELECT_PERSONAGE_SEIZOEN = \
+f"""SELECT P.ID, P.VOORNAAM, P.ACHTERNAAM, P.SEIZOENEN FROM {TBL_PERSONAGE} P
+JOIN {TBL_PERSONAGE_SEIZOEN} PS ON PS.PERSONAGE_ID = P.ID
+WHERE PS.SEIZOEN = :seizoen
+ORDER BY P.ID"""
+SQL_SELECT_NR_SEIZOEN = f"SELECT PERSONAGE_ID - 1, SEIZOEN FROM {TBL_PERSONAGE_SEIZOEN}"
+SQL_SELECT_VOORNAAM_SEIZOEN = \
+f"""SELECT P.VOORNAAM, PS.SEIZOEN, P.ID FROM {TBL_PERSONAGE} P
+JOIN {TBL_PERSONAGE_SEIZOEN} PS ON PS.PERSONAGE_ID = P.ID
+ORDER BY P.ID"""
+
+TBL_RELATIE = "RELATIE"
+SQL_CREATE_TBL_RELATIE = \
+f"""CREATE TABLE IF NOT EXISTS {TBL_RELATIE}(
+         ID INTEGER PRIMARY KEY,
+         SEIZOEN INTEGER NOT NULL,
+         PERSOON_ID1 INTEGER NOT NULL REFERENCES {TBL_PERSONAGE}(ID),
+         PERSOON_ID2 INTEGER NOT NULL REFERENCES {TBL_PERSONAGE}(ID)
+)"""
+SQL_CREATE_IDX_RELATIE = [
+    f"CREATE INDEX idx_relatie_seizoen ON {TBL_RELATIE} (SEIZOEN)",
+    f"CREATE INDEX idx_relatie_persoon1 ON {TBL_RELATIE} (PERSOON_ID1, SEIZOEN)",
+    f"CREATE INDEX idx_relatie_persoon2 ON {TBL_RELATIE} (PERSOON_ID2, SEIZOEN)"
+]
+SQL_DROP_TBL_RELATIE = f"DROP TABLE IF EXISTS {TBL_RELATIE}"
+SQL_DELETE_RELATIE = f"DELETE FROM {TBL_RELATIE}"
+# In de databank beginnen de ID's bij 1, in relaties_nrs.csv beginnen de personagenummers bij 0
+SQL_INSERT_RELATIE = \
+f"""INSERT INTO {TBL_RELATIE} (SEIZOEN, PERSOON_ID1, PERSOON_ID2)
+VALUES (:seizoen, :persoon_nr1 + 1, :persoon_nr2 + 1)
+"""
+SQL_DELETE_RELATIE_SEIZOEN = f"DELETE FROM {TBL_RELATIE} WHERE SEIZOEN = :seizoen"
+SQL_SELECT_RELATIE = f"SELECT SEIZOEN, PERSOON_ID1 - 1, PERSOON_ID2 - 1 FROM {TBL_RELATIE}"
+SQL_SELECT_RELATIE_TELLING = f"SELECT COUNT(*) FROM {TBL_RELATIE}"
+# beide richtingen van een relatie, zodat een filter op één personage de index kan gebruiken
+SQL_SELECT_RELATIE_PARTNERS = \
+f"""SELECT PERSOON_ID1 AS PERSOON_ID, PERSOON_ID2 AS PARTNER_ID, SEIZOEN FROM {TBL_RELATIE}
+UNION ALL
+SELECT PERSOON_ID2, PERSOON_ID1, SEIZOEN FROM {TBL_RELATIE}"""
+SQL_SELECT_AANTAL_PARTNERS = \
+f"""SELECT PERSOON_ID - 1, COUNT(DISTINCT PARTNER_ID) AS AANTAL FROM ({SQL_SELECT_RELATIE_PARTNERS})
+WHERE SEIZOEN BETWEEN :seizoen_van AND :seizoen_tot
+GROUP BY PERSOON_ID
+ORDER BY AANTAL DESC, PERSOON_ID"""
+
+# Instellingen voor elke verbinding: WAL laat lezers en een schrijver gelijktijdig toe,
+# synchronous=NORMAL is veilig in WAL-modus en de cache is 64MB (negatief = in KiB)
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,
+    'temp_store': 'MEMORY'
+}
 
 logger = logging.getLogger(__name__)
 def adapt_to_blob(lijst):
@@ -32,104 +127,506 @@ def adapt_to_blob(lijst):
 def convert_to_list(blob):
     return json.loads(blob)
 
-sqlite3.register_converter('blob', convert_to_list)
-sqlite3.register_adapter(list, adapt_to_blob)
+_verbindingen = threading.local()     # één blijvende verbinding per thread
+_types_geregistreerd = False          # de adapter en converter voor lijsten worden pas bij de eerste verbinding geregistreerd
 
-def lees_personages_voornaam(voornaam):
-    personages = []
+@contextmanager
+def verbind() -> Iterator[sqlite3.Connection]:
+    """Geeft een verbinding met de databank voor één transactie
+
+    De verbinding wordt bij het eerste gebruik geopend met de PRAGMAS en daarna hergebruikt (per thread).
+    Bij het verlaten van het with-blok wordt de transactie bevestigd, of teruggedraaid bij een fout.
+
+    Yields
+    ------
+    sqlite3.Connection
+         de verbinding met DB_BESTAND
+    """
+    conn = _get_verbinding()
+    actief = thuis_metrics_utils.is_actief()
+    if getattr(_verbindingen, 'metrics', False) != actief:
+        conn.set_trace_callback(_tel_statement if actief else None)   #telt elk uitgevoerd statement (ook per rij van executemany)
+        _verbindingen.metrics = actief
+    wijzigingen = conn.total_changes
     try:
-        conn:sqlite3.Connection = sqlite3.connect(DB_BESTAND, detect_types=sqlite3.PARSE_DECLTYPES|sqlite3.PARSE_COLNAMES, autocommit=False) # type: ignore
-        cursor = conn.cursor();
-        cursor.execute(SQL_SELECT_PERSONAGE_VOORNAAM, {'voornaam':voornaam})
-        for row in cursor:
-            personage = {
-                'id': row[0],
-                'voornaam' : row[1],
-                'achternaam' : row[2],
-                'seizoenen' : row[3]
-            }
-            personages.append(personage)
-        
-        return personages
+        yield conn
+        conn.commit()
+        tel(DB_RIJEN, conn.total_changes - wijzigingen)
+    except BaseException:
+        conn.rollback()
+        raise
 
-    except (sqlite3.Error) as error:
-        logger.error(error)
-        if personage is not None:
-            logger.error("error treedt op bij %", personage )
-    finally:
+def sluit_db() -> None:
+    """Sluit de blijvende verbinding van deze thread"""
+    conn = getattr(_verbindingen, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _verbindingen.conn = None
+        logger.debug("sluit_db: Databank afgesloten")
+
+def _get_verbinding() -> sqlite3.Connection:
+    conn = getattr(_verbindingen, 'conn', None)
+    if conn is None or getattr(_verbindingen, 'db_bestand', None) != DB_BESTAND:
         if conn is not None:
             conn.close()
-            logger.info("lees_personages: Databank afgesloten")
+        _registreer_types()
+        conn = sqlite3.connect(DB_BESTAND, detect_types=sqlite3.PARSE_DECLTYPES|sqlite3.PARSE_COLNAMES, autocommit=True) # type: ignore
+        for naam, waarde in PRAGMAS.items():
+            conn.execute(f"PRAGMA {naam}={waarde}")   #journal_mode kan niet gewijzigd worden binnen een transactie
+        conn.autocommit = False # type: ignore
+        logger.info("verbonden met databank %s", DB_BESTAND)
+        _verbindingen.conn = conn
+        _verbindingen.db_bestand = DB_BESTAND
+        _verbindingen.metrics = False
+    return conn
+
+def _registreer_types() -> None:
+    #de registratie geldt voor heel sqlite3 in het proces: niet bij het importeren, enkel wanneer de databank gebruikt wordt
+    global _types_geregistreerd
+    if not _types_geregistreerd:
+        sqlite3.register_converter('blob', convert_to_list)
+        sqlite3.register_adapter(list, adapt_to_blob)
+        _types_geregistreerd = True
+
+def _tel_statement(statement:str) -> None:
+    tel(DB_STATEMENTS)
+
+def lees_personages_voornaam(voornaam):
+    try:
+        with verbind() as conn:
+            cursor = conn.execute(SQL_SELECT_PERSONAGE_VOORNAAM, {'voornaam':voornaam})
+            return [_maak_personage(row) for row in cursor]
+    except (sqlite3.Error) as error:
+        logger.error(error)
+        logger.error("error treedt op bij %s", voornaam)
 
 def lees_personages():
-    personages = []
     try:
-        conn:sqlite3.Connection = sqlite3.connect(DB_BESTAND, detect_types=sqlite3.PARSE_DECLTYPES|sqlite3.PARSE_COLNAMES, autocommit=False) # type: ignore
-        cursor = conn.cursor();
-        cursor.execute(SQL_SELECT_PERSONAGE_LIJST)
-        for row in cursor:
-            personage = {
-                'id': row[0],
-                'voornaam' : row[1],
-                'achternaam' : row[2],
-                'seizoenen' : row[3]
-            }
-            personages.append(personage)
-        
-        return personages
+        with verbind() as conn:
+            cursor = conn.execute(SQL_SELECT_PERSONAGE_LIJST)
+            return [_maak_personage(row) for row in cursor]
     except (sqlite3.Error) as error:
         logger.error(error)
-        if personage is not None:
-            logger.error("error treedt op bij %", personage )
-    finally:
-        if conn is not None:
-            conn.close()
-            logger.info("lees_personages: Databank afgesloten")
 
-def bewaar_personage_lijst(lijst):
+def lees_seizoen_bits(aantal_seizoenen:Optional[int]=None) -> np.ndarray:
+    """Leest de seizoenen van alle personages als bitarray (zie thuis_seizoen_utils)
+
+    Returns
+    -------
+    np.ndarray
+         array (aantal personages, woorden) met uint64-woorden. Rij i hoort bij personagenummer i (ID - 1)
+    """
+    with verbind() as conn:
+        aantal_personages = conn.execute(SQL_SELECT_PERSONAGE_MAX_ID).fetchone()[0]
+        paren = np.array(conn.execute(SQL_SELECT_NR_SEIZOEN).fetchall(), dtype=np.int64).reshape(-1, 2)
+    return seizoen_bits_uit_paren(paren[:, 0], paren[:, 1], aantal_personages, aantal_seizoenen)
+
+def lees_personage_index() -> dict[tuple[str, int], list[int]]:
+    """Leest alle personages één keer en maakt een index op (voornaam, seizoen)
+
+    De voornaam in de sleutel is thuis_uitzonderingen_utils.naam_sleutel(voornaam): aliassen zijn vervangen
+    en accenten en hoofdletters weggelaten.
+
+    Returns
+    -------
+    dict[tuple[str, int], list[int]]
+         de personagenummers (ID in de databank - 1, zoals in relaties_nrs.csv) per voornaam en seizoen
+    """
+    index = defaultdict(list)
+    with verbind() as conn:
+        for voornaam, seizoen, id in conn.execute(SQL_SELECT_VOORNAAM_SEIZOEN):
+            index[(naam_sleutel(voornaam), seizoen)].append(id - 1)
+    logger.info("personage index met %d sleutels", len(index))
+    return dict(index)
+
+def zoek_relatie_nrs(relaties:list[RelatiePersoonData], index:Optional[dict[tuple[str, int], list[int]]]=None) -> tuple[list[RelatieNrsData], list[OnopgelostPersonage]]:
+    """Vervangt de voornamen in een lijst relaties door de personagenummers
+
+    Een voornaam wordt gekoppeld aan een personage via de voornaam en het seizoen van de relatie. Een alias
+    (zie thuis_uitzonderingen_utils.ALIASSEN) of een andere schrijfwijze van de accenten vindt hetzelfde personage.
+
+    Parameters
+    ----------
+    relaties: list[RelatiePersoonData]
+         de relaties met voornamen (zoals in relaties_namen.csv)
+    index: dict[tuple[str, int], list[int]], optional
+         de index van lees_personage_index. Wordt gelezen uit de databank wanneer ze niet meegegeven wordt
+
+    Returns
+    -------
+    tuple[list[RelatieNrsData], list[OnopgelostPersonage]]
+         de relaties met personagenummers en de personages die niet (eenduidig) gevonden zijn.
+         Een relatie met een onbekend personage wordt overgeslagen. Wanneer er meerdere kandidaten zijn,
+         wordt het personage met het laagste nummer gebruikt (zoals voorheen) en wordt de naam ook gemeld.
+    """
+    if index is None:
+        index = lees_personage_index()
+    onopgelost:dict[tuple[str, int], OnopgelostPersonage] = {}
+    relatie_nrs = _zoek_relatie_nr_lijst(relaties, index, onopgelost)
+    tel(RESOLVER_OPZOEKINGEN, 2 * len(relaties))
+    tel(RESOLVER_ONOPGELOST, len(onopgelost))
+    if len(onopgelost) > 0:
+        logger.warning("%d personages niet (eenduidig) gevonden", len(onopgelost))
+    return relatie_nrs, list(onopgelost.values())
+
+def _zoek_relatie_nr_lijst(relaties:list[RelatiePersoonData], index:dict[tuple[str, int], list[int]],
+                           onopgelost:dict[tuple[str, int], OnopgelostPersonage]) -> list[RelatieNrsData]:
+    #de sleutel wordt één keer per verschillende voornaam berekend, niet per relatie
+    sleutels = naam_sleutels(chain.from_iterable((relatie['persoon_1'], relatie['persoon_2']) for relatie in relaties))
+    return [relatie_nr for relatie_nr in (_zoek_relatie_nr(relatie, index, sleutels, onopgelost) for relatie in relaties) if relatie_nr is not None]
+
+def _zoek_relatie_nr(relatie:RelatiePersoonData, index:dict[tuple[str, int], list[int]], sleutels:dict[str, str],
+                     onopgelost:dict[tuple[str, int], OnopgelostPersonage]) -> Optional[RelatieNrsData]:
+    seizoen = int(relatie['seizoen'])
+    nrs = []
+    for voornaam in (relatie['persoon_1'], relatie['persoon_2']):
+        kandidaten = index.get((sleutels[voornaam], seizoen), [])
+        if len(kandidaten) != 1 and (voornaam, seizoen) not in onopgelost:
+            onopgelost[(voornaam, seizoen)] = {'voornaam': voornaam, 'seizoen': seizoen, 'kandidaten': kandidaten}
+        if len(kandidaten) > 0:
+            nrs.append(kandidaten[0])
+    if len(nrs) != 2:
+        return None
+    return {'seizoen': seizoen, 'persoon_nr1': nrs[0], 'persoon_nr2': nrs[1]}
+
+def bewaar_personage_lijst(lijst, bulk=True):
+    """Bewaart de personages in de databank en vult de ID van elk personage in
+
+    Parameters
+    ----------
+    lijst: list[PersonageData]
+         de personages. Na afloop bevat elk personage de sleutel 'id'
+    bulk: bool, optional
+         True => alle personages met één executemany in één transactie
+         False => één insert per personage (zoals voorheen)
+    """
     personage = None
     try:
-        conn:sqlite3.Connection = sqlite3.connect(DB_BESTAND, detect_types=sqlite3.PARSE_DECLTYPES|sqlite3.PARSE_COLNAMES, autocommit=False) # type: ignore
-        cursor = conn.cursor();
-        for personage in lijst:
-            id = _bewaar_personage(cursor, personage)
-            logger.debug("personage toegevoegd met id %d", id)
-            personage['id'] = id
-        personage = None
-        conn.commit()
+        with verbind() as conn:
+            cursor = conn.cursor()
+            if bulk:
+                _bewaar_personage_batch(cursor, lijst)
+                logger.debug("%d personages toegevoegd", len(lijst))
+            else:
+                for personage in lijst:
+                    id = _bewaar_personage(cursor, personage)
+                    logger.debug("personage toegevoegd met id %d", id)
+                    personage['id'] = id
+                personage = None
+                _bewaar_personage_seizoenen(cursor, lijst)
     except (sqlite3.Error) as error:
         logger.error(error)
         if personage is not None:
-            logger.error("error treedt op bij %", personage )
+            logger.error("error treedt op bij %s", personage )
+
+def bewaar_personage_stroom(personages:Iterable[PersonageData], batch_grootte:int=BATCH_GROOTTE) -> int:
+    """Bewaart personages uit een stroom (bv. thuis_html_utils.stroom_hoofdpersonages) per batch in de databank
+
+    Er is nooit meer dan één batch in het geheugen. Alle batches vormen één transactie: bij een fout in de
+    stroom of in de databank wordt niets bewaard. Elk personage krijgt de sleutel 'id', zoals bij
+    bewaar_personage_lijst (en met dezelfde ID's wanneer de personages in dezelfde volgorde komen).
+
+    Parameters
+    ----------
+    personages: Iterable[PersonageData]
+         de personages
+    batch_grootte: int, optional
+         het aantal personages per executemany
+
+    Returns
+    -------
+    int
+         het aantal bewaarde personages
+
+    Raises
+    ------
+    sqlite3.Error
+         wanneer de personages niet bewaard zijn (de transactie is teruggedraaid)
+    """
+    aantal = 0
+    try:
+        with verbind() as conn:
+            cursor = conn.cursor()
+            for batch in _batches(personages, batch_grootte):
+                _bewaar_personage_batch(cursor, batch)
+                aantal += len(batch)
+        logger.info("%d personages bewaard", aantal)
+    except (sqlite3.Error) as error:
+        #niet verder gaan: de relaties zouden gekoppeld worden aan een lege index
+        logger.error(error)
+        raise
+    return aantal
+
+def werk_personages_bij(gewijzigd:list, verwijderd:list[int]) -> None:
+    """Past bestaande personages aan (op basis van hun ID) en verwijdert personages, in één transactie
+
+    Parameters
+    ----------
+    gewijzigd: list[PersonageData]
+         de personages met hun nieuwe gegevens, elk met de sleutel 'id'
+    verwijderd: list[int]
+         de ID's van de personages die verwijderd moeten worden
+    """
+    try:
+        with verbind() as conn:
+            conn.executemany(SQL_UPDATE_PERSONAGE, gewijzigd)
+            ids = [{'id': personage['id']} for personage in gewijzigd] + [{'id': id} for id in verwijderd]
+            conn.executemany(SQL_DELETE_PERSONAGE_SEIZOEN, ids)
+            conn.executemany(SQL_DELETE_PERSONAGE, [{'id': id} for id in verwijderd])
+            personage_seizoenen = [{'personage_id': item['id'], 'seizoen': seizoen} for item in gewijzigd for seizoen in _seizoenen_lijst(item['seizoenen'])]
+            conn.executemany(SQL_INSERT_PERSONAGE_SEIZOEN, personage_seizoenen)
+        logger.info("%d personages aangepast, %d verwijderd", len(gewijzigd), len(verwijderd))
+    except (sqlite3.Error) as error:
+        logger.error(error)
+
+def laad_personages_csv(bestandsnamen:list[str]) -> None:
+    """Maakt de databank opnieuw en bewaart de personages uit de CSV-bestanden (hoofd-, neven- en gastpersonages)"""
+    personages = []
+    for bestandsnaam in bestandsnamen:
+        with open(bestandsnaam, mode='r', newline='', encoding='utf-8') as f:
+            reader = DictReader(f, delimiter=';')
+            personages.extend(reader)
+    init_db()
+    bewaar_personage_lijst(personages)
+
+def bewaar_relaties(relatie_nrs:list[RelatieNrsData]) -> None:
+    """Vervangt de relaties in de databank door de gegeven relaties (met personagenummers zoals in relaties_nrs.csv)"""
+    try:
+        with verbind() as conn:
+            conn.execute(SQL_DELETE_RELATIE)
+            conn.executemany(SQL_INSERT_RELATIE, relatie_nrs)
+        logger.info("%d relaties bewaard", len(relatie_nrs))
+    except (sqlite3.Error) as error:
+        logger.error(error)
+
+def vervang_relaties_seizoenen(seizoenen:list[int], relatie_nrs:list[RelatieNrsData]) -> None:
+    """Vervangt enkel de relaties van de gegeven seizoenen door de gegeven relaties"""
+    try:
+        with verbind() as conn:
+            conn.executemany(SQL_DELETE_RELATIE_SEIZOEN, [{'seizoen': seizoen} for seizoen in seizoenen])
+            conn.executemany(SQL_INSERT_RELATIE, relatie_nrs)
+        logger.info("%d relaties bewaard voor %d seizoenen", len(relatie_nrs), len(seizoenen))
+    except (sqlite3.Error) as error:
+        logger.error(error)
+
+def bewaar_relatie_stroom(relaties:Iterable[RelatiePersoonData], index:Optional[dict[tuple[str, int], list[int]]]=None,
+                          batch_grootte:int=BATCH_GROOTTE, relaties_nrs_csv:Optional[str]=None) -> list[OnopgelostPersonage]:
+    """Koppelt relaties uit een stroom (bv. thuis_html_utils.stroom_relaties) aan personagenummers en bewaart ze per batch
+
+    De relaties in de databank worden vervangen, in één transactie. De koppeling gebeurt zoals in zoek_relatie_nrs.
+
+    Parameters
+    ----------
+    relaties: Iterable[RelatiePersoonData]
+         de relaties met voornamen
+    index: dict[tuple[str, int], list[int]], optional
+         de index van lees_personage_index. Wordt gelezen uit de databank wanneer ze niet meegegeven wordt
+    batch_grootte: int, optional
+         het aantal relaties per executemany
+    relaties_nrs_csv: str, optional
+         bewaar de relaties met personagenummers ook in dit CSV-bestand (bv. RELATIES_NRS_CSV)
+
+    Returns
+    -------
+    list[OnopgelostPersonage]
+         de personages die niet (eenduidig) gevonden zijn
+
+    Raises
+    ------
+    sqlite3.Error, OSError
+         wanneer de relaties niet bewaard zijn: de transactie is teruggedraaid en relaties_nrs_csv is niet vervangen
+    """
+    if index is None:
+        index = lees_personage_index()
+    onopgelost:dict[tuple[str, int], OnopgelostPersonage] = {}
+    aantal = 0
+    aantal_opzoekingen = 0
+    tijdelijk = None if relaties_nrs_csv is None else relaties_nrs_csv + '.tmp'
+    try:
+        with ExitStack() as stack:
+            writer = None
+            if tijdelijk is not None:
+                writer = DictWriter(stack.enter_context(open(tijdelijk, mode='w', newline='', encoding='utf-8')),
+                                    delimiter=';', fieldnames=RELATIE_NRS_HEADERS)
+                writer.writeheader()
+            with verbind() as conn:
+                conn.execute(SQL_DELETE_RELATIE)
+                for batch in _batches(relaties, batch_grootte):
+                    relatie_nrs = _zoek_relatie_nr_lijst(batch, index, onopgelost)
+                    conn.executemany(SQL_INSERT_RELATIE, relatie_nrs)
+                    if writer is not None:
+                        writer.writerows(relatie_nrs)
+                    aantal += len(relatie_nrs)
+                    aantal_opzoekingen += 2 * len(batch)
+        if tijdelijk is not None:
+            os.replace(tijdelijk, relaties_nrs_csv)
+        logger.info("%d relaties bewaard", aantal)
+    except (sqlite3.Error, OSError) as error:
+        logger.error(error)
+        raise
     finally:
-        if conn is not None:
-            conn.close()
-            logger.debug("bewaar_personage_lijst: Databank afgesloten")
+        #na een fout geen half geschreven bestand achterlaten (na os.replace bestaat het niet meer)
+        if tijdelijk is not None and os.path.exists(tijdelijk):
+            os.remove(tijdelijk)
+        tel(RESOLVER_OPZOEKINGEN, aantal_opzoekingen)
+        tel(RESOLVER_ONOPGELOST, len(onopgelost))
+    if len(onopgelost) > 0:
+        logger.warning("%d personages niet (eenduidig) gevonden", len(onopgelost))
+    return list(onopgelost.values())
+
+def laad_relaties_csv(bestandsnaam:str=RELATIES_NRS_CSV) -> None:
+    """Vervangt de relaties in de databank door de relaties uit relaties_nrs.csv"""
+    with open(bestandsnaam, mode='r', newline='', encoding='utf-8') as f:
+        reader = DictReader(f, delimiter=';')
+        relatie_nrs = [{key:int(value) for (key,value) in rij.items()} for rij in reader]
+    bewaar_relaties(relatie_nrs)
+
+def lees_personages_seizoen(seizoen:int) -> list[dict]:
+    """Geeft de personages die meespelen in een seizoen"""
+    try:
+        with verbind() as conn:
+            cursor = conn.execute(SQL_SELECT_PERSONAGE_SEIZOEN, {'seizoen': seizoen})
+            return [_maak_personage(row) for row in cursor]
+    except (sqlite3.Error) as error:
+        logger.error(error)
+
+def lees_relaties(seizoen_van:Optional[int]=None, seizoen_tot:Optional[int]=None, persoon_nr:Optional[int]=None) -> list[RelatieNrsData]:
+    """Geeft de relaties uit de databank, eventueel gefilterd op seizoenen en personage
+
+    Parameters
+    ----------
+    seizoen_van: int, optional
+         het eerste seizoen (inclusief)
+    seizoen_tot: int, optional
+         het laatste seizoen (inclusief)
+    persoon_nr: int, optional
+         het personagenummer (ID - 1) dat in de relatie moet voorkomen
+
+    Returns
+    -------
+    list[RelatieNrsData]
+         de relaties met personagenummers zoals in relaties_nrs.csv
+    """
+    voorwaarden = []
+    parameters = {}
+    if seizoen_van is not None:
+        voorwaarden.append("SEIZOEN >= :seizoen_van")
+        parameters['seizoen_van'] = seizoen_van
+    if seizoen_tot is not None:
+        voorwaarden.append("SEIZOEN <= :seizoen_tot")
+        parameters['seizoen_tot'] = seizoen_tot
+    if persoon_nr is not None:
+        voorwaarden.append("(PERSOON_ID1 = :persoon_id OR PERSOON_ID2 = :persoon_id)")
+        parameters['persoon_id'] = persoon_nr + 1
+    sql = SQL_SELECT_RELATIE
+    if voorwaarden:
+        sql += " WHERE " + " AND ".join(voorwaarden)
+    sql += " ORDER BY ID"
+    try:
+        with verbind() as conn:
+            cursor = conn.execute(sql, parameters)
+            return [{'seizoen': row[0], 'persoon_nr1': row[1], 'persoon_nr2': row[2]} for row in cursor]
+    except (sqlite3.Error) as error:
+        logger.error(error)
+
+def tel_partners(seizoen_van:int=1, seizoen_tot:int=1_000_000) -> list[tuple[int, int]]:
+    """Geeft per personage het aantal verschillende personages waarmee het een relatie had tussen twee seizoenen
+
+    Returns
+    -------
+    list[tuple[int, int]]
+         (personagenummer, aantal partners), gesorteerd van groot naar klein aantal
+    """
+    try:
+        with verbind() as conn:
+            cursor = conn.execute(SQL_SELECT_AANTAL_PARTNERS, {'seizoen_van': seizoen_van, 'seizoen_tot': seizoen_tot})
+            return [(row[0], row[1]) for row in cursor]
+    except (sqlite3.Error) as error:
+        logger.error(error)
+
+def lees_vingerafdruk() -> Optional[dict[str, int]]:
+    """Geeft een vingerafdruk van de databank om te controleren of ze sinds een vorige keer nog dezelfde is
+
+    schema_versie wordt door sqlite verhoogd bij elke DROP of CREATE TABLE, dus ook wanneer init_db de databank
+    opnieuw maakt (bv. laad_personages_csv of de stap databank van thuis_pipeline). De aantallen en de hoogste ID
+    veranderen bij elke toevoeging of verwijdering.
+
+    Returns
+    -------
+    dict[str, int]
+         schema_versie, personages, max_id en relaties, of None wanneer er (nog) geen databank is
+    """
+    if not os.path.exists(DB_BESTAND):
+        return None
+    try:
+        with verbind() as conn:
+            schema_versie = conn.execute("PRAGMA schema_version").fetchone()[0]
+            personages, max_id = conn.execute(SQL_SELECT_PERSONAGE_TELLING).fetchone()
+            relaties = conn.execute(SQL_SELECT_RELATIE_TELLING).fetchone()[0]
+        return {'schema_versie': schema_versie, 'personages': personages, 'max_id': max_id, 'relaties': relaties}
+    except (sqlite3.Error) as error:
+        logger.error(error)
+        return None
 
 def init_db():
     try:
-        conn = sqlite3.connect(DB_BESTAND, detect_types=sqlite3.PARSE_DECLTYPES|sqlite3.PARSE_COLNAMES, autocommit=False) # type: ignore
-        logger.info("verbonden met databank %s", DB_BESTAND)
-        cur = conn.execute(SQL_DROP_TBL_PERSONAGE)
-        logger.info("Databank is leeggemaakt")
-        cur.execute(SQL_CREATE_TBL_PERSONAGE)
-        cur.execute(SQL_CREATE_IDX_PERSONAGE)
-        conn.commit()
+        with verbind() as conn:
+            cur = conn.execute(SQL_DROP_TBL_RELATIE)
+            cur.execute(SQL_DROP_TBL_PERSONAGE_SEIZOEN)
+            cur.execute(SQL_DROP_TBL_PERSONAGE)
+            logger.info("Databank is leeggemaakt")
+            cur.execute(SQL_CREATE_TBL_PERSONAGE)
+            cur.execute(SQL_CREATE_IDX_PERSONAGE)
+            cur.execute(SQL_CREATE_TBL_PERSONAGE_SEIZOEN)
+            cur.execute(SQL_CREATE_IDX_PERSONAGE_SEIZOEN)
+            cur.execute(SQL_CREATE_TBL_RELATIE)
+            for sql in SQL_CREATE_IDX_RELATIE:
+                cur.execute(sql)
         logger.info("Databank opnieuw gecreëerd")
     except (sqlite3.Error) as error:
         logger.error(error)
-    finally:
-        if conn is not None:
-            conn.close()
-            logger.debug("init_db: Databank afgesloten")
 
+def _batches(rijen:Iterable, batch_grootte:int) -> Iterator[list]:
+    iterator = iter(rijen)
+    while batch := list(islice(iterator, batch_grootte)):
+        yield batch
+
+def _bewaar_personage_batch(cursor:sqlite3.Cursor, batch:list) -> None:
+    vorige_id = cursor.execute(SQL_SELECT_PERSONAGE_MAX_ID).fetchone()[0]
+    cursor.executemany(SQL_INSERT_PERSONAGE, batch)
+    #AUTOINCREMENT geeft binnen de transactie oplopende ID's in de volgorde van de inserts
+    ids = [row[0] for row in cursor.execute(SQL_SELECT_PERSONAGE_IDS_VANAF, {'vorige_id': vorige_id})]
+    for personage, id in zip(batch, ids):
+        personage['id'] = id
+    _bewaar_personage_seizoenen(cursor, batch)
+
+def _bewaar_personage_seizoenen(cursor:sqlite3.Cursor, personages:list) -> None:
+    personage_seizoenen = [{'personage_id': item['id'], 'seizoen': seizoen} for item in personages for seizoen in _seizoenen_lijst(item['seizoenen'])]
+    cursor.executemany(SQL_INSERT_PERSONAGE_SEIZOEN, personage_seizoenen)
+
+def _seizoenen_lijst(seizoenen) -> list[int]:
+    #seizoenen uit een CSV-bestand zijn nog een JSON-tekst
+    if seizoenen is None or seizoenen == '':
+        return []
+    if isinstance(seizoenen, str):
+        return json.loads(seizoenen)
+    return seizoenen
+
+def _maak_personage(row) -> PersonageRecord:
+    return {
+        'id': row[0],
+        'voornaam' : row[1],
+        'achternaam' : row[2],
+        'seizoenen' : row[3],
+        'seizoen_masker': naar_masker(row[3])
+    }
 
 def _bewaar_personage(cursor, personage):
     data={}
     data['voornaam'] = personage['voornaam']
     data['achternaam'] = personage['achternaam']
     data['seizoenen'] = personage['seizoenen']
-    logger.debug(f"insert {data}")
+    logger.debug("insert %s", data)
     cursor.execute(SQL_INSERT_PERSONAGE, personage)
     last_id = cursor.lastrowid
     return int(last_id)
\ No newline at end of file
@@ -0,0 +1,282 @@
+import logging
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from thuis_db_utils import RELATIES_NRS_CSV
+
+# kolommen van relatie_arr (zelfde volgorde als relaties_nrs.csv)
+KOLOM_SEIZOEN = 0
+KOLOM_PERSOON_NR1 = 1
+KOLOM_PERSOON_NR2 = 2
+
+logger = logging.getLogger(__name__)
+
+class Csr(NamedTuple):
+    """Sparse (CSR) adjacency-matrix: de buren van personage i zijn indices[indptr[i]:indptr[i+1]] (gesorteerd)
+
+    gewichten bevat voor elke buur het aantal seizoenen dat de relatie duurde.
+    """
+    indptr: np.ndarray
+    indices: np.ndarray
+    gewichten: np.ndarray
+
+    @property
+    def aantal_personages(self) -> int:
+        return len(self.indptr) - 1
+
+def lees_relatie_arr(bestandsnaam:str=RELATIES_NRS_CSV) -> np.ndarray:
+    """Leest relaties_nrs.csv in een array (seizoen, persoon_nr1, persoon_nr2)
+
+    Het type van de array is het kleinste integer type waarin alle waarden passen (niet beperkt tot uint8).
+
+    Returns
+    -------
+    np.ndarray
+         array met vorm (aantal relaties, 3)
+    """
+    relatie_arr = np.loadtxt(bestandsnaam, dtype=np.int64, delimiter=';', skiprows=1, ndmin=2).reshape(-1, 3)   #zonder relaties: (0, 3)
+    return relatie_arr.astype(_kleinste_dtype(relatie_arr), copy=False)
+
+def unieke_relaties(relatie_arr:np.ndarray) -> np.ndarray:
+    """Geeft de relaties zonder dubbels met persoon_nr1 < persoon_nr2, gesorteerd op seizoen en personages
+
+    Een relatie die twee keer in hetzelfde seizoen voorkomt, telt maar één keer (zoals in de adjacency-matrix).
+    Relaties van een personage met zichzelf worden genegeerd.
+    """
+    seizoenen = relatie_arr[:, KOLOM_SEIZOEN].astype(np.int64)
+    p1 = relatie_arr[:, KOLOM_PERSOON_NR1].astype(np.int64)
+    p2 = relatie_arr[:, KOLOM_PERSOON_NR2].astype(np.int64)
+    laag = np.minimum(p1, p2)
+    hoog = np.maximum(p1, p2)
+    geldig = laag != hoog
+    n = int(hoog.max()) + 1 if len(hoog) > 0 else 1
+    sleutels = np.unique((seizoenen[geldig] * n + laag[geldig]) * n + hoog[geldig])
+    resultaat = np.empty((len(sleutels), 3), dtype=np.int64)
+    resultaat[:, KOLOM_SEIZOEN] = sleutels // (n * n)
+    resultaat[:, KOLOM_PERSOON_NR1] = (sleutels // n) % n
+    resultaat[:, KOLOM_PERSOON_NR2] = sleutels % n
+    return resultaat.astype(_kleinste_dtype(resultaat), copy=False)
+
+def maak_csr(relatie_arr:np.ndarray, aantal_personages:Optional[int]=None,
+             seizoen_van:Optional[int]=None, seizoen_tot:Optional[int]=None) -> Csr:
+    """Maakt een symmetrische sparse adjacency-matrix van de relaties tussen twee seizoenen
+
+    Parameters
+    ----------
+    relatie_arr: np.ndarray
+         de relaties (seizoen, persoon_nr1, persoon_nr2), zie lees_relatie_arr
+    aantal_personages: int, optional
+         het aantal rijen van de matrix. Standaard het hoogste personagenummer + 1
+    seizoen_van: int, optional
+         het eerste seizoen (inclusief). Standaard alle seizoenen
+    seizoen_tot: int, optional
+         het laatste seizoen (inclusief). Standaard alle seizoenen
+
+    Returns
+    -------
+    Csr
+         de matrix. De gewichten zijn het aantal seizoenen van de relatie binnen het bereik
+    """
+    if aantal_personages is None:
+        aantal_personages = _aantal_personages(relatie_arr)
+    relaties = unieke_relaties(relatie_arr)
+    seizoenen = relaties[:, KOLOM_SEIZOEN]
+    masker = np.ones(len(relaties), dtype=bool)
+    if seizoen_van is not None:
+        masker &= seizoenen >= seizoen_van
+    if seizoen_tot is not None:
+        masker &= seizoenen <= seizoen_tot
+    return _maak_csr_uniek(relaties[masker], aantal_personages)
+
+def _maak_csr_uniek(relaties:np.ndarray, aantal_personages:int) -> Csr:
+    #relaties komt uit unieke_relaties (eventueel een deel ervan)
+    p1 = relaties[:, KOLOM_PERSOON_NR1].astype(np.int64)
+    p2 = relaties[:, KOLOM_PERSOON_NR2].astype(np.int64)
+    van = np.concatenate((p1, p2))
+    naar = np.concatenate((p2, p1))
+    sleutels, gewichten = np.unique(van * aantal_personages + naar, return_counts=True)
+    rijen = sleutels // aantal_personages
+    indptr = np.zeros(aantal_personages + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rijen, minlength=aantal_personages), out=indptr[1:])
+    indices = (sleutels % aantal_personages).astype(_kleinste_dtype(aantal_personages), copy=False)
+    return Csr(indptr, indices, gewichten.astype(_kleinste_dtype(gewichten), copy=False))
+
+def maak_csr_per_seizoen(relatie_arr:np.ndarray, aantal_personages:Optional[int]=None) -> dict[int, Csr]:
+    """Maakt een sparse adjacency-matrix per seizoen (de gewichten zijn dus altijd 1)
+
+    De relaties worden één keer ontdubbeld en gesorteerd; elke matrix wordt gemaakt uit het blok van zijn seizoen.
+    """
+    if aantal_personages is None:
+        aantal_personages = _aantal_personages(relatie_arr)
+    return _csr_per_seizoen(unieke_relaties(relatie_arr), np.unique(relatie_arr[:, KOLOM_SEIZOEN]), aantal_personages)
+
+def _csr_per_seizoen(relaties:np.ndarray, seizoenen:np.ndarray, aantal_personages:int) -> dict[int, Csr]:
+    #unieke_relaties is gesorteerd op seizoen: de relaties van een seizoen liggen in één aaneengesloten blok
+    seizoenen = np.asarray(seizoenen, dtype=np.int64)
+    kolom = relaties[:, KOLOM_SEIZOEN].astype(np.int64)
+    begin = np.searchsorted(kolom, seizoenen, side='left')
+    einde = np.searchsorted(kolom, seizoenen, side='right')
+    return {int(seizoen): _maak_csr_uniek(relaties[b:e], aantal_personages)
+            for seizoen, b, e in zip(seizoenen.tolist(), begin.tolist(), einde.tolist())}
+
+def werk_csr_per_seizoen_bij(csr_per_seizoen:dict[int, Csr], relatie_arr:np.ndarray, seizoenen:list[int],
+                             aantal_personages:Optional[int]=None) -> dict[int, Csr]:
+    """Maakt enkel de matrices van de gegeven seizoenen opnieuw (zie thuis_ververs_utils.ververs)
+
+    Wanneer het aantal personages veranderd is, worden alle matrices opnieuw gemaakt.
+    """
+    if aantal_personages is None:
+        aantal_personages = _aantal_personages(relatie_arr)
+    if any(csr.aantal_personages != aantal_personages for csr in csr_per_seizoen.values()):
+        return maak_csr_per_seizoen(relatie_arr, aantal_personages)
+    bijgewerkt = dict(csr_per_seizoen)
+    aanwezig = set(np.unique(relatie_arr[:, KOLOM_SEIZOEN]).tolist())
+    for seizoen in seizoenen:
+        if seizoen not in aanwezig:
+            bijgewerkt.pop(seizoen, None)
+    opnieuw = np.array([seizoen for seizoen in seizoenen if seizoen in aanwezig], dtype=np.int64)
+    if len(opnieuw) > 0:
+        bijgewerkt.update(_csr_per_seizoen(unieke_relaties(relatie_arr), opnieuw, aantal_personages))
+    return bijgewerkt
+
+def graad(csr:Csr) -> np.ndarray:
+    """Geeft het aantal verschillende personages waarmee elk personage een relatie had"""
+    return np.diff(csr.indptr)
+
+def buren(csr:Csr, persoon_nr:int) -> np.ndarray:
+    """Geeft de (gesorteerde) personagenummers waarmee een personage een relatie had"""
+    return csr.indices[csr.indptr[persoon_nr]:csr.indptr[persoon_nr + 1]]
+
+def relatie_duur(csr:Csr, persoon_nr1:int, persoon_nr2:int) -> int:
+    """Geeft het aantal seizoenen dat de relatie tussen twee personages duurde (0 wanneer er geen relatie was)"""
+    begin, einde = csr.indptr[persoon_nr1], csr.indptr[persoon_nr1 + 1]
+    positie = begin + np.searchsorted(csr.indices[begin:einde], persoon_nr2)
+    if positie < einde and csr.indices[positie] == persoon_nr2:
+        return int(csr.gewichten[positie])
+    return 0
+
+def lijst_driehoeken(csr:Csr) -> np.ndarray:
+    """Geeft alle driehoeksrelaties p1 <-> p2 <-> p3 <-> p1
+
+    De personages worden gerangschikt op graad. Elke relatie wijst naar het personage met de hoogste rang,
+    zodat elk personage hoogstens O(sqrt(m)) uitgaande relaties heeft. Voor elk paar uitgaande relaties
+    (een 'wig') wordt gecontroleerd of de derde relatie bestaat. Dat zijn in totaal O(m^1.5) controles.
+
+    Returns
+    -------
+    np.ndarray
+         array met vorm (aantal driehoeken, 3), elke driehoek één keer met de personagenummers oplopend gesorteerd
+    """
+    uit_indptr, uit_indices, _ = _orienteer(csr)
+    a, b = _paren_per_rij(uit_indptr)
+    if len(a) == 0:
+        return np.empty((0, 3), dtype=np.int64)
+    rijen = np.repeat(np.arange(csr.aantal_personages), np.diff(uit_indptr))
+    p1 = rijen[a]
+    p2 = uit_indices[a].astype(np.int64)
+    p3 = uit_indices[b].astype(np.int64)
+    bestaat = _bestaat_relatie(csr, p2, p3)
+    driehoeken = np.column_stack((p1[bestaat], p2[bestaat], p3[bestaat]))
+    driehoeken.sort(axis=1)
+    return driehoeken[np.lexsort(driehoeken.T[::-1])]
+
+def tel_driehoeken(csr:Csr) -> int:
+    """Geeft het aantal driehoeksrelaties (zie lijst_driehoeken)"""
+    return len(lijst_driehoeken(csr))
+
+def driehoeken_per_personage(csr:Csr) -> np.ndarray:
+    """Geeft voor elk personage het aantal driehoeksrelaties waarin het voorkomt
+
+    Dit is gelijk aan de diagonaal van A @ A @ A gedeeld door 2.
+    """
+    return np.bincount(lijst_driehoeken(csr).ravel(), minlength=csr.aantal_personages)
+
+def tel_driehoeken_per_seizoen(relatie_arr:np.ndarray, aantal_personages:Optional[int]=None) -> dict[int, int]:
+    """Geeft het aantal driehoeksrelaties binnen elk seizoen"""
+    return {seizoen: tel_driehoeken(csr) for seizoen, csr in maak_csr_per_seizoen(relatie_arr, aantal_personages).items()}
+
+def tel_vierhoeken(csr:Csr) -> int:
+    """Geeft het aantal cycli van 4 personages p1 <-> p2 <-> p3 <-> p4 <-> p1
+
+    Voor elk personage u met de hoogste rang in de cyclus worden de paden u - v - w geteld met v en w lager
+    gerangschikt dan u. Elk paar van zulke paden tussen dezelfde u en w vormt precies één cyclus.
+    """
+    n = csr.aantal_personages
+    rang = _rang(csr)
+    #sorteer de buren van elk personage op rang
+    rijen = np.repeat(np.arange(n), np.diff(csr.indptr))
+    buren_rang = rang[csr.indices]
+    volgorde = np.lexsort((buren_rang, rijen))
+    gesorteerde_buren = csr.indices[volgorde].astype(np.int64)
+    #voor elke buur u van v met hogere rang dan v: alle buren w van v met lagere rang dan u
+    posities = np.arange(len(gesorteerde_buren)) - csr.indptr[rijen]
+    hoger = rang[gesorteerde_buren] > rang[rijen]
+    u_index = np.nonzero(hoger)[0]
+    aantallen = posities[u_index]
+    w_index = np.repeat(u_index - aantallen, aantallen) + (np.arange(aantallen.sum()) - np.repeat(np.cumsum(aantallen) - aantallen, aantallen))
+    u = np.repeat(gesorteerde_buren[u_index], aantallen)
+    w = gesorteerde_buren[w_index]
+    _, paden = np.unique(u * n + w, return_counts=True)
+    return int((paden * (paden - 1) // 2).sum())
+
+def tel_driehoeken_matrix(csr:Csr) -> int:
+    """Telt de driehoeksrelaties met de matrixmethode (spoor van A @ A @ A / 6) om tel_driehoeken te controleren
+
+    De matrix wordt dense gemaakt met int64 zodat de tellingen niet overlopen. Enkel voor kleine aantallen personages.
+    """
+    adjacency = (naar_dense(csr) > 0).astype(np.int64)
+    return int(np.trace(adjacency @ adjacency @ adjacency)) // 6
+
+def naar_dense(csr:Csr) -> np.ndarray:
+    """Zet de sparse matrix om naar een dense matrix (enkel bedoeld voor kleine aantallen personages of om te vergelijken)"""
+    n = csr.aantal_personages
+    dense = np.zeros((n, n), dtype=np.int64)
+    rijen = np.repeat(np.arange(n), np.diff(csr.indptr))
+    dense[rijen, csr.indices] = csr.gewichten
+    return dense
+
+def _rang(csr:Csr) -> np.ndarray:
+    #rang volgens (graad, personagenummer): elk personage heeft een unieke rang
+    volgorde = np.lexsort((np.arange(csr.aantal_personages), graad(csr)))
+    rang = np.empty(csr.aantal_personages, dtype=np.int64)
+    rang[volgorde] = np.arange(csr.aantal_personages)
+    return rang
+
+def _orienteer(csr:Csr) -> Csr:
+    #houdt enkel de relaties van een personage naar een personage met een hogere rang
+    rang = _rang(csr)
+    rijen = np.repeat(np.arange(csr.aantal_personages), np.diff(csr.indptr))
+    masker = rang[rijen] < rang[csr.indices]
+    indptr = np.zeros_like(csr.indptr)
+    np.cumsum(np.bincount(rijen[masker], minlength=csr.aantal_personages), out=indptr[1:])
+    return Csr(indptr, csr.indices[masker], csr.gewichten[masker])
+
+def _paren_per_rij(indptr:np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    #alle paren posities (a, b) met a < b binnen dezelfde rij van een CSR-matrix
+    lengtes = np.diff(indptr)
+    rijen = np.repeat(np.arange(len(lengtes)), lengtes)
+    posities = np.arange(indptr[-1])
+    aantallen = indptr[rijen + 1] - posities - 1
+    a = np.repeat(posities, aantallen)
+    b = a + 1 + (np.arange(aantallen.sum()) - np.repeat(np.cumsum(aantallen) - aantallen, aantallen))
+    return a, b
+
+def _bestaat_relatie(csr:Csr, p1:np.ndarray, p2:np.ndarray) -> np.ndarray:
+    #de sleutels van de CSR-matrix zijn gesorteerd: rij * n + kolom
+    n = csr.aantal_personages
+    rijen = np.repeat(np.arange(n, dtype=np.int64), np.diff(csr.indptr))
+    sleutels = rijen * n + csr.indices
+    gezocht = p1 * n + p2
+    posities = np.minimum(np.searchsorted(sleutels, gezocht), len(sleutels) - 1)
+    return sleutels[posities] == gezocht
+
+def _aantal_personages(relatie_arr:np.ndarray) -> int:
+    if len(relatie_arr) == 0:
+        return 0
+    return int(relatie_arr[:, KOLOM_PERSOON_NR1:].max()) + 1
+
+def _kleinste_dtype(waarden) -> np.dtype:
+    maximum = int(np.max(waarden)) if np.size(waarden) > 0 else 0
+    minimum = int(np.min(waarden)) if np.size(waarden) > 0 else 0
+    return np.result_type(np.min_scalar_type(maximum), np.min_scalar_type(minimum))
@@ -4,10 +4,16 @@ import lxml.html
 from csv import DictWriter
 
 
-from thuis_typing import RelatiePersoonData
+from thuis_typing import RelatiePersoonData, PersonageData
+from thuis_uitzonderingen_utils import (_verwerk_personage_details_uitzonderingen, _verwerk_nevenpersonage_urls_uitzonderingen,
+                                        pas_aliassen_toe)
 
 RELATIE_HEADERS = list(RelatiePersoonData.__annotations__.keys())
 
+# XPath-equivalent van BeautifulSoup's class_='...': het attribuut class kan meerdere klassen bevatten
+XPATH_KLASSE = 'contains(concat(" ", normalize-space(@class), " "), " {} ")'
+SEIZOEN_ID_PATROON = re.compile(r'^gallery-[1-9][0-9]?')    # zelfde patroon als in thuis_html_utils
+
 logger = logging.getLogger(__name__)
 
 def extract_relaties(bestandsnaam: str, html:str) -> None:
@@ -17,29 +23,73 @@ def extract_relaties(bestandsnaam: str, html:str) -> None:
         writer.writeheader()
         writer.writerows(relaties)
 
+def _lees_personage_details(html:str) -> PersonageData:
+    root = lxml.html.fromstring(html)
+    titel_tag = root.xpath('//span[' + XPATH_KLASSE.format('mw-page-title-main') + ']')[0]
+    naam = titel_tag.text_content()
+    seizoenen = []
+    detail_data = root.xpath('//table[' + XPATH_KLASSE.format('userbox') + ']')
+    if len(detail_data) > 0:
+        td_tags = detail_data[0].xpath('.//td')
+        a_tags = td_tags[1].xpath('.//a')    #td_tags[0] bevat het label 'seizoenen'
+        for a_tag in a_tags:
+            seizoen = int(a_tag.text_content())
+            seizoenen.append(seizoen)
+    personage_details = _verwerk_personage_details_uitzonderingen(naam, seizoenen)
+    return personage_details
+
+def _lees_nevenpersonage_urls(html:str) -> list[str]:
+    data = []
+    root = lxml.html.fromstring(html)
+    huidige_nevenpersonages_tag = root.xpath('//*[@id="gallery-0"]')[0]
+    personage_tags = huidige_nevenpersonages_tag.xpath('.//*[' + XPATH_KLASSE.format('wikia-gallery-item') + ']')
+    for personage_tag in personage_tags:
+        url = personage_tag.xpath('(.//a)[1]/@href')[0]
+        data = _verwerk_nevenpersonage_urls_uitzonderingen(data, url)
+    vorige_nevenpersonages_tag = root.xpath('//table[' + XPATH_KLASSE.format('sortable') + ']')[0]
+    tr_tags = vorige_nevenpersonages_tag.xpath('.//tr')
+    for tr_tag in tr_tags[1:]:              #header overslaan
+        td_tags = tr_tag.xpath('.//td')
+        url = td_tags[2].xpath('(.//a)[1]/@href')[0]
+        data = _verwerk_nevenpersonage_urls_uitzonderingen(data, url)
+    return data
+
+def _lees_hoofdpersonage_urls(html:str) -> list[str]:
+    data = []
+    root = lxml.html.fromstring(html)
+    #Er zijn twee reeksen van personages, namelijk id='gallery-0' en id='gallery-1'
+    hoofdpersonage_tags = root.xpath('//*[@id="gallery-0" or @id="gallery-1"]')
+    for hoofdpersonage_tag in hoofdpersonage_tags:
+        personage_tags = hoofdpersonage_tag.xpath('.//*[' + XPATH_KLASSE.format('wikia-gallery-item') + ']')
+        for personage_tag in personage_tags:
+            url = personage_tag.xpath('(.//a)[1]/@href')[0]
+            data.append(url)
+    return data
+
 def _lees_relaties(html:str) -> list[RelatiePersoonData]:
     root = lxml.html.fromstring(html)
-    seizoenen_tags = root.xpath('//div[starts-with(@id, "gallery-")]')
-    logging.debug(f"{len(seizoenen_tags)} seizoenen inlezen")
+    seizoenen_tags = [tag for tag in root.xpath('//*[starts-with(@id, "gallery-")]') if SEIZOEN_ID_PATROON.match(tag.get('id'))]
+    logger.debug("%s vorige seizoenen inlezen", len(seizoenen_tags))
     data:list[RelatiePersoonData] = []
-    for seizoen_nr, seizoen_tag in enumerate(seizoenen_tags[1:],1):
+    seizoen_nr = 0
+    for seizoen_nr, seizoen_tag in enumerate(seizoenen_tags, 1):
         relaties = _lees_seizoen_relatie(seizoen_tag, seizoen_nr)
         data.extend(relaties)
+    laatste_seizoen_tag = root.xpath('//*[@id="gallery-0"]')[0]
     seizoen_nr += 1
-    relaties = _lees_seizoen_relatie(seizoenen_tags[0], seizoen_nr)
+    relaties = _lees_seizoen_relatie(laatste_seizoen_tag, seizoen_nr)
     data.extend(relaties)
-    return data
+    return pas_aliassen_toe(data)
 
 def _lees_seizoen_relatie(element:lxml.html.HtmlElement, seizoen_nr:int)->list[RelatiePersoonData]:
     data:list[RelatiePersoonData] = []
-    b_tags = element.xpath('.//div[@class="lightbox-caption"]/b')
+    b_tags = element.xpath('.//b')
     for b_tag in b_tags:
         tekst = b_tag.text_content()
         persoon_1, persoon_2 = tekst.split(' en ')
-        item = {'seizoen': seizoen_nr, 'persoon_1': persoon_1, 'persoon_2': persoon_2}
-        data.append(item)
-    logger.debug(f"{len(data)} relaties ingelezen voor seizoen {seizoen_nr}")
-    return data        
+        data.append({'seizoen': seizoen_nr, 'persoon_1': persoon_1, 'persoon_2': persoon_2})
+    logger.debug("%s relaties ingelezen voor seizoen %s", len(data), seizoen_nr)
+    return data
 
 
 
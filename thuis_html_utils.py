@@ -1,10 +1,27 @@
+import io
+import os
 import re
+import sys
 import logging
-from bs4 import BeautifulSoup, Tag
+from collections import deque
+from contextlib import ExitStack
 from csv import DictWriter
-from thuis_http_utils import get_url
+from types import ModuleType
+from typing import TYPE_CHECKING, Iterable, Iterator, TypeVar
 
-from thuis_typing import RelatiePersoonData, PersonageData
+import thuis_http_utils
+from thuis_http_utils import get_fileinfo, get_fileinfos, MAX_WORKERS
+from thuis_memo_utils import memoiseer, zoek_memo, bewaar_memo
+from thuis_metrics_utils import meet, PARSE
+from thuis_opslag_utils import lees_inhoud
+
+from thuis_typing import CacheInfoType, RelatiePersoonData, PersonageData
+from thuis_uitzonderingen_utils import (_verwerk_personage_details_uitzonderingen, _verwerk_nevenpersonage_urls_uitzonderingen,
+                                        pas_aliassen_toe)
+
+# bs4, lxml en multiprocessing worden pas ingeladen wanneer ze nodig zijn (zie _maak_soep, _get_parser en _stroom_personage_details)
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup, Tag
 
 RELATIE_HEADERS = list(RelatiePersoonData.__annotations__.keys())
 PERSONAGE_HEADERS = list(PersonageData.__annotations__.keys())
@@ -18,12 +35,26 @@ RELATIE_URL = BASIS_URL + "/nl/wiki/Relaties"
 HOOFDPERSONAGES_URL = BASIS_URL + "/nl/wiki/Hoofdpersonages"
 NEVENERSONAGES_URL = BASIS_URL + "/nl/wiki/Nevenpersonages"
 
+PARSER_BS4 = 'bs4'
+PARSER_LXML = 'lxml'
+PROCES_CHUNKSIZE = 16       # aantal pagina's dat per keer naar een proces gestuurd wordt
+BLOKKEN_PER_PROCES = 4      # een stroom parset PROCES_CHUNKSIZE * BLOKKEN_PER_PROCES pagina's per proces voor ze doorgegeven worden
+# forkserver maakt de processen vanuit een apart proces zonder threads: fork vanuit een proces met threads (zoals de
+# gelijktijdige stappen van thuis_pipeline) kan een lock kopiëren die op dat moment door een andere thread vastgehouden wordt
+PROCES_START = 'forkserver'
+PARSER_VERSIE = 2     # verhogen wanneer een _lees_*-functie (of een uitzondering) een ander resultaat geeft
+
 logger = logging.getLogger(__name__)
 
+T = TypeVar('T')
+
 def extract_gastpersonages() -> None:
     """Bewaart gastpersonages in gastpersonages.csv
     
     """
+    _schrijf_csv(GASTPERSONAGE_CSV, PERSONAGE_HEADERS, stroom_gastpersonages())
+
+def _lees_gastpersonages() -> list[PersonageData]:
     personages = [
         {'voornaam': 'Adam', 'achternaam': 'Kiabaté', 'seizoenen': [22]},
         {'voornaam': 'Alex', 'achternaam': 'Walters', 'seizoenen': [8,9]},         #onbekend personage
@@ -56,86 +87,252 @@ def extract_gastpersonages() -> None:
         {'voornaam': 'Wim', 'achternaam': 'Daniels', 'seizoenen': [11,12]},
         {'voornaam': 'Zosiane', 'achternaam': 'Pelckmans', 'seizoenen': [10]}
     ]
-    with open(GASTPERSONAGE_CSV, mode='w', newline='', encoding='utf-8') as f:
-        writer = DictWriter(f, delimiter=";",fieldnames=PERSONAGE_HEADERS)
-        writer.writeheader()
-        writer.writerows(personages)
+    return personages
 
-def extract_nevenpersonages(download=False) -> None:
+def extract_nevenpersonages(download=False, max_workers=MAX_WORKERS, parser=PARSER_BS4, processen=1) -> None:
     """Leest nevenpersonagedata en bewaart ze in nevenpersonages.csv
 
     Parameters
     ----------
     download: bool, optional
               Moet er contact worden opgenomen met de website om te controleren of het bestand gewijzigd is
+    max_workers: int, optional
+              Het aantal detailpagina's dat gelijktijdig wordt opgehaald (1 = één na één)
+    parser: str, optional
+              De parser die de HTML-pagina's leest: PARSER_BS4 (BeautifulSoup) of PARSER_LXML (lxml/XPath)
+    processen: int, optional
+              Het aantal processen dat de detailpagina's parset (1 = in dit proces, één na één)
     
     Raises
     ------
     IndexError
          Wanneer er en fout zit in de cache of een bestand niet wordt teruggevonden in de cache
+    ValueError
+         Wanneer de parser niet bestaat
     
     """
-    content = get_url(NEVENERSONAGES_URL, download)
-    urls = _lees_nevenpersonage_urls(content)
-    personage_data = []
-    for url in urls:
-        content = get_url(BASIS_URL+url, download)
-        nevenpersonage_data = _lees_personage_details(content)
-        personage_data.append(nevenpersonage_data)
-    with open(NEVENPERSONAGE_CSV, mode='w', newline='', encoding='utf-8') as f:
-        writer = DictWriter(f, delimiter=';', fieldnames=PERSONAGE_HEADERS)
-        writer.writeheader()
-        writer.writerows(personage_data)    
+    _schrijf_csv(NEVENPERSONAGE_CSV, PERSONAGE_HEADERS, stroom_nevenpersonages(download, max_workers, parser, processen))
 
-def extract_hoofdpersonages(download=False) -> None:
+def extract_hoofdpersonages(download=False, max_workers=MAX_WORKERS, parser=PARSER_BS4, processen=1) -> None:
     """Leest hoofdpersonagedata en bewaart ze in hoofdpersonages.csv
 
     Parameters
     ----------
     download: bool, optional
               Moet er contact worden opgenomen met de website om te controleren of het bestand gewijzigd is
+    max_workers: int, optional
+              Het aantal detailpagina's dat gelijktijdig wordt opgehaald (1 = één na één)
+    parser: str, optional
+              De parser die de HTML-pagina's leest: PARSER_BS4 (BeautifulSoup) of PARSER_LXML (lxml/XPath)
+    processen: int, optional
+              Het aantal processen dat de detailpagina's parset (1 = in dit proces, één na één)
     
     Raises
     ------
     IndexError
          Wanneer er en fout zit in de cache of een bestand niet wordt teruggevonden in de cache
+    ValueError
+         Wanneer de parser niet bestaat
     
     """
-    content = get_url(HOOFDPERSONAGES_URL, download)
-    urls = _lees_hoofdpersonage_urls(content)
-    personage_data = []
-    for url in urls:
-        content = get_url(BASIS_URL+url, download)
-        hoofdpersonage_data = _lees_personage_details(content)
-        personage_data.append(hoofdpersonage_data)
-    with open(HOOFDPERSONAGE_CSV, mode='w', newline='', encoding='utf-8') as f:
-        writer = DictWriter(f, delimiter=';', fieldnames=PERSONAGE_HEADERS)
-        writer.writeheader()
-        writer.writerows(personage_data)
+    _schrijf_csv(HOOFDPERSONAGE_CSV, PERSONAGE_HEADERS, stroom_hoofdpersonages(download, max_workers, parser, processen))
 
-def extract_relaties(download=False) -> None:
+def extract_relaties(download=False, parser=PARSER_BS4) -> None:
     """Leest relaties en bewaart ze in relaties_namen.csv
 
     Parameters
     ----------
     download: bool, optional
               Moet er contact worden opgenomen met de website om te controleren of het bestand gewijzigd is
+    parser: str, optional
+              De parser die de HTML-pagina leest: PARSER_BS4 (BeautifulSoup) of PARSER_LXML (lxml/XPath)
     
     Raises
     ------
     IndexError
          Wanneer er en fout zit in de cache of een bestand niet wordt teruggevonden in de cache
+    ValueError
+         Wanneer de parser niet bestaat
     
     """
-    content = get_url(RELATIE_URL, download)
-    relaties = _lees_relaties(content)
-    with open(RELATIES_NAMEN_CSV, mode='w', newline='', encoding='utf-8') as f:
-        writer = DictWriter(f, delimiter=';', fieldnames=RELATIE_HEADERS)
+    _schrijf_csv(RELATIES_NAMEN_CSV, RELATIE_HEADERS, stroom_relaties(download, parser))
+
+def stroom_hoofdpersonages(download=False, max_workers=MAX_WORKERS, parser=PARSER_BS4, processen=1) -> Iterator[PersonageData]:
+    """Geeft de hoofdpersonages één na één, terwijl de detailpagina's geparset worden
+
+    Zelfde parameters als extract_hoofdpersonages. De lijst met personages wordt nooit volledig in het geheugen
+    gehouden: met processen > 1 worden telkens PROCES_CHUNKSIZE * BLOKKEN_PER_PROCES pagina's per proces geparset.
+    De volgorde is dezelfde als in hoofdpersonages.csv. Zoals bij elke generator gebeurt er niets (ook geen
+    controle van de parser) tot het eerste personage gevraagd wordt.
+
+    Yields
+    ------
+    PersonageData
+         de gegevens van één hoofdpersonage
+    """
+    fileinfos = _lees_personage_fileinfos(HOOFDPERSONAGES_URL, '_lees_hoofdpersonage_urls', download, max_workers, parser)
+    yield from _stroom_personage_details(fileinfos, parser, processen)
+
+def stroom_nevenpersonages(download=False, max_workers=MAX_WORKERS, parser=PARSER_BS4, processen=1) -> Iterator[PersonageData]:
+    """Geeft de nevenpersonages één na één, terwijl de detailpagina's geparset worden (zie stroom_hoofdpersonages)"""
+    fileinfos = _lees_personage_fileinfos(NEVENERSONAGES_URL, '_lees_nevenpersonage_urls', download, max_workers, parser)
+    yield from _stroom_personage_details(fileinfos, parser, processen)
+
+def stroom_gastpersonages() -> Iterator[PersonageData]:
+    """Geeft de gastpersonages één na één (zie extract_gastpersonages)"""
+    yield from _lees_gastpersonages()
+
+def stroom_relaties(download=False, parser=PARSER_BS4) -> Iterator[RelatiePersoonData]:
+    """Geeft de relaties van de relatiepagina één na één (zie extract_relaties)
+
+    De relaties staan op één pagina: die wordt in één keer geparset (of uit de memo gelezen).
+    """
+    yield from _lees_relaties_pagina(download, parser)
+
+def schrijf_csv_onderweg(records:Iterable[T], bestandsnaam:str, headers:list[str]) -> Iterator[T]:
+    """Geeft de records ongewijzigd door en schrijft ze tegelijk in een CSV-bestand
+
+    Hiermee blijft de CSV-uitvoer beschikbaar bij een stroom naar de databank, bv.::
+
+        bewaar_personage_stroom(schrijf_csv_onderweg(stroom_hoofdpersonages(), HOOFDPERSONAGE_CSV, PERSONAGE_HEADERS))
+
+    Het bestand wordt pas vervangen wanneer alle records doorgegeven zijn: een onderbroken stroom laat
+    het vorige bestand ongemoeid.
+
+    Parameters
+    ----------
+    records: Iterable
+         de records (dictionaries met de headers als sleutels)
+    bestandsnaam: str
+         het CSV-bestand
+    headers: list[str]
+         de kolommen van het CSV-bestand
+    """
+    tijdelijk = bestandsnaam + '.tmp'
+    with open(tijdelijk, mode='w', newline='', encoding='utf-8') as f:
+        writer = DictWriter(f, delimiter=';', fieldnames=headers)
         writer.writeheader()
-        writer.writerows(relaties)
+        for record in records:
+            writer.writerow(record)
+            yield record
+    os.replace(tijdelijk, bestandsnaam)
+
+def vergelijk_parsers(download=False) -> list[str]:
+    """Vergelijkt de CSV-uitvoer van de BeautifulSoup- en de lxml-parser voor de pagina's in de cache
+
+    Parameters
+    ----------
+    download: bool, optional
+              Moet er contact worden opgenomen met de website om te controleren of het bestand gewijzigd is
+
+    Returns
+    -------
+    list[str]
+         de verschillen (bestandsnaam, regelnummer en beide regels). Een lege lijst wanneer beide parsers hetzelfde resultaat geven
+    """
+    verschillen = []
+    for bestandsnaam, headers, lees in ((HOOFDPERSONAGE_CSV, PERSONAGE_HEADERS, lambda parser: _lees_hoofdpersonages(download, MAX_WORKERS, parser)),
+                                        (NEVENPERSONAGE_CSV, PERSONAGE_HEADERS, lambda parser: _lees_nevenpersonages(download, MAX_WORKERS, parser)),
+                                        (RELATIES_NAMEN_CSV, RELATIE_HEADERS, lambda parser: _lees_relaties_pagina(download, parser))):
+        regels_bs4 = _csv_regels(headers, lees(PARSER_BS4))
+        regels_lxml = _csv_regels(headers, lees(PARSER_LXML))
+        if len(regels_bs4) != len(regels_lxml):
+            verschillen.append(f"{bestandsnaam}: {len(regels_bs4)} regels met {PARSER_BS4}, {len(regels_lxml)} regels met {PARSER_LXML}")
+        for regel_nr, (regel_bs4, regel_lxml) in enumerate(zip(regels_bs4, regels_lxml), 1):
+            if regel_bs4 != regel_lxml:
+                verschillen.append(f"{bestandsnaam} regel {regel_nr}: {regel_bs4!r} <> {regel_lxml!r}")
+    logger.info("%s verschillen tussen %s en %s", len(verschillen), PARSER_BS4, PARSER_LXML)
+    return verschillen
+
+def _get_parser(parser:str) -> ModuleType:
+    if parser == PARSER_BS4:
+        return sys.modules[__name__]
+    if parser == PARSER_LXML:
+        import thuis_html_lxml_utils
+        return thuis_html_lxml_utils
+    logger.error("Onbekende parser %s", parser)
+    raise ValueError(f"Onbekende parser {parser}")
+
+def _lees_nevenpersonages(download:bool, max_workers:int, parser:str, processen:int=1) -> list[PersonageData]:
+    return list(stroom_nevenpersonages(download, max_workers, parser, processen))
+
+def _lees_hoofdpersonages(download:bool, max_workers:int, parser:str, processen:int=1) -> list[PersonageData]:
+    return list(stroom_hoofdpersonages(download, max_workers, parser, processen))
+
+def _lees_personage_fileinfos(lijst_url:str, functie:str, download:bool, max_workers:int, parser:str) -> list[CacheInfoType]:
+    """Haalt de detailpagina's op van alle personages op een lijstpagina"""
+    module = _get_parser(parser)
+    fileinfo = get_fileinfo(lijst_url, download)
+    urls = memoiseer(fileinfo, getattr(module, functie), PARSER_VERSIE)
+    return get_fileinfos([BASIS_URL+url for url in urls], download, max_workers)
+
+def _lees_relaties_pagina(download:bool, parser:str) -> list[RelatiePersoonData]:
+    module = _get_parser(parser)
+    fileinfo = get_fileinfo(RELATIE_URL, download)
+    return memoiseer(fileinfo, module._lees_relaties, PARSER_VERSIE)
+
+def _lees_personage_details_lijst(fileinfos:list[CacheInfoType], parser:str, processen:int) -> list[PersonageData]:
+    """Parset de detailpagina's (zonder memo) eventueel in meerdere processen en geeft het resultaat in dezelfde volgorde terug"""
+    return list(_stroom_personage_details(fileinfos, parser, processen))
+
+def _stroom_personage_details(fileinfos:list[CacheInfoType], parser:str, processen:int) -> Iterator[PersonageData]:
+    """Parset de detailpagina's (zonder memo) per blok, eventueel in meerdere processen, en geeft de resultaten in dezelfde volgorde"""
+    module = _get_parser(parser)
+    blok_grootte = PROCES_CHUNKSIZE * BLOKKEN_PER_PROCES * processen if processen > 1 else 1
+    cachedir = thuis_http_utils.cache_dir()
+    if processen > 1:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+        #Windows kent enkel spawn
+        mp_context = multiprocessing.get_context(PROCES_START if PROCES_START in multiprocessing.get_all_start_methods() else None)
+    with ExitStack() as stack:
+        executor = None
+        for begin in range(0, len(fileinfos), blok_grootte):
+            blok = fileinfos[begin:begin + blok_grootte]
+            personage_data:list = [zoek_memo(fileinfo, module._lees_personage_details, PARSER_VERSIE) for fileinfo in blok]
+            te_parsen = [nr for nr, data in enumerate(personage_data) if data is None]
+            bestandsnamen = [blok[nr]['bestandsnaam'] for nr in te_parsen]
+            resultaten = None
+            if processen > 1 and len(te_parsen) > 1:
+                logger.debug("%s detailpagina's uit memo, %s te parsen met %s processen", len(blok) - len(te_parsen), len(te_parsen), processen)
+                try:
+                    if executor is None:
+                        executor = stack.enter_context(ProcessPoolExecutor(max_workers=processen, mp_context=mp_context))
+                    #de processen lezen de bestanden zelf: enkel de bestandsnaam wordt doorgegeven, niet de HTML-tekst
+                    resultaten = list(executor.map(_parse_personage_details, [cachedir]*len(bestandsnamen),
+                                                   bestandsnamen, [parser]*len(bestandsnamen), chunksize=PROCES_CHUNKSIZE))
+                except (BrokenProcessPool, OSError) as error:
+                    logger.warning("Parsen met %s processen mislukt (%s), verder in dit proces", processen, error)
+                    processen = 1
+            if resultaten is None:
+                resultaten = [_parse_personage_details(cachedir, bestandsnaam, parser) for bestandsnaam in bestandsnamen]
+            for nr, data in zip(te_parsen, resultaten):
+                bewaar_memo(blok[nr], module._lees_personage_details, PARSER_VERSIE, data)
+                personage_data[nr] = data
+            yield from personage_data
+
+def _parse_personage_details(cachedir:str, bestandsnaam:str, parser:str) -> PersonageData:
+    html = lees_inhoud(cachedir, bestandsnaam).decode('utf-8')
+    with meet(PARSE):     #in een ander proces (processen > 1) worden deze metingen niet meegeteld
+        return _get_parser(parser)._lees_personage_details(html)
+
+def _schrijf_csv(bestandsnaam:str, headers:list[str], data:Iterable) -> None:
+    deque(schrijf_csv_onderweg(data, bestandsnaam, headers), maxlen=0)
+
+def _csv_regels(headers:list[str], data:list) -> list[str]:
+    f = io.StringIO(newline='')
+    writer = DictWriter(f, delimiter=';', fieldnames=headers)
+    writer.writeheader()
+    writer.writerows(data)
+    return f.getvalue().splitlines()
+
+def _maak_soep(html:str) -> 'BeautifulSoup':
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, 'lxml')
 
 def _lees_personage_details(html:str) -> PersonageData:
-    soep = BeautifulSoup(html, 'lxml')
+    soep = _maak_soep(html)
     titel_tag = soep.find('span', class_='mw-page-title-main')
     naam = str(titel_tag.string)   #.string kan ook None teruggeeven
     seizoenen = []
@@ -149,35 +346,9 @@ def _lees_personage_details(html:str) -> PersonageData:
     personage_details = _verwerk_personage_details_uitzonderingen(naam, seizoenen)
     return personage_details
 
-def _verwerk_personage_details_uitzonderingen(naam:str, seizoenen:list[int]) -> PersonageData:
-    naam_details = naam.split(' ', maxsplit=1)
-    voornaam = naam_details[0]
-    achternaam = naam_details[1] if len(naam_details) == 2 else 'Onbekend'   #Er zijn personages zonder achternaam
-    if voornaam =='Nand' and achternaam == 'Reimers':
-        seizoenen = [10, 11, 12, 13]
-    if voornaam == 'Stijn' and achternaam == 'De Belder':
-        seizoenen = [16, 17]
-    if voornaam == 'Tim' and achternaam == 'Cremers':  #relatie met Katrien begint in seizoen 13
-        seizoenen.insert(0, 13)
-    if voornaam == 'Claire' and achternaam == 'Bastiaens':
-        seizoenen.append(15)
-    if voornaam == 'Britney' : voornaam = 'Britt'
-    if voornaam == 'Angele': voornaam = 'Angèle'
-    if voornaam == 'Rogerke': voornaam = 'Roger'
-    if voornaam == 'Kazàn' : voornaam = 'Kasper'
-    return {'voornaam':voornaam, 'achternaam':achternaam, 'seizoenen':seizoenen}
-    
-
-def _verwerk_nevenpersonage_urls_uitzonderingen(urls:list[str], url:str) -> list[str]:
-    if url == '/nl/wiki/Pips': 
-        logger.debug(f"Uitzondering voor url Pips")
-        return urls  #Pips heeft geen detailspagina
-    urls.append(url)
-    return urls
-
 def _lees_nevenpersonage_urls(html:str) -> list[str]:
     data = []
-    soep = BeautifulSoup(html, 'lxml')
+    soep = _maak_soep(html)
     huidige_nevenpersonages_tag = soep.find(id='gallery-0')
     personage_tags = huidige_nevenpersonages_tag.find_all(class_='wikia-gallery-item')    
     for personage_tag in personage_tags:
@@ -207,7 +378,7 @@ def _lees_hoofdpersonage_urls(html:str) -> list[str]:
           de lijst met de urls van de detailpagina's
     """
     data = []
-    soep = BeautifulSoup(html, 'lxml')
+    soep = _maak_soep(html)
     #Er zijn twee reeksen van personages, namelijk id='gallery-0' en id='gallery-1'
     hoofdpersonage_tags = soep.find_all(id=re.compile(r'^gallery-[01]$'))
     for hoofdpersonage_tag in hoofdpersonage_tags:
@@ -232,9 +403,9 @@ def _lees_relaties(html:str) -> list[RelatiePersoonData]:
     list[RelatiePersoonData]:
          De relatiegegevens onder de vorm van een lijst met seizoennr, persoon_1 en persoon2
     """
-    soep = BeautifulSoup(html, 'lxml')
+    soep = _maak_soep(html)
     seizoenen_tags = soep.find_all(id= re.compile(r'^gallery-[1-9][0-9]?'))
-    logging.debug(f"{len(seizoenen_tags)} vorige seizoenen inlezen")
+    logger.debug("%s vorige seizoenen inlezen", len(seizoenen_tags))
     data:list[RelatiePersoonData] = []
     for seizoen_nr, seizoen_tag in enumerate(seizoenen_tags, 1):
         relaties = _lees_seizoen_relatie(seizoen_tag, seizoen_nr)
@@ -243,29 +414,18 @@ def _lees_relaties(html:str) -> list[RelatiePersoonData]:
     seizoen_nr += 1
     relaties = _lees_seizoen_relatie(laatste_seizoen_tag, seizoen_nr)
     data.extend(relaties)
-    return data
+    return pas_aliassen_toe(data)
 
-def _lees_seizoen_relatie(tag:Tag, seizoen_nr:int ) -> list[RelatiePersoonData]:
+def _lees_seizoen_relatie(tag:'Tag', seizoen_nr:int ) -> list[RelatiePersoonData]:
     data:list[RelatiePersoonData] = []
     b_tags = tag.find_all('b')
     for b_tag in b_tags:
         tekst = str(b_tag.string)
         persoon_1, persoon_2 = tekst.split(" en ")
-        item = _verwerk_lees_seizoen_relatie_uitzondering(seizoen_nr, persoon_1, persoon_2)
-        data.append(item)
-    logger.debug(f"{len(data)} relaties ingelezen voor seizoen {seizoen_nr}")
+        data.append({'seizoen': seizoen_nr, 'persoon_1': persoon_1, 'persoon_2': persoon_2})
+    logger.debug("%s relaties ingelezen voor seizoen %s", len(data), seizoen_nr)
     return data
 
-def _verwerk_lees_seizoen_relatie_uitzondering(seizoen_nr:int, persoon_1:str, persoon_2:str) -> RelatiePersoonData:
-    if persoon_1 == 'Angele': persoon_1 = 'Angèle'
-    if persoon_2 == 'Angele': persoon_2 = 'Angèle'
-    if persoon_1 == 'Aisha' : persoon_1 = 'Aïsha'
-    if persoon_2 == 'Aisha' : persoon_2 = 'Aïsha'
-    if persoon_1 == 'Franky' : persoon_1 = 'Kaat'   #Geen dead naming
-    if persoon_2 == 'Franky' : persoon_2 = 'Kaat'
-
-    return {'seizoen': seizoen_nr, 'persoon_1': persoon_1, 'persoon_2': persoon_2}
-
 if __name__ == '__main__':
     logging.basicConfig(level=logging.DEBUG)
     extract_gastpersonages()
@@ -1,28 +1,115 @@
 import logging
 import os
+import sqlite3
+import threading
 import urllib.parse
-import requests
 import urllib
-from csv import DictWriter, DictReader
+from concurrent.futures import ThreadPoolExecutor
+from csv import DictReader
 from datetime import datetime
-from typing import   Optional
+from typing import TYPE_CHECKING, Optional
 from zoneinfo import ZoneInfo
 
-from thuis_typing import CacheInfoType, DownloadType
+from thuis_metrics_utils import tel, CACHE_HIT, CACHE_MISS, HTTP_200, HTTP_304, BYTES_GEDOWNLOAD
+from thuis_opslag_utils import bewaar_inhoud, lees_inhoud, is_object, verwijder_ongebruikte_objecten, rapporteer_opslag
+from thuis_typing import CacheInfoType, DownloadType, OpslagRapport
+
+if TYPE_CHECKING:
+    import requests     # wordt pas ingeladen bij de eerste download (zie _get_sessie)
 
 CACHE_DIR_NAME = '.filecachedir'
-CACHE_DIR_PATH = os.path.join(os.getcwd(), CACHE_DIR_NAME)
-INDEX_FILE_NAME = "index.csv"
+CACHE_DIR_PATH: Optional[str] = None     # None => CACHE_DIR_NAME in de werkmap bij het eerste gebruik (zie cache_dir)
+INDEX_FILE_NAME = "index.csv"          # oude index, wordt eenmalig gemigreerd naar INDEX_DB_NAME
 INDEX_FILE_HEADERS = list(CacheInfoType.__annotations__.keys()) # de velden van CacheInfoTYpe zijn gelijk aan de veldnamen van index.csv
+INDEX_DB_NAME = "index.db"
+INDEX_MIGRATIE_SUFFIX = ".gemigreerd"
+
+TBL_CACHE_INDEX = "CACHE_INDEX"
+SQL_CREATE_TBL_CACHE_INDEX = \
+f"""CREATE TABLE IF NOT EXISTS {TBL_CACHE_INDEX}(
+         URL TEXT PRIMARY KEY,
+         BESTANDSNAAM TEXT NOT NULL,
+         LAATSTE_WIJZIGING TEXT NOT NULL,
+         REDIRECT_URL TEXT NOT NULL
+)"""
+SQL_CREATE_IDX_CACHE_INDEX = f"CREATE INDEX IF NOT EXISTS idx_redirect_url ON {TBL_CACHE_INDEX} (REDIRECT_URL)"
+SQL_INSERT_CACHE_INDEX = \
+f"""INSERT INTO {TBL_CACHE_INDEX} (URL, BESTANDSNAAM, LAATSTE_WIJZIGING, REDIRECT_URL)
+VALUES (:url, :bestandsnaam, :laatste_wijziging, :redirect_url)
+"""
+SQL_UPDATE_CACHE_INDEX = f"UPDATE {TBL_CACHE_INDEX} SET LAATSTE_WIJZIGING = :laatste_wijziging, BESTANDSNAAM = :bestandsnaam WHERE URL = :url"
+SQL_SELECT_CACHE_INDEX = f"SELECT URL, BESTANDSNAAM, LAATSTE_WIJZIGING, REDIRECT_URL FROM {TBL_CACHE_INDEX}"
 
 DATE_FORMAT = '%a, %d %b %Y %H:%M:%S %Z'
 
 HTTP_OK = 200
 HTTP_NOT_MODIFIED = 304
 
+MAX_WORKERS = 8      # aantal gelijktijdige downloads in get_urls
+MAX_PER_HOST = 4     # beleefdheidslimiet: nooit meer dan dit aantal gelijktijdige requests naar dezelfde host
+
 logger = logging.getLogger(__name__)
 
-def get_url(url: str, download=False) -> str:
+_sessie: Optional['requests.Session'] = None
+_sessie_lock = threading.Lock()
+_cache_lock = threading.RLock()       # beschermt de index en de bestanden in de cache
+_host_semaforen: dict[tuple[str, int], threading.BoundedSemaphore] = {}   # per (host, max_per_host)
+
+# De index wordt één keer ingelezen en daarna in het geheugen bijgehouden (opzoeken op url en op redirect_url)
+_index_pad: Optional[str] = None
+_index_conn: Optional[sqlite3.Connection] = None
+_index_per_url: dict[str, CacheInfoType] = {}
+_index_per_redirect_url: dict[str, CacheInfoType] = {}
+
+def get_urls(urls: list[str], download=False, max_workers=MAX_WORKERS, max_per_host=MAX_PER_HOST) -> list[str]:
+    """Geef de inhoud van een reeks bestanden op basis van de Thuis-urls
+
+    De bestanden worden gelijktijdig opgehaald met een pool van threads die één keep-alive sessie delen.
+    Het resultaat staat in dezelfde volgorde als de urls.
+
+    Parameters
+    ----------
+    urls: list[str]
+         de bestanden die moeten worden opgehaald (zie get_url)
+    download: boolean, default False
+         zie get_url
+    max_workers: int, default MAX_WORKERS
+         het maximaal aantal bestanden dat gelijktijdig wordt opgehaald. Bij 1 worden de bestanden één na één opgehaald
+    max_per_host: int, default MAX_PER_HOST
+         het maximaal aantal gelijktijdige requests naar dezelfde host. De limiet wordt gedeeld door alle
+         oproepen (ook uit andere threads) met dezelfde waarde; een oproep met een andere waarde heeft een
+         eigen limiet, die er niet bij opgeteld wordt
+
+    Returns
+    -------
+    list[str]
+         de inhoud van de bestanden, in dezelfde volgorde als urls
+
+    Raises
+    ------
+    IndexError
+         Wanneer er en fout zit in de cache of een bestand niet wordt teruggevonden in de cache
+    """
+    fileinfos = get_fileinfos(urls, download, max_workers, max_per_host)
+    return [lees_cache(fileinfo).decode('utf-8') for fileinfo in fileinfos]
+
+def get_fileinfos(urls: list[str], download=False, max_workers=MAX_WORKERS, max_per_host=MAX_PER_HOST) -> list[CacheInfoType]:
+    """Zorgt dat een reeks urls in de cache zit (zie get_fileinfo) en geeft hun indexrecords terug
+
+    De urls worden gelijktijdig ververst, het resultaat staat in dezelfde volgorde als de urls.
+    De parameters zijn dezelfde als bij get_urls: max_per_host begrenst de requests per host samen met alle
+    andere oproepen met dezelfde max_per_host.
+    """
+    unieke_urls = list(dict.fromkeys(urls))    # dezelfde url niet twee keer gelijktijdig aan de cache toevoegen
+    if max_workers <= 1 or len(unieke_urls) <= 1:
+        fileinfos = {url: get_fileinfo(url, download, max_per_host) for url in unieke_urls}
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='get_urls') as executor:
+            resultaten = executor.map(lambda url: get_fileinfo(url, download, max_per_host), unieke_urls)
+            fileinfos = dict(zip(unieke_urls, resultaten))
+    return [fileinfos[url] for url in urls]
+
+def get_url(url: str, download=False, max_per_host=MAX_PER_HOST) -> str:
     """Geef de inhoud van een bestand op basis van de Thuis-url
     
     Parameters
@@ -32,6 +119,8 @@ def get_url(url: str, download=False) -> str:
     download: boolean, default False
          False => neem nooit contact op met de thuis website (bestand moet aanwezig zijn in de cache)
          True => neem contact op met de thuis website om te controleren of het bestand gewijzigd is (en download eventueel)
+    max_per_host: int, default MAX_PER_HOST
+         het maximaal aantal gelijktijdige requests naar dezelfde host
          
     Returns
     -------
@@ -44,120 +133,215 @@ def get_url(url: str, download=False) -> str:
          Wanneer er en fout zit in de cache of een bestand niet wordt teruggevonden in de cache     
 
     """
-    logger.debug(f"In get_url om {url} met download {download}")
+    logger.debug("In get_url om %s met download %s", url, download)
+    return get_url_bytes(url, download, max_per_host).decode('utf-8')
+
+def get_url_bytes(url: str, download=False, max_per_host=MAX_PER_HOST) -> bytes:
+    """Geef de inhoud van een bestand op basis van de Thuis-url als bytes
+
+    Zelfde werking als get_url, maar zonder de inhoud te decoderen. Parsers die bytes aanvaarden (lxml, BeautifulSoup)
+    kunnen de inhoud zo rechtstreeks gebruiken.
+    """
+    fileinfo = get_fileinfo(url, download, max_per_host)
+    return lees_cache(fileinfo)
+
+def lees_cache(fileinfo: CacheInfoType) -> bytes:
+    """Geeft de inhoud van een indexrecord (zie get_fileinfo) terug zonder contact op te nemen met de website"""
+    with _cache_lock:
+        content = lees_inhoud(cache_dir(), fileinfo['bestandsnaam'])
+    return content
+
+def get_fileinfo(url: str, download=False, max_per_host=MAX_PER_HOST) -> CacheInfoType:
+    """Zorgt dat een url in de cache zit en geeft het indexrecord terug zonder het bestand te lezen
+
+    Zelfde werking als get_url. Het indexrecord bevat de bestandsnaam en laatste_wijziging van de versie in de cache.
+    Gebruik lees_cache om de inhoud te lezen.
+    """
     fileinfo = _get_fileinfo(url)
+    tel(CACHE_HIT if fileinfo is not None else CACHE_MISS)
     refdatum = None
     if fileinfo is not None:
-        logger.debug(f"Fileinfo {fileinfo} gevonden")
+        logger.debug("Fileinfo %s gevonden", fileinfo)
         refdatum = fileinfo['laatste_wijziging']
         url = fileinfo['redirect_url']
     elif not download:
-        logger.error(f"url {url} niet in cache en mag niet downloaden")
+        logger.error("url %s niet in cache en mag niet downloaden", url)
         raise IndexError(f"url {url} niet in cache en mag niet downloaden")
     if download:
-        download_data = _download_url(url, refdatum=refdatum)
+        download_data = _download_url(url, refdatum=refdatum, max_per_host=max_per_host)
         if download_data is not None:
             if fileinfo is not None:
                 _update_cache(download_data, fileinfo)
             else:
                 fileinfo = _add_to_cache(url, download_data)
-    html_bestand = os.path.join(CACHE_DIR_PATH, fileinfo['bestandsnaam'])
-    with open(html_bestand, mode='r', encoding='utf-8') as f:
-        content = f.read()
-    return content
+    return fileinfo
+
+def migreer_naar_objecten() -> int:
+    """Zet de bestanden in de oude layout (ruwe HTML per url) om naar de gecomprimeerde layout
+
+    Returns
+    -------
+    int
+         het aantal omgezette indexrecords
+    """
+    cachedir = os.path.dirname(_init())
+    aantal = 0
+    with _cache_lock:
+        oude_bestanden = set()
+        for fileinfo in list(_index_per_url.values()):
+            if is_object(fileinfo['bestandsnaam']):
+                continue
+            oude_bestandsnaam = fileinfo['bestandsnaam']
+            content = lees_inhoud(cachedir, oude_bestandsnaam)
+            bestandsnaam = bewaar_inhoud(cachedir, content)
+            with _index_conn:
+                _index_conn.execute(SQL_UPDATE_CACHE_INDEX, {'url': fileinfo['url'], 'laatste_wijziging': fileinfo['laatste_wijziging'], 'bestandsnaam': bestandsnaam})
+            fileinfo['bestandsnaam'] = bestandsnaam
+            oude_bestanden.add(oude_bestandsnaam)
+            aantal += 1
+        for oude_bestandsnaam in oude_bestanden:
+            os.remove(os.path.join(cachedir, oude_bestandsnaam))
+    logger.info("%s indexrecords omgezet naar de gecomprimeerde layout", aantal)
+    return aantal
+
+def ruim_cache_op() -> int:
+    """Verwijdert de bestanden in de cache waar geen enkele url meer naar verwijst
+
+    Returns
+    -------
+    int
+         het aantal verwijderde bestanden
+    """
+    _init()
+    with _cache_lock:
+        gebruikt = {fileinfo['bestandsnaam'] for fileinfo in _index_per_url.values()}
+        return verwijder_ongebruikte_objecten(cache_dir(), gebruikt)
+
+def rapporteer_cache() -> OpslagRapport:
+    """Geeft de besparing op schijf en de leessnelheid van de gecomprimeerde cache ten opzichte van de oude layout"""
+    _init()
+    with _cache_lock:
+        bestandsnamen = [fileinfo['bestandsnaam'] for fileinfo in _index_per_url.values()]
+        return rapporteer_opslag(cache_dir(), bestandsnamen)
+
+def cache_dir() -> str:
+    """Geeft de map van de cache: CACHE_DIR_PATH, of CACHE_DIR_NAME in de werkmap van het eerste gebruik"""
+    global CACHE_DIR_PATH
+    if CACHE_DIR_PATH is None:
+        CACHE_DIR_PATH = os.path.join(os.getcwd(), CACHE_DIR_NAME)
+    return CACHE_DIR_PATH
 
 def _add_to_cache(url:str, download_data: DownloadType) -> CacheInfoType:
-    logger.debug(f"{url} toevoegen aan cache met ")
+    logger.debug("%s toevoegen aan cache met ", url)
     index_file = _init()
     cachedir = os.path.dirname(index_file)
     laatste_wijziging = download_data['laatste_wijziging']
     redirect_url = download_data['url']
-    logger.debug(f"met redirect url {redirect_url} en laatste wijziging {laatste_wijziging}")
-    url_path = urllib.parse.unquote( urllib.parse.urlparse(redirect_url).path)
-    bestandsnaam  = url_path[url_path.rfind('/')+1:] + '.html'
-    fileinfo:CacheInfoType = {'url': url, 'redirect_url':redirect_url, 'laatste_wijziging':laatste_wijziging, 'bestandsnaam':bestandsnaam}
-    with open(index_file, mode='r', newline='', encoding='utf-8') as f:
-        reader = DictReader(f, delimiter=';')
-        data=[]
-        for rij in reader:
-            if rij['url'] == fileinfo['url']:
-                logger.error(f"url {fileinfo['url']} bestaat al: rij['url]")
-                raise IndexError(f"url {fileinfo['url']} bestaat al: rij['url]")
-            data.append(rij)
-    html_bestand = os.path.join(cachedir, bestandsnaam)
-    logger.debug(f"bestand {html_bestand} bewaren in cache")
-    with open(html_bestand, mode='wb') as f:
-        f.write(download_data['content'])
-    data.append(fileinfo)
-    logger.debug(f"Index bewaren met {fileinfo}")
-    _write_index(data)
+    logger.debug("met redirect url %s en laatste wijziging %s", redirect_url, laatste_wijziging)
+    with _cache_lock:
+        bestaand = _index_per_url.get(url)
+        if bestaand is not None:
+            #een andere thread heeft de url toegevoegd tussen het opzoeken en de download: die versie bijwerken
+            logger.debug("url %s bestaat al, indexrecord wordt bijgewerkt", url)
+            fileinfo = dict(bestaand)  # type: ignore
+            _update_cache(download_data, fileinfo)
+            return fileinfo
+        bestandsnaam = bewaar_inhoud(cachedir, download_data['content'])
+        fileinfo:CacheInfoType = {'url': url, 'redirect_url':redirect_url, 'laatste_wijziging':laatste_wijziging, 'bestandsnaam':bestandsnaam}
+        logger.debug("Index bewaren met %s", fileinfo)
+        with _index_conn:
+            _index_conn.execute(SQL_INSERT_CACHE_INDEX, fileinfo)
+        _voeg_toe_aan_index(fileinfo)
     return fileinfo
     
 def _update_cache(download_data: DownloadType, fileinfo:CacheInfoType) -> None:
-    logger.debug(f"update cache voor {fileinfo['bestandsnaam']}")
+    logger.debug("update cache voor %s", fileinfo['bestandsnaam'])
     index_file = _init()
     cachedir = os.path.dirname(index_file)
     url = fileinfo['url']
     laatste_wijziging = download_data['laatste_wijziging']
-    bestandsnaam = os.path.join(cachedir, fileinfo['bestandsnaam'])
-    data = _read_index()
-    logger.debug(f'{len(data)} indexrecords gelezen')
-    gevonden_records = [ rij for rij in data if rij['url'] == url]
-    aantal_records = len(gevonden_records)
-    if aantal_records == 1:
-        logger.debug(f"Index record updaten met laatste wijziging {laatste_wijziging}")
-        gevonden_records[0]['laatste_wijziging'] = laatste_wijziging
-        with open(bestandsnaam, mode='wb') as f:
-            f.write(download_data['content'])
-        _write_index(data)
-    else:
-        logger.error(f'{aantal_records} gevonden bij _update_cache voor url {url}')
-        raise IndexError(f'{aantal_records} gevonden bij _update_cache voor url {url}')
+    with _cache_lock:
+        record = _index_per_url.get(url)
+        if record is None:
+            logger.error('url %s niet gevonden bij _update_cache', url)
+            raise IndexError(f'url {url} niet gevonden bij _update_cache')
+        logger.debug("Index record updaten met laatste wijziging %s", laatste_wijziging)
+        bestandsnaam = bewaar_inhoud(cachedir, download_data['content'])
+        with _index_conn:
+            _index_conn.execute(SQL_UPDATE_CACHE_INDEX, {'url': url, 'laatste_wijziging': laatste_wijziging, 'bestandsnaam': bestandsnaam})
+        for info in (record, fileinfo):
+            info['laatste_wijziging'] = laatste_wijziging
+            info['bestandsnaam'] = bestandsnaam
+
+def _get_sessie() -> 'requests.Session':
+    """Geeft de gedeelde keep-alive sessie terug (wordt bij het eerste gebruik gemaakt)"""
+    global _sessie
+    with _sessie_lock:
+        if _sessie is None:
+            import requests
+            logger.debug('Nieuwe HTTP sessie wordt gecreëerd')
+            _sessie = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+            _sessie.mount('https://', adapter)
+            _sessie.mount('http://', adapter)
+        return _sessie
+
+def _get_host_semafoor(url: str, max_per_host: int) -> threading.BoundedSemaphore:
+    #per limiet een eigen semafoor: een oproep met een andere max_per_host krijgt niet de limiet van de eerste oproep
+    sleutel = (urllib.parse.urlparse(url).netloc, max_per_host)
+    with _sessie_lock:
+        semafoor = _host_semaforen.get(sleutel)
+        if semafoor is None:
+            semafoor = threading.BoundedSemaphore(max_per_host)
+            _host_semaforen[sleutel] = semafoor
+    return semafoor
 
-def _download_url(url: str, refdatum:Optional[str]=None) -> Optional[DownloadType]:
+def _download_url(url: str, refdatum:Optional[str]=None, max_per_host=MAX_PER_HOST) -> Optional[DownloadType]:
     if refdatum is None:
         refdatum = datetime(2000, 1, 1).astimezone(tz=ZoneInfo('GMT')).strftime(DATE_FORMAT)
-    logger.debug(f'download {url} met refdatum {refdatum}')
+    logger.debug('download %s met refdatum %s', url, refdatum)
     headers = {'Accept-Encoding': 'br', 'If-Modified-Since': refdatum}
+    import requests
     try:
-        response = requests.get(url, headers=headers)
-        logger.debug(f'Response met status {response.status_code}')
+        with _get_host_semafoor(url, max_per_host):
+            response = _get_sessie().get(url, headers=headers)
+        logger.debug('Response met status %s', response.status_code)
         if response.status_code == HTTP_NOT_MODIFIED:
-            logger.debug(f"{url} is niet gedownload (not modified)")
+            tel(HTTP_304)
+            logger.debug("%s is niet gedownload (not modified)", url)
             return None
         if response.status_code == HTTP_OK:
             url = response.url
             content = response.content
+            tel(HTTP_200)
+            tel(BYTES_GEDOWNLOAD, len(content))
             laatste_wijziging = response.headers["Last-Modified"]
-            logger.debug(f"{url} gedownload met datum {laatste_wijziging}")
+            logger.debug("%s gedownload met datum %s", url, laatste_wijziging)
             return {'url': url, 'content': content, 'laatste_wijziging': laatste_wijziging}
         response.raise_for_status()
-        logger.error(f'Reponse met onverwachte status {response.status_code}')
+        logger.error('Reponse met onverwachte status %s', response.status_code)
         raise(Exception(f'Reponse met onverwachte status {response.status_code}'))
     except requests.exceptions.ConnectionError as conn_err:
         url = conn_err.request.url
-        logger.error(f'Connection error {conn_err.strerror} voor url {url}')
+        logger.error('Connection error %s voor url %s', conn_err.strerror, url)
         raise(conn_err)
     except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error {http_err.response.status_codee}")
+        logger.error("HTTP error %s", http_err.response.status_code)
         raise(http_err)
     
 def _get_fileinfo(url: str) -> Optional[CacheInfoType]:
-    data = _read_index()
-    for regel in data:
-        if regel['url'] == url:
-            return regel
-    return None
+    _init()
+    with _cache_lock:
+        fileinfo = _index_per_url.get(url)
+        if fileinfo is None:
+            fileinfo = _index_per_redirect_url.get(url)
+        return dict(fileinfo) if fileinfo is not None else None  # type: ignore
 
-def _write_index(data:list[CacheInfoType]) -> None:
-    index_file = _init()
-    with open(index_file, mode='w', newline='', encoding='utf-8') as f:
-        writer = DictWriter(f, delimiter=';', fieldnames=INDEX_FILE_HEADERS)
-        writer.writeheader()
-        writer.writerows(data)
+def _voeg_toe_aan_index(fileinfo: CacheInfoType) -> None:
+    _index_per_url[fileinfo['url']] = fileinfo
+    _index_per_redirect_url.setdefault(fileinfo['redirect_url'], fileinfo)
 
-def _read_index() -> list[CacheInfoType]:
-    index_file = _init()
+def _read_index(index_file: str) -> list[CacheInfoType]:
     with open (index_file, mode='r', newline='', encoding='utf-8') as f:
         reader = DictReader(f, delimiter=";")
         data = []
@@ -165,19 +349,45 @@ def _read_index() -> list[CacheInfoType]:
             data.append(rij)
     return data
 
+def _migreer_index_csv(conn: sqlite3.Connection, index_file: str) -> None:
+    """Zet een bestaande index.csv eenmalig over naar de index databank en hernoemt het csv-bestand"""
+    data = _read_index(index_file)
+    logger.info("%s records uit %s migreren naar %s", len(data), index_file, INDEX_DB_NAME)
+    with conn:
+        conn.executemany(SQL_INSERT_CACHE_INDEX.replace('INSERT', 'INSERT OR REPLACE', 1), data)
+    os.replace(index_file, index_file + INDEX_MIGRATIE_SUFFIX)
+
 def _init() -> str:
-    is_exist_dir = os.path.isdir(CACHE_DIR_PATH)
-    if not is_exist_dir:
-        logger.debug('filcachedir wordt gecreëerd')
-        os.mkdir(CACHE_DIR_PATH)
-    index_file = os.path.join(CACHE_DIR_PATH, INDEX_FILE_NAME)
-    is_exist_file = os.path.isfile(index_file)
-    if not is_exist_file:
-        logger.debug('Cache index bestand wordt gecreëerd')
-        with open(index_file, mode='w', newline='', encoding='utf-8') as f:
-            writer = DictWriter(f, fieldnames=INDEX_FILE_HEADERS, delimiter=";")
-            writer.writeheader()
-    return index_file
+    global _index_pad, _index_conn
+    with _cache_lock:
+        cachedir = cache_dir()
+        index_db = os.path.join(cachedir, INDEX_DB_NAME)
+        if _index_pad == index_db:
+            return index_db
+        is_exist_dir = os.path.isdir(cachedir)
+        if not is_exist_dir:
+            logger.debug('filcachedir wordt gecreëerd')
+            os.mkdir(cachedir)
+        if _index_conn is not None:
+            _index_conn.close()
+        logger.debug('Cache index wordt geopend')
+        conn = sqlite3.connect(index_db, check_same_thread=False)  # alle toegang gebeurt onder _cache_lock
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(SQL_CREATE_TBL_CACHE_INDEX)
+        conn.execute(SQL_CREATE_IDX_CACHE_INDEX)
+        conn.commit()
+        index_file = os.path.join(cachedir, INDEX_FILE_NAME)
+        if os.path.isfile(index_file):
+            _migreer_index_csv(conn, index_file)
+        _index_per_url.clear()
+        _index_per_redirect_url.clear()
+        for url, bestandsnaam, laatste_wijziging, redirect_url in conn.execute(SQL_SELECT_CACHE_INDEX):
+            _voeg_toe_aan_index({'url': url, 'bestandsnaam': bestandsnaam, 'laatste_wijziging': laatste_wijziging, 'redirect_url': redirect_url})
+        logger.debug("%s indexrecords gelezen", len(_index_per_url))
+        _index_conn = conn
+        _index_pad = index_db
+    return index_db
     
 if __name__ == '__main__':
     logging.basicConfig(level=logging.DEBUG)
@@ -0,0 +1,120 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, Optional
+
+import thuis_http_utils
+from thuis_http_utils import lees_cache
+from thuis_metrics_utils import tel, meet, MEMO_HIT, MEMO_MISS, PARSE
+from thuis_typing import CacheInfoType
+
+MEMO_DB_NAME = "memo.db"
+
+TBL_MEMO = "MEMO"
+SQL_CREATE_TBL_MEMO = \
+f"""CREATE TABLE IF NOT EXISTS {TBL_MEMO}(
+         BESTANDSNAAM TEXT NOT NULL,
+         LAATSTE_WIJZIGING TEXT NOT NULL,
+         FUNCTIE TEXT NOT NULL,
+         VERSIE INTEGER NOT NULL,
+         RESULTAAT TEXT NOT NULL,
+         PRIMARY KEY (BESTANDSNAAM, LAATSTE_WIJZIGING, FUNCTIE, VERSIE)
+)"""
+SQL_SELECT_MEMO = \
+f"""SELECT RESULTAAT FROM {TBL_MEMO}
+WHERE BESTANDSNAAM = :bestandsnaam AND LAATSTE_WIJZIGING = :laatste_wijziging AND FUNCTIE = :functie AND VERSIE = :versie
+"""
+SQL_INSERT_MEMO = \
+f"""INSERT OR REPLACE INTO {TBL_MEMO} (BESTANDSNAAM, LAATSTE_WIJZIGING, FUNCTIE, VERSIE, RESULTAAT)
+VALUES (:bestandsnaam, :laatste_wijziging, :functie, :versie, :resultaat)
+"""
+SQL_DELETE_MEMO = f"DELETE FROM {TBL_MEMO}"
+
+logger = logging.getLogger(__name__)
+
+_memo_lock = threading.Lock()
+_memo_pad: Optional[str] = None
+_memo_conn: Optional[sqlite3.Connection] = None
+
+def memoiseer(fileinfo: CacheInfoType, functie: Callable[[str], Any], versie: int) -> Any:
+    """Geeft het resultaat van functie(inhoud van het bestand) terug, zonder te parsen wanneer het al berekend is
+
+    Het resultaat wordt bewaard onder (bestandsnaam, laatste_wijziging, functie, versie). Een pagina die niet
+    gewijzigd is in de cache wordt dus niet opnieuw gelezen of geparset.
+
+    Parameters
+    ----------
+    fileinfo: CacheInfoType
+         het indexrecord van het bestand (zie thuis_http_utils.get_fileinfo)
+    functie: Callable[[str], Any]
+         de functie die de HTML-tekst verwerkt. Het resultaat moet naar JSON omgezet kunnen worden
+    versie: int
+         de versie van de parser. Verhoog de versie wanneer de functie een ander resultaat geeft
+
+    Returns
+    -------
+    Any
+         het (eventueel bewaarde) resultaat van de functie (nooit None)
+    """
+    resultaat = zoek_memo(fileinfo, functie, versie)
+    if resultaat is not None:
+        return resultaat
+    html = lees_cache(fileinfo).decode('utf-8')
+    with meet(PARSE):
+        resultaat = functie(html)
+    bewaar_memo(fileinfo, functie, versie, resultaat)
+    return resultaat
+
+def zoek_memo(fileinfo: CacheInfoType, functie: Callable[[str], Any], versie: int) -> Any:
+    """Geeft het bewaarde resultaat van functie voor het bestand terug, of None wanneer het nog niet berekend is"""
+    sleutel = _maak_sleutel(fileinfo, functie, versie)
+    with _memo_lock:
+        rij = _get_conn().execute(SQL_SELECT_MEMO, sleutel).fetchone()
+    if rij is None:
+        tel(MEMO_MISS)
+        return None
+    tel(MEMO_HIT)
+    logger.debug("memo gevonden voor %s", sleutel)
+    return json.loads(rij[0])
+
+def bewaar_memo(fileinfo: CacheInfoType, functie: Callable[[str], Any], versie: int, resultaat: Any) -> None:
+    """Bewaart het resultaat van functie voor het bestand (zie memoiseer)"""
+    sleutel = _maak_sleutel(fileinfo, functie, versie)
+    with _memo_lock:
+        conn = _get_conn()
+        with conn:
+            conn.execute(SQL_INSERT_MEMO, sleutel | {'resultaat': json.dumps(resultaat, ensure_ascii=False)})
+
+def wis_memo() -> None:
+    """Verwijdert alle bewaarde resultaten"""
+    with _memo_lock:
+        conn = _get_conn()
+        with conn:
+            conn.execute(SQL_DELETE_MEMO)
+    logger.info("memo gewist")
+
+def _maak_sleutel(fileinfo: CacheInfoType, functie: Callable[[str], Any], versie: int) -> dict:
+    return {
+        'bestandsnaam': fileinfo['bestandsnaam'],
+        'laatste_wijziging': fileinfo['laatste_wijziging'],
+        'functie': f"{functie.__module__}.{functie.__qualname__}",
+        'versie': versie
+    }
+
+def _get_conn() -> sqlite3.Connection:
+    global _memo_pad, _memo_conn
+    memo_db = os.path.join(thuis_http_utils.cache_dir(), MEMO_DB_NAME)
+    if _memo_pad != memo_db:
+        if _memo_conn is not None:
+            _memo_conn.close()
+        os.makedirs(thuis_http_utils.cache_dir(), exist_ok=True)
+        conn = sqlite3.connect(memo_db, check_same_thread=False)  # alle toegang gebeurt onder _memo_lock
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(SQL_CREATE_TBL_MEMO)
+        conn.commit()
+        _memo_conn = conn
+        _memo_pad = memo_db
+    return _memo_conn
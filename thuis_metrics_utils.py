@@ -0,0 +1,123 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from typing import Optional
+
+# Tellers en timers voor een uitvoering. Wanneer de metrics niet actief zijn, doen tel() en meet() niets
+# behalve één test op _actief: de oproepen mogen dus ook in lussen staan.
+# Activeer met activeer() of met de omgevingsvariabele THUIS_METRICS=1.
+METRICS_JSON = 'metrics.json'
+
+# namen van de tellers en timers die de modules gebruiken
+CACHE_HIT = 'http.cache_hit'
+CACHE_MISS = 'http.cache_miss'
+HTTP_200 = 'http.status_200'
+HTTP_304 = 'http.status_304'
+BYTES_GEDOWNLOAD = 'http.bytes_gedownload'
+BYTES_GESCHREVEN = 'opslag.bytes_geschreven'
+BYTES_GELEZEN = 'opslag.bytes_gelezen'
+MEMO_HIT = 'memo.hit'
+MEMO_MISS = 'memo.miss'
+PARSE = 'html.parse'
+DB_STATEMENTS = 'db.statements'
+DB_RIJEN = 'db.rijen_gewijzigd'
+RESOLVER_OPZOEKINGEN = 'resolver.opzoekingen'
+RESOLVER_ONOPGELOST = 'resolver.onopgelost'
+
+logger = logging.getLogger(__name__)
+
+_actief = os.environ.get('THUIS_METRICS') == '1'
+_lock = threading.Lock()
+_tellers: dict[str, int] = {}
+_timers: dict[str, list[float]] = {}     # naam => [aantal, totaal, maximum] in seconden
+_geen_meting = nullcontext()
+
+class _Meting:
+    __slots__ = ('naam', 'start')
+
+    def __init__(self, naam:str):
+        self.naam = naam
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        voeg_tijd_toe(self.naam, time.perf_counter() - self.start)
+        return False
+
+def activeer(actief=True) -> None:
+    """Zet het verzamelen van metrics aan of uit (de bestaande waarden blijven behouden)"""
+    global _actief
+    _actief = actief
+
+def is_actief() -> bool:
+    return _actief
+
+def tel(naam:str, aantal:int=1) -> None:
+    """Verhoogt de teller naam met aantal"""
+    if not _actief:
+        return
+    with _lock:
+        _tellers[naam] = _tellers.get(naam, 0) + aantal
+
+def meet(naam:str):
+    """Geeft een context manager die de duur van het with-blok toevoegt aan de timer naam
+
+    Voorbeeld::
+
+        with meet(PARSE):
+            ...
+    """
+    if not _actief:
+        return _geen_meting
+    return _Meting(naam)
+
+def voeg_tijd_toe(naam:str, duur:float) -> None:
+    """Voegt een gemeten duur in seconden toe aan de timer naam"""
+    if not _actief:
+        return
+    with _lock:
+        timer = _timers.get(naam)
+        if timer is None:
+            _timers[naam] = [1, duur, duur]
+        else:
+            timer[0] += 1
+            timer[1] += duur
+            timer[2] = max(timer[2], duur)
+
+def reset() -> None:
+    """Zet alle tellers en timers op nul"""
+    with _lock:
+        _tellers.clear()
+        _timers.clear()
+
+def samenvatting() -> dict:
+    """Geeft de tellers en per timer het aantal metingen, de totale, gemiddelde en maximale duur"""
+    with _lock:
+        return {
+            'tellers': dict(sorted(_tellers.items())),
+            'timers': {naam: {'aantal': int(aantal), 'totaal_s': totaal, 'gemiddeld_s': totaal / aantal, 'max_s': maximum}
+                       for naam, (aantal, totaal, maximum) in sorted(_timers.items())}
+        }
+
+def bewaar_metrics(bestandsnaam:str=METRICS_JSON) -> dict:
+    """Bewaart de samenvatting als JSON en geeft ze terug"""
+    resultaat = samenvatting()
+    with open(bestandsnaam, mode='w', encoding='utf-8') as f:
+        json.dump(resultaat, f, indent=2)
+    return resultaat
+
+def rapporteer(niveau:int=logging.INFO, resultaat:Optional[dict]=None) -> str:
+    """Logt een leesbare samenvatting (één regel per teller of timer) en geeft de tekst terug"""
+    if resultaat is None:
+        resultaat = samenvatting()
+    regels = [f"{naam:<28} {waarde:>12}" for naam, waarde in resultaat['tellers'].items()]
+    regels += [f"{naam:<28} {timer['aantal']:>12} x {timer['gemiddeld_s'] * 1000:9.3f} ms = {timer['totaal_s']:8.3f} s (max {timer['max_s'] * 1000:.3f} ms)"
+               for naam, timer in resultaat['timers'].items()]
+    tekst = '\n'.join(regels)
+    logger.log(niveau, "metrics:\n%s", tekst)
+    return tekst
@@ -0,0 +1,150 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+import zlib
+
+from thuis_metrics_utils import tel, BYTES_GESCHREVEN, BYTES_GELEZEN
+from thuis_typing import OpslagRapport
+
+OBJECTEN_DIR_NAME = 'objecten'
+OBJECT_EXTENSIE = '.z'
+COMPRESSIE_NIVEAU = 6      # zlib: hogere niveaus winnen nauwelijks iets op de fandom-pagina's en decompressie is even snel
+
+logger = logging.getLogger(__name__)
+
+def bewaar_inhoud(cachedir: str, content: bytes) -> str:
+    """Bewaart de inhoud gecomprimeerd in de cache onder de hash van de inhoud
+
+    Wanneer dezelfde inhoud al bewaard is (bv. een redirect of een nieuwe download die niet gewijzigd is),
+    wordt het bestand niet opnieuw geschreven.
+
+    Parameters
+    ----------
+    cachedir: str
+         de map van de cache
+    content: bytes
+         de (niet gecomprimeerde) inhoud van het bestand
+
+    Returns
+    -------
+    str
+         de bestandsnaam relatief ten opzichte van de cachedir (zoals bewaard in de index)
+    """
+    sleutel = hashlib.sha256(content).hexdigest()
+    bestandsnaam = os.path.join(OBJECTEN_DIR_NAME, sleutel[:2], sleutel + OBJECT_EXTENSIE)
+    pad = os.path.join(cachedir, bestandsnaam)
+    if os.path.isfile(pad):
+        logger.debug("inhoud %s zit al in de cache", sleutel)
+        return bestandsnaam
+    os.makedirs(os.path.dirname(pad), exist_ok=True)
+    fd, tmp_pad = tempfile.mkstemp(dir=os.path.dirname(pad))
+    gecomprimeerd = zlib.compress(content, COMPRESSIE_NIVEAU)
+    with os.fdopen(fd, mode='wb') as f:
+        f.write(gecomprimeerd)
+    tel(BYTES_GESCHREVEN, len(gecomprimeerd))
+    os.replace(tmp_pad, pad)     # atomair: een lezer ziet nooit een half geschreven bestand
+    logger.debug("inhoud %s bewaard (%s bytes)", sleutel, len(content))
+    return bestandsnaam
+
+def lees_inhoud(cachedir: str, bestandsnaam: str) -> bytes:
+    """Geeft de (gedecomprimeerde) inhoud van een bestand in de cache terug
+
+    Bestanden in de oude layout (ruwe HTML met de naam van de url) worden ongewijzigd gelezen.
+
+    Parameters
+    ----------
+    cachedir: str
+         de map van de cache
+    bestandsnaam: str
+         de bestandsnaam zoals bewaard in de index
+
+    Returns
+    -------
+    bytes
+         de inhoud van het bestand
+    """
+    with open(os.path.join(cachedir, bestandsnaam), mode='rb') as f:
+        data = f.read()
+    tel(BYTES_GELEZEN, len(data))
+    if is_object(bestandsnaam):
+        return zlib.decompress(data)
+    return data
+
+def is_object(bestandsnaam: str) -> bool:
+    """Geeft True terug wanneer het bestand in de gecomprimeerde layout bewaard is"""
+    return bestandsnaam.endswith(OBJECT_EXTENSIE)
+
+def verwijder_ongebruikte_objecten(cachedir: str, gebruikte_bestandsnamen: set[str]) -> int:
+    """Verwijdert de objecten waar geen enkel indexrecord meer naar verwijst
+
+    Returns
+    -------
+    int
+         het aantal verwijderde objecten
+    """
+    aantal = 0
+    objecten_dir = os.path.join(cachedir, OBJECTEN_DIR_NAME)
+    gebruikt = {os.path.normpath(naam) for naam in gebruikte_bestandsnamen}
+    for map_pad, _, bestanden in os.walk(objecten_dir):
+        for bestand in bestanden:
+            pad = os.path.join(map_pad, bestand)
+            if os.path.relpath(pad, cachedir) not in gebruikt:
+                os.remove(pad)
+                aantal += 1
+    logger.debug("%s ongebruikte objecten verwijderd", aantal)
+    return aantal
+
+def rapporteer_opslag(cachedir: str, bestandsnamen: list[str]) -> OpslagRapport:
+    """Vergelijkt de gecomprimeerde layout met de oude layout (één ruw HTML-bestand per url)
+
+    De oude layout wordt nagebootst in een tijdelijke map zodat beide layouts met dezelfde pagina's gemeten worden.
+
+    Parameters
+    ----------
+    cachedir: str
+         de map van de cache
+    bestandsnamen: list[str]
+         de bestandsnamen van alle indexrecords (één per url)
+
+    Returns
+    -------
+    OpslagRapport
+         het aantal bytes op schijf en de leessnelheid (MB/s) van beide layouts
+    """
+    unieke_objecten = {naam for naam in bestandsnamen if is_object(naam)}
+    bytes_objecten = sum(os.path.getsize(os.path.join(cachedir, naam)) for naam in unieke_objecten)
+    bytes_ruw = 0
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        ruwe_bestanden = []
+        for nr, naam in enumerate(bestandsnamen):
+            pad = os.path.join(tmp_dir, f"{nr}.html")
+            with open(pad, mode='wb') as f:
+                bytes_ruw += f.write(lees_inhoud(cachedir, naam))
+            ruwe_bestanden.append(pad)
+        start = time.perf_counter()
+        for pad in ruwe_bestanden:
+            with open(pad, mode='rb') as f:
+                f.read()
+        duur_ruw = time.perf_counter() - start
+    finally:
+        shutil.rmtree(tmp_dir)
+    start = time.perf_counter()
+    for naam in bestandsnamen:
+        lees_inhoud(cachedir, naam)
+    duur_objecten = time.perf_counter() - start
+    megabytes = bytes_ruw / 1_000_000
+    rapport:OpslagRapport = {
+        'aantal_bestanden': len(bestandsnamen),
+        'aantal_objecten': len(unieke_objecten),
+        'bytes_ruw': bytes_ruw,
+        'bytes_objecten': bytes_objecten,
+        'besparing': 1 - bytes_objecten / bytes_ruw if bytes_ruw else 0.0,
+        'mb_per_s_ruw': megabytes / duur_ruw if duur_ruw else 0.0,
+        'mb_per_s_objecten': megabytes / duur_objecten if duur_objecten else 0.0
+    }
+    logger.info("opslag: %s", rapport)
+    return rapport
@@ -0,0 +1,286 @@
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from thuis_db_utils import RELATIES_NRS_CSV
+from thuis_graaf_utils import Csr, maak_csr, lees_relatie_arr, _aantal_personages
+
+# Afstanden tussen personages (het aantal relaties in de kortste ketting) met een breadth-first search
+# waarvan de frontier een bitset is. Bij een kleine frontier worden de buren van de frontier bezocht
+# (top-down); bij een grote frontier wordt voor elk nog niet bezocht personage gekeken of een buur in de
+# frontier-bitset zit (bottom-up). alle_afstanden zoekt vanuit veel bronnen tegelijk: elk personage heeft
+# dan een bitset met één bit per bron (uint64-woorden).
+ONBEREIKBAAR = -1
+TABEL_ONBEREIKBAAR = 255     # waarde voor onbereikbaar in de tabel van alle_afstanden (uint8; bij een uint16-tabel 65535)
+BOTTOM_UP_FACTOR = 14        # bottom-up zodra de frontier meer dan 1/BOTTOM_UP_FACTOR van de relaties heeft
+BRONNEN_PER_BLOK = 1024      # aantal bronnen dat alle_afstanden tegelijk zoekt (16 woorden per personage)
+CACHE_GROOTTE = 256          # aantal afstandsrijen dat een Padzoeker bijhoudt
+
+logger = logging.getLogger(__name__)
+
+class Buurt(NamedTuple):
+    """De personages binnen k relaties van een personage, gesorteerd op afstand en daarna op nummer"""
+    persoon_nrs: np.ndarray
+    afstanden: np.ndarray
+
+def afstanden_vanaf(csr:Csr, bron:int, max_afstand:Optional[int]=None) -> np.ndarray:
+    """Geeft de afstand van een personage tot elk ander personage
+
+    Parameters
+    ----------
+    csr: Csr
+         de relaties, zie thuis_graaf_utils.maak_csr
+    bron: int
+         het personagenummer
+    max_afstand: int, optional
+         stop na zoveel relaties. Standaard zonder beperking
+
+    Returns
+    -------
+    np.ndarray
+         het aantal relaties per personage (0 voor de bron, ONBEREIKBAAR wanneer er geen ketting is)
+    """
+    n = csr.aantal_personages
+    lengtes = np.diff(csr.indptr)
+    aantal_relaties = len(csr.indices)
+    afstanden = np.full(n, ONBEREIKBAAR, dtype=np.int32)
+    afstanden[bron] = 0
+    bezocht = np.zeros(n, dtype=bool)
+    bezocht[bron] = True
+    frontier = np.zeros(n, dtype=bool)
+    frontier[bron] = True
+    frontier_nrs = np.array([bron], dtype=np.int64)
+    afstand = 0
+    while len(frontier_nrs) > 0 and (max_afstand is None or afstand < max_afstand):
+        afstand += 1
+        if lengtes[frontier_nrs].sum() * BOTTOM_UP_FACTOR > aantal_relaties:
+            #bottom-up: een personage hoort bij de volgende frontier wanneer een van zijn buren in de frontier zit
+            in_frontier = np.append(frontier[csr.indices], False)
+            volgende = np.logical_or.reduceat(in_frontier, csr.indptr[:-1]) & (lengtes > 0)
+        else:
+            volgende = np.zeros(n, dtype=bool)
+            volgende[_buren_van(csr, frontier_nrs)] = True
+        volgende &= ~bezocht
+        bezocht |= volgende
+        frontier = volgende
+        frontier_nrs = np.flatnonzero(volgende)
+        afstanden[frontier_nrs] = afstand
+    return afstanden
+
+def kortste_pad(csr:Csr, van:int, naar:int, afstanden:Optional[np.ndarray]=None) -> list[int]:
+    """Geeft een kortste ketting van relaties tussen twee personages
+
+    Wanneer er meerdere kortste kettingen zijn, wordt telkens het personage met het laagste nummer gekozen.
+
+    Parameters
+    ----------
+    csr: Csr
+         de relaties
+    van: int
+         het eerste personage
+    naar: int
+         het laatste personage
+    afstanden: np.ndarray, optional
+         het resultaat van afstanden_vanaf(csr, van), wanneer het al berekend is
+
+    Returns
+    -------
+    list[int]
+         de personagenummers van van tot en met naar. Een lege lijst wanneer er geen ketting is
+    """
+    if afstanden is None:
+        afstanden = afstanden_vanaf(csr, van)
+    if afstanden[naar] == ONBEREIKBAAR:
+        return []
+    pad = [naar]
+    huidig = naar
+    for afstand in range(int(afstanden[naar]) - 1, -1, -1):
+        buren = csr.indices[csr.indptr[huidig]:csr.indptr[huidig + 1]]
+        huidig = int(buren[np.argmax(afstanden[buren] == afstand)])   #de buren zijn gesorteerd: de eerste is de laagste
+        pad.append(huidig)
+    return pad[::-1]
+
+def alle_afstanden(csr:Csr) -> np.ndarray:
+    """Berekent de afstand tussen alle paren personages
+
+    De bronnen worden per BRONNEN_PER_BLOK tegelijk gezocht: elk niveau van de zoektocht is een OR van de
+    bitsets van de buren (np.bitwise_or.reduceat), voor alle bronnen van het blok samen. De afstand van een
+    personage is het aantal niveaus waarin het nog niet bereikt was, zodat elk niveau één optelling is.
+
+    Returns
+    -------
+    np.ndarray
+         matrix (aantal personages, aantal personages) met uint8-afstanden, TABEL_ONBEREIKBAAR wanneer er
+         geen ketting is. Neemt aantal personages² bytes in. Is er een afstand van 255 of meer, dan is de
+         matrix uint16 en is onbereikbaar 65535 (zie tabel_onbereikbaar)
+    """
+    n = csr.aantal_personages
+    tabel = np.empty((n, n), dtype=np.uint8)
+    met_buren = np.diff(csr.indptr) > 0
+    starts = csr.indptr[:-1][met_buren]
+    for blok_begin in range(0, n, BRONNEN_PER_BLOK):
+        bronnen = np.arange(blok_begin, min(n, blok_begin + BRONNEN_PER_BLOK))
+        posities = np.arange(len(bronnen))
+        bezocht = np.zeros((n, (len(bronnen) + 63) // 64), dtype='<u8')
+        bezocht[bronnen, posities // 64] = np.left_shift(np.uint64(1), (posities % 64).astype(np.uint64))
+        blok = np.zeros((n, len(bronnen)), dtype=np.uint8)
+        frontier = bezocht.copy()
+        afstand = 0
+        while True:
+            volgende = np.zeros_like(frontier)
+            if len(starts) > 0:
+                volgende[met_buren] = np.bitwise_or.reduceat(frontier[csr.indices], starts, axis=0)
+            volgende &= ~bezocht
+            if not volgende.any():
+                break
+            if afstand == np.iinfo(blok.dtype).max - 1:
+                #de afstanden passen niet meer in het type, met de waarde voor onbereikbaar erbij
+                if blok.dtype == np.uint16:
+                    raise ValueError(f"afstand van meer dan {afstand} relaties past niet in de tabel")
+                blok = blok.astype(np.uint16)
+            blok += _bits(~bezocht, len(bronnen))
+            afstand += 1
+            bezocht |= volgende
+            frontier = volgende
+        if blok.dtype == np.uint16 and tabel.dtype == np.uint8:
+            #de vorige blokken hadden enkel afstanden onder TABEL_ONBEREIKBAAR
+            tabel = tabel.astype(np.uint16)
+            tabel[:bronnen[0]][tabel[:bronnen[0]] == TABEL_ONBEREIKBAAR] = np.iinfo(np.uint16).max
+        blok = blok.astype(tabel.dtype, copy=False)
+        blok[_bits(~bezocht, len(bronnen)).astype(bool)] = tabel_onbereikbaar(tabel)
+        tabel[bronnen] = blok.T
+    return tabel
+
+def tabel_onbereikbaar(tabel:np.ndarray) -> int:
+    """Geeft de waarde voor onbereikbaar in een tabel van alle_afstanden (TABEL_ONBEREIKBAAR voor uint8)"""
+    return int(np.iinfo(tabel.dtype).max)
+
+def _bits(woorden:np.ndarray, aantal:int) -> np.ndarray:
+    #(rijen, woorden) uint64 little-endian => (rijen, aantal) met 0 of 1 per bit
+    return np.unpackbits(woorden.view(np.uint8), axis=1, bitorder='little')[:, :aantal]
+
+def _buren_van(csr:Csr, rijen:np.ndarray) -> np.ndarray:
+    #de buren van alle personages in rijen (met dubbels), zonder lus in Python
+    begin = csr.indptr[rijen]
+    lengtes = csr.indptr[rijen + 1] - begin
+    posities = np.repeat(begin - np.cumsum(lengtes) + lengtes, lengtes) + np.arange(lengtes.sum())
+    return csr.indices[posities]
+
+class Padzoeker:
+    """Beantwoordt padvragen (afstand, kortste ketting, buurt) over alle seizoenen of een bereik van seizoenen
+
+    De sparse matrix per seizoenbereik en de afstanden vanaf elk gevraagd personage worden bijgehouden (de
+    afstanden in een LRU-cache van cache_grootte rijen), zodat herhaalde vragen niet opnieuw zoeken.
+    Met bereken_alle_afstanden wordt voor een bereik een tabel met alle afstanden gemaakt: elke afstand
+    is dan één opzoeking.
+
+    Zonder relatie_arr worden de relaties gelezen uit bestandsnaam. Bij elke vraag wordt gecontroleerd of het
+    bestand gewijzigd is (grootte en wijzigingstijd); zo ja, dan worden de relaties opnieuw gelezen en wordt
+    alles gewist. Met een relatie_arr worden nieuwe relaties doorgegeven met zet_relaties.
+
+    Voorbeeld::
+
+        zoeker = Padzoeker()
+        zoeker.kortste_pad(12, 40, seizoen_van=5, seizoen_tot=10)
+    """
+
+    def __init__(self, relatie_arr:Optional[np.ndarray]=None, bestandsnaam:str=RELATIES_NRS_CSV, cache_grootte:int=CACHE_GROOTTE):
+        self.bestandsnaam = None if relatie_arr is not None else bestandsnaam
+        self.cache_grootte = cache_grootte
+        self._bestand_versie = None
+        self._vingerafdruk = None
+        self._csr:dict[tuple, Csr] = {}
+        self._tabellen:dict[tuple, np.ndarray] = {}
+        self._afstanden:OrderedDict[tuple, np.ndarray] = OrderedDict()
+        if relatie_arr is not None:
+            self.zet_relaties(relatie_arr)
+
+    def zet_relaties(self, relatie_arr:np.ndarray) -> None:
+        """Gebruikt nieuwe relaties. De cache wordt enkel gewist wanneer de relaties echt veranderd zijn"""
+        vingerafdruk = hashlib.blake2b(np.ascontiguousarray(relatie_arr).tobytes() + str(relatie_arr.dtype).encode()).hexdigest()
+        if vingerafdruk == self._vingerafdruk:
+            return
+        self.relatie_arr = relatie_arr
+        self.aantal_personages = _aantal_personages(relatie_arr)
+        self._vingerafdruk = vingerafdruk
+        self.wis_cache()
+
+    def wis_cache(self) -> None:
+        self._csr.clear()
+        self._tabellen.clear()
+        self._afstanden.clear()
+
+    def afstand(self, persoon_nr1:int, persoon_nr2:int, seizoen_van:Optional[int]=None, seizoen_tot:Optional[int]=None) -> int:
+        """Geeft het aantal relaties in de kortste ketting tussen twee personages (ONBEREIKBAAR wanneer er geen is)"""
+        bereik = self._controleer(seizoen_van, seizoen_tot, persoon_nr1, persoon_nr2)
+        tabel = self._tabellen.get(bereik)
+        if tabel is not None:
+            afstand = int(tabel[persoon_nr1, persoon_nr2])
+            return ONBEREIKBAAR if afstand == tabel_onbereikbaar(tabel) else afstand
+        return int(self._afstanden_vanaf(bereik, persoon_nr1)[persoon_nr2])
+
+    def kortste_pad(self, persoon_nr1:int, persoon_nr2:int, seizoen_van:Optional[int]=None, seizoen_tot:Optional[int]=None) -> list[int]:
+        """Geeft een kortste ketting van relaties tussen twee personages (zie kortste_pad), een lege lijst wanneer er geen is"""
+        bereik = self._controleer(seizoen_van, seizoen_tot, persoon_nr1, persoon_nr2)
+        tabel = self._tabellen.get(bereik)
+        if tabel is not None:
+            #de afstanden tot persoon_nr1 staan in de tabel: zoek van persoon_nr2 terug naar persoon_nr1
+            afstanden = tabel[persoon_nr1].astype(np.int32)
+            afstanden[afstanden == tabel_onbereikbaar(tabel)] = ONBEREIKBAAR
+        else:
+            afstanden = self._afstanden_vanaf(bereik, persoon_nr1)
+        return kortste_pad(self._get_csr(bereik), persoon_nr1, persoon_nr2, afstanden)
+
+    def buurt(self, persoon_nr:int, k:int=2, seizoen_van:Optional[int]=None, seizoen_tot:Optional[int]=None) -> Buurt:
+        """Geeft de personages die hoogstens k relaties van een personage verwijderd zijn (zonder het personage zelf)"""
+        bereik = self._controleer(seizoen_van, seizoen_tot, persoon_nr)
+        afstanden = self._afstanden_vanaf(bereik, persoon_nr)
+        persoon_nrs = np.flatnonzero((afstanden > 0) & (afstanden <= k))
+        volgorde = np.argsort(afstanden[persoon_nrs], kind='stable')
+        return Buurt(persoon_nrs[volgorde], afstanden[persoon_nrs[volgorde]])
+
+    def bereken_alle_afstanden(self, seizoen_van:Optional[int]=None, seizoen_tot:Optional[int]=None) -> np.ndarray:
+        """Maakt de tabel met alle afstanden voor een seizoenbereik (zie alle_afstanden) en bewaart ze in de cache"""
+        bereik = self._controleer(seizoen_van, seizoen_tot)
+        tabel = self._tabellen.get(bereik)
+        if tabel is None:
+            tabel = alle_afstanden(self._get_csr(bereik))
+            self._tabellen[bereik] = tabel
+            logger.info("tabel met alle afstanden voor seizoenen %s: %d personages, %.1f MB", bereik, len(tabel), tabel.nbytes / 1e6)
+        return tabel
+
+    def _controleer(self, seizoen_van:Optional[int], seizoen_tot:Optional[int], *persoon_nrs:int) -> tuple:
+        if self.bestandsnaam is not None:
+            info = os.stat(self.bestandsnaam)
+            versie = (info.st_size, info.st_mtime_ns)
+            if versie != self._bestand_versie:
+                logger.debug("%s gewijzigd: relaties opnieuw lezen", self.bestandsnaam)
+                self.zet_relaties(lees_relatie_arr(self.bestandsnaam))
+                self._bestand_versie = versie
+        for persoon_nr in persoon_nrs:
+            if not 0 <= persoon_nr < self.aantal_personages:
+                raise ValueError(f"personagenummer {persoon_nr} heeft geen relaties (0 tot {self.aantal_personages - 1})")
+        return (seizoen_van, seizoen_tot)
+
+    def _get_csr(self, bereik:tuple) -> Csr:
+        csr = self._csr.get(bereik)
+        if csr is None:
+            csr = maak_csr(self.relatie_arr, self.aantal_personages, *bereik)
+            self._csr[bereik] = csr
+        return csr
+
+    def _afstanden_vanaf(self, bereik:tuple, persoon_nr:int) -> np.ndarray:
+        sleutel = (bereik, persoon_nr)
+        afstanden = self._afstanden.get(sleutel)
+        if afstanden is not None:
+            self._afstanden.move_to_end(sleutel)
+            return afstanden
+        afstanden = afstanden_vanaf(self._get_csr(bereik), persoon_nr)
+        self._afstanden[sleutel] = afstanden
+        if len(self._afstanden) > self.cache_grootte:
+            self._afstanden.popitem(last=False)
+        return afstanden
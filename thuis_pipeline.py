@@ -0,0 +1,315 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from csv import DictReader
+from itertools import chain
+from typing import Callable, NamedTuple, Optional
+
+import thuis_metrics_utils
+from thuis_analyse_utils import langste_relaties
+from thuis_cluster_utils import maak_cluster_geschiedenis
+from thuis_db_utils import (DB_BESTAND, RELATIES_NRS_CSV, init_db, laad_personages_csv, lees_personage_index, zoek_relatie_nrs, bewaar_relaties,
+                            bewaar_personage_stroom, bewaar_relatie_stroom, lees_seizoen_bits)
+from thuis_graaf_utils import lees_relatie_arr, maak_csr, graad, tel_driehoeken
+from thuis_html_utils import (BASIS_URL, RELATIE_URL, HOOFDPERSONAGES_URL, NEVENERSONAGES_URL, PARSER_BS4, PARSER_LXML, PARSER_VERSIE,
+                              HOOFDPERSONAGE_CSV, NEVENPERSONAGE_CSV, GASTPERSONAGE_CSV, RELATIES_NAMEN_CSV, PERSONAGE_HEADERS,
+                              RELATIE_HEADERS, _get_parser, _lees_gastpersonages, _schrijf_csv, extract_relaties, extract_hoofdpersonages,
+                              extract_nevenpersonages, extract_gastpersonages, schrijf_csv_onderweg, stroom_hoofdpersonages,
+                              stroom_nevenpersonages, stroom_gastpersonages, stroom_relaties)
+from thuis_http_utils import get_fileinfo, get_fileinfos, MAX_WORKERS
+from thuis_memo_utils import memoiseer
+from thuis_seizoen_utils import meest_samen_gespeeld
+from thuis_snapshot_utils import SNAPSHOT_DIR, META_JSON, maak_snapshot
+from thuis_typing import OnopgelostPersonage, RelatieNrsData
+
+# De workflow van de notebook als graaf van stappen: extract -> CSV -> SQLite -> relaties_nrs -> analyses.
+# Een stap wordt overgeslagen wanneer de vingerafdruk van haar invoer niet veranderd is sinds de vorige
+# uitvoering en haar uitvoer nog bestaat (zoals make). Stappen die niet van elkaar afhangen lopen gelijktijdig
+# in threads: dat helpt voor de downloads, maar het parsen houdt de GIL vast. Daarom parsen de extract-stappen
+# de detailpagina's standaard in PROCESSEN processen.
+PIPELINE_JSON = 'pipeline_toestand.json'
+ANALYSES_JSON = 'analyses.json'
+RELATIE_NRS_HEADERS = list(RelatieNrsData.__annotations__.keys())
+
+STATUS_UITGEVOERD = 'uitgevoerd'
+STATUS_OVERGESLAGEN = 'overgeslagen'
+STATUS_MISLUKT = 'mislukt'
+STATUS_NIET_UITGEVOERD = 'niet uitgevoerd'   # een vorige stap is mislukt
+# processen per extract-stap: hoofd- en nevenpersonages lopen gelijktijdig en delen de processoren
+PROCESSEN = max(1, (os.cpu_count() or 1) // 2)
+
+logger = logging.getLogger(__name__)
+
+class Instellingen(NamedTuple):
+    download: bool = False
+    parser: str = PARSER_BS4
+    max_workers: int = MAX_WORKERS
+    processen: int = PROCESSEN
+
+class Stap(NamedTuple):
+    """Een stap van de pipeline
+
+    invoer geeft de vingerafdruk van alles waarvan de stap afhangt (bestanden, pagina's in de cache, ...);
+    uitvoer zijn de bestanden die de stap maakt.
+    """
+    naam: str
+    afhankelijk_van: tuple[str, ...]
+    invoer: Callable[[Instellingen], object]
+    uitvoer: tuple[str, ...]
+    functie: Callable[[Instellingen], None]
+
+class StapResultaat(NamedTuple):
+    naam: str
+    status: str
+    duur: float
+    fout: Optional[str] = None
+
+def maak_stappen() -> dict[str, Stap]:
+    """Geeft de stappen van de pipeline in een volgorde die de afhankelijkheden respecteert"""
+    stappen = [
+        Stap('relaties', (), lambda inst: _pagina_versies([RELATIE_URL], inst), (RELATIES_NAMEN_CSV,),
+             lambda inst: extract_relaties(inst.download, inst.parser)),
+        Stap('hoofdpersonages', (), lambda inst: _lijst_versies(HOOFDPERSONAGES_URL, '_lees_hoofdpersonage_urls', inst), (HOOFDPERSONAGE_CSV,),
+             lambda inst: extract_hoofdpersonages(inst.download, inst.max_workers, inst.parser, inst.processen)),
+        Stap('nevenpersonages', (), lambda inst: _lijst_versies(NEVENERSONAGES_URL, '_lees_nevenpersonage_urls', inst), (NEVENPERSONAGE_CSV,),
+             lambda inst: extract_nevenpersonages(inst.download, inst.max_workers, inst.parser, inst.processen)),
+        Stap('gastpersonages', (), lambda inst: _lees_gastpersonages(), (GASTPERSONAGE_CSV,),
+             lambda inst: extract_gastpersonages()),
+        Stap('databank', ('hoofdpersonages', 'nevenpersonages', 'gastpersonages'),
+             lambda inst: _bestand_versies([HOOFDPERSONAGE_CSV, NEVENPERSONAGE_CSV, GASTPERSONAGE_CSV]), (DB_BESTAND,),
+             lambda inst: laad_personages_csv([HOOFDPERSONAGE_CSV, NEVENPERSONAGE_CSV, GASTPERSONAGE_CSV])),
+        Stap('relaties_nrs', ('relaties', 'databank'),
+             lambda inst: _bestand_versies([RELATIES_NAMEN_CSV, HOOFDPERSONAGE_CSV, NEVENPERSONAGE_CSV, GASTPERSONAGE_CSV]), (RELATIES_NRS_CSV,),
+             lambda inst: maak_relatie_nrs()),
+        Stap('snapshot', ('relaties_nrs',),
+             lambda inst: _bestand_versies([RELATIES_NRS_CSV, HOOFDPERSONAGE_CSV, NEVENPERSONAGE_CSV, GASTPERSONAGE_CSV]),
+             (os.path.join(SNAPSHOT_DIR, META_JSON),), lambda inst: maak_snapshot()),
+        Stap('analyses', ('relaties_nrs',),
+             lambda inst: _bestand_versies([RELATIES_NRS_CSV, HOOFDPERSONAGE_CSV, NEVENPERSONAGE_CSV, GASTPERSONAGE_CSV]), (ANALYSES_JSON,),
+             lambda inst: maak_analyses()),
+    ]
+    return {stap.naam: stap for stap in stappen}
+
+def voer_uit(doelen:Optional[list[str]]=None, instellingen:Instellingen=Instellingen(), forceer=False,
+             max_stappen:int=4) -> list[StapResultaat]:
+    """Voert de stappen (en de stappen waarvan ze afhangen) uit
+
+    Parameters
+    ----------
+    doelen: list[str], optional
+         de namen van de stappen die uitgevoerd moeten worden (None = alle stappen)
+    instellingen: Instellingen, optional
+         download, parser, max_workers en processen voor de extract-stappen
+    forceer: bool, optional
+         True => ook de stappen waarvan de invoer niet veranderd is uitvoeren
+    max_stappen: int, optional
+         het maximaal aantal stappen dat gelijktijdig loopt
+
+    Returns
+    -------
+    list[StapResultaat]
+         per stap de status (uitgevoerd, overgeslagen, mislukt of niet uitgevoerd) en de duur in seconden
+
+    Raises
+    ------
+    ValueError
+         wanneer een doel geen stap is
+    """
+    stappen = maak_stappen()
+    te_doen = _met_afhankelijkheden(stappen, doelen if doelen is not None else list(stappen))
+    toestand = _lees_toestand()
+    resultaten:dict[str, StapResultaat] = {}
+    lopend:dict[Future, str] = {}
+    with ThreadPoolExecutor(max_workers=max_stappen) as executor:
+        while len(resultaten) < len(te_doen):
+            for naam in te_doen:
+                if naam in resultaten or naam in lopend.values():
+                    continue
+                afhankelijk = [resultaten.get(vorige) for vorige in stappen[naam].afhankelijk_van]
+                if any(resultaat is not None and resultaat.status in (STATUS_MISLUKT, STATUS_NIET_UITGEVOERD) for resultaat in afhankelijk):
+                    resultaten[naam] = StapResultaat(naam, STATUS_NIET_UITGEVOERD, 0.0)
+                elif all(resultaat is not None for resultaat in afhankelijk):
+                    lopend[executor.submit(_voer_stap_uit, stappen[naam], instellingen, toestand, forceer)] = naam
+            if len(lopend) == 0:
+                continue
+            klaar, _ = wait(lopend, return_when=FIRST_COMPLETED)
+            for future in klaar:
+                resultaat = future.result()
+                resultaten[lopend.pop(future)] = resultaat
+                logger.info("stap %-16s %-16s %7.2fs", resultaat.naam, resultaat.status, resultaat.duur)
+    _bewaar_toestand(toestand)
+    return [resultaten[naam] for naam in te_doen]
+
+def maak_relatie_nrs() -> None:
+    """Vervangt de voornamen in relaties_namen.csv door personagenummers en bewaart relaties_nrs.csv en de tabel RELATIE
+
+    Raises
+    ------
+    ValueError
+         wanneer er personages niet gevonden worden
+    """
+    with open(RELATIES_NAMEN_CSV, mode='r', newline='', encoding='utf-8') as f:
+        relatie_namen = list(DictReader(f, delimiter=';'))
+    relatie_nrs, onopgelost = zoek_relatie_nrs(relatie_namen, lees_personage_index())
+    niet_gevonden = [personage for personage in onopgelost if len(personage['kandidaten']) == 0]
+    if len(niet_gevonden) > 0:
+        raise ValueError(f"{len(niet_gevonden)} personages niet gevonden: {niet_gevonden[:5]}")
+    _schrijf_csv(RELATIES_NRS_CSV, RELATIE_NRS_HEADERS, relatie_nrs)
+    bewaar_relaties(relatie_nrs)
+
+def laad_stroom(instellingen:Instellingen=Instellingen(), csv=False) -> list[OnopgelostPersonage]:
+    """Maakt de databank opnieuw rechtstreeks uit de geparste pagina's, zonder de CSV-bestanden te lezen
+
+    De personages (hoofd-, neven- en gastpersonages, in die volgorde en dus met dezelfde ID's als via de
+    CSV-bestanden) en daarna de relaties stromen per batch naar de databank terwijl de pagina's geparset
+    worden. De stappen van voer_uit houden hiermee geen rekening: hun vingerafdrukken blijven ongewijzigd.
+
+    Parameters
+    ----------
+    instellingen: Instellingen, optional
+         download, parser, max_workers en processen voor het lezen van de pagina's
+    csv: bool, optional
+         True => schrijf onderweg ook alle CSV-bestanden (inclusief relaties_nrs.csv)
+
+    Returns
+    -------
+    list[OnopgelostPersonage]
+         de personages uit de relaties die niet (eenduidig) gevonden zijn
+
+    Raises
+    ------
+    sqlite3.Error, OSError
+         wanneer de personages of de relaties niet bewaard konden worden; na een fout bij de personages
+         worden de relaties niet gekoppeld
+    """
+    inst = instellingen
+    personages = [(HOOFDPERSONAGE_CSV, stroom_hoofdpersonages(inst.download, inst.max_workers, inst.parser, inst.processen)),
+                  (NEVENPERSONAGE_CSV, stroom_nevenpersonages(inst.download, inst.max_workers, inst.parser, inst.processen)),
+                  (GASTPERSONAGE_CSV, stroom_gastpersonages())]
+    if csv:
+        personages = [(bestandsnaam, schrijf_csv_onderweg(stroom, bestandsnaam, PERSONAGE_HEADERS)) for bestandsnaam, stroom in personages]
+    relaties = stroom_relaties(inst.download, inst.parser)
+    if csv:
+        relaties = schrijf_csv_onderweg(relaties, RELATIES_NAMEN_CSV, RELATIE_HEADERS)
+    init_db()
+    bewaar_personage_stroom(chain.from_iterable(stroom for _, stroom in personages))
+    return bewaar_relatie_stroom(relaties, lees_personage_index(), relaties_nrs_csv=RELATIES_NRS_CSV if csv else None)
+
+def maak_analyses(k:int=10) -> dict:
+    """Berekent de belangrijkste resultaten van de notebook en bewaart ze in analyses.json"""
+    relatie_arr = lees_relatie_arr()
+    csr = maak_csr(relatie_arr)
+    graden = graad(csr)
+    clusters = maak_cluster_geschiedenis(relatie_arr, csr.aantal_personages)
+    analyses = {
+        'aantal_relaties': int(len(relatie_arr)),
+        'aantal_personages': csr.aantal_personages,
+        'meeste_partners': [[int(nr), int(graden[nr])] for nr in graden.argsort(kind='stable')[::-1][:k]],
+        'driehoeken': tel_driehoeken(csr),
+        'langste_relaties': [list(relatie) for relatie in langste_relaties(relatie_arr, k)],
+        'aantal_clusters': int(clusters.aantal_clusters[-1]) if len(clusters.seizoenen) > 0 else 0,
+        'grootste_cluster': int(clusters.grootste_cluster[-1]) if len(clusters.seizoenen) > 0 else 1,
+        'meest_samen_gespeeld': meest_samen_gespeeld(lees_seizoen_bits(), k).tolist()
+    }
+    with open(ANALYSES_JSON, mode='w', encoding='utf-8') as f:
+        json.dump(analyses, f, indent=2)
+    return analyses
+
+def _voer_stap_uit(stap:Stap, instellingen:Instellingen, toestand:dict, forceer:bool) -> StapResultaat:
+    start = time.perf_counter()
+    try:
+        vingerafdruk = _vingerafdruk(stap, instellingen)
+        if not forceer and toestand.get(stap.naam) == vingerafdruk and all(os.path.exists(pad) for pad in stap.uitvoer):
+            return StapResultaat(stap.naam, STATUS_OVERGESLAGEN, time.perf_counter() - start)
+        #de vingerafdruk heeft de pagina's al gecontroleerd op de website: de stap zelf leest enkel de cache
+        instellingen = instellingen._replace(download=False)
+        with thuis_metrics_utils.meet(f"pipeline.{stap.naam}"):
+            stap.functie(instellingen)
+        toestand[stap.naam] = _vingerafdruk(stap, instellingen)
+        return StapResultaat(stap.naam, STATUS_UITGEVOERD, time.perf_counter() - start)
+    except Exception as error:
+        logger.exception("stap %s mislukt", stap.naam)
+        toestand.pop(stap.naam, None)
+        return StapResultaat(stap.naam, STATUS_MISLUKT, time.perf_counter() - start, repr(error))
+
+def _vingerafdruk(stap:Stap, instellingen:Instellingen) -> str:
+    invoer = {'invoer': stap.invoer(instellingen), 'parser': instellingen.parser, 'parser_versie': PARSER_VERSIE}
+    return hashlib.sha256(json.dumps(invoer, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def _pagina_versies(urls:list[str], instellingen:Instellingen) -> list[tuple[str, str]]:
+    """De versies van de pagina's in de cache (met download=True eerst gecontroleerd op de website)"""
+    fileinfos = get_fileinfos(urls, instellingen.download, instellingen.max_workers)
+    return [(fileinfo['bestandsnaam'], fileinfo['laatste_wijziging']) for fileinfo in fileinfos]
+
+def _lijst_versies(lijst_url:str, functie:str, instellingen:Instellingen) -> list[tuple[str, str]]:
+    """De versie van een lijstpagina en van alle detailpagina's in de lijst"""
+    fileinfo = get_fileinfo(lijst_url, instellingen.download)
+    urls = memoiseer(fileinfo, getattr(_get_parser(instellingen.parser), functie), PARSER_VERSIE)
+    return _pagina_versies([lijst_url] + [BASIS_URL + url for url in urls], instellingen)
+
+def _bestand_versies(bestandsnamen:list[str]) -> list[Optional[str]]:
+    """De hash van de inhoud van elk bestand: een bestand dat herschreven wordt met dezelfde inhoud is niet gewijzigd"""
+    versies = []
+    for bestandsnaam in bestandsnamen:
+        try:
+            with open(bestandsnaam, mode='rb') as f:
+                versies.append(hashlib.sha256(f.read()).hexdigest())
+        except FileNotFoundError:
+            versies.append(None)
+    return versies
+
+def _met_afhankelijkheden(stappen:dict[str, Stap], doelen:list[str]) -> list[str]:
+    """Geeft de doelen en alle stappen waarvan ze (onrechtstreeks) afhangen, in de volgorde van maak_stappen"""
+    nodig = set()
+    te_bezoeken = list(doelen)
+    while len(te_bezoeken) > 0:
+        naam = te_bezoeken.pop()
+        if naam not in stappen:
+            raise ValueError(f"onbekende stap {naam}, kies uit {list(stappen)}")
+        if naam not in nodig:
+            nodig.add(naam)
+            te_bezoeken.extend(stappen[naam].afhankelijk_van)
+    return [naam for naam in stappen if naam in nodig]
+
+def _lees_toestand() -> dict:
+    if not os.path.exists(PIPELINE_JSON):
+        return {}
+    with open(PIPELINE_JSON, mode='r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _bewaar_toestand(toestand:dict) -> None:
+    with open(PIPELINE_JSON, mode='w', encoding='utf-8') as f:
+        json.dump(toestand, f, indent=2)
+
+def main(argumenten:Optional[list[str]]=None) -> int:
+    parser = argparse.ArgumentParser(description="Voert de stappen van de Thuis-analyse uit (extract -> CSV -> SQLite -> relaties_nrs -> analyses)")
+    parser.add_argument('doelen', nargs='*', help=f"de stappen die uitgevoerd moeten worden, standaard alle: {', '.join(maak_stappen())}")
+    parser.add_argument('--download', action='store_true', help="controleer op de website of de pagina's gewijzigd zijn")
+    parser.add_argument('--parser', choices=[PARSER_BS4, PARSER_LXML], default=PARSER_BS4)
+    parser.add_argument('--max-workers', type=int, default=MAX_WORKERS, help="aantal gelijktijdige downloads")
+    parser.add_argument('--processen', type=int, default=PROCESSEN,
+                        help=f"aantal processen per extract-stap om de detailpagina's te parsen (standaard {PROCESSEN}, 1 = in de thread van de stap)")
+    parser.add_argument('--max-stappen', type=int, default=4, help="aantal stappen dat gelijktijdig loopt")
+    parser.add_argument('--forceer', action='store_true', help="voer ook de stappen uit waarvan de invoer niet veranderd is")
+    parser.add_argument('--metrics', action='store_true', help="verzamel metrics en bewaar ze in metrics.json")
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argumenten)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+    if args.metrics:
+        thuis_metrics_utils.activeer()
+    instellingen = Instellingen(args.download, args.parser, args.max_workers, args.processen)
+    resultaten = voer_uit(args.doelen or None, instellingen, args.forceer, args.max_stappen)
+    print(f"{'stap':<16} {'status':<16} {'duur':>8}")
+    for resultaat in resultaten:
+        print(f"{resultaat.naam:<16} {resultaat.status:<16} {resultaat.duur:>7.2f}s" + (f"  {resultaat.fout}" if resultaat.fout else ''))
+    if args.metrics:
+        thuis_metrics_utils.rapporteer(resultaat=thuis_metrics_utils.bewaar_metrics())
+    return 1 if any(resultaat.status in (STATUS_MISLUKT, STATUS_NIET_UITGEVOERD) for resultaat in resultaten) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,294 @@
+import argparse
+import logging
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple, Optional
+
+import thuis_http_utils
+import thuis_metrics_utils
+from thuis_http_utils import CACHE_DIR_NAME, INDEX_DB_NAME, SQL_SELECT_CACHE_INDEX, get_fileinfo
+from thuis_opslag_utils import lees_inhoud
+
+# Een lokale vervanger van de fandom website: de pagina's uit .filecachedir worden opnieuw aangeboden, zodat de
+# downloadcode (conditional GET, redirects, cache) getest en belast kan worden zonder de echte website te gebruiken.
+CHUNK_GROOTTE = 16 * 1024        # bytes per keer geschreven wanneer de bandbreedte beperkt is
+STATUS_PARAMETER = 'replay_status'   # ?replay_status=503 forceert een status voor één request
+RETRY_AFTER = 1                  # seconden in de Retry-After header van een 429-antwoord
+
+logger = logging.getLogger(__name__)
+
+class ReplayInstellingen(NamedTuple):
+    """Het gedrag van de replay server
+
+    latentie: vaste wachttijd in seconden voor elk antwoord
+    jitter: bijkomende willekeurige wachttijd tussen 0 en jitter seconden
+    bandbreedte: maximum aantal bytes per seconde per antwoord (0 = onbeperkt)
+    fouten: kans per status, bv. {429: 0.01, 503: 0.02}
+    geforceerd: status per pad, bv. {'/nl/wiki/Relaties': 500}
+    """
+    latentie: float = 0.0
+    jitter: float = 0.0
+    bandbreedte: int = 0
+    fouten: dict[int, float] = {}
+    geforceerd: dict[str, int] = {}
+    seed: Optional[int] = None
+
+class ReplayPagina(NamedTuple):
+    bestandsnaam: str
+    laatste_wijziging: str
+    redirect_pad: Optional[str]      # het pad waarnaar verwezen wordt (301) of None
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, adres:tuple[str, int], cachedir:str, paginas:dict[str, ReplayPagina], instellingen:ReplayInstellingen):
+        super().__init__(adres, _ReplayHandler)
+        self.cachedir = cachedir
+        self.paginas = paginas
+        self.instellingen = instellingen
+        self.random = random.Random(instellingen.seed)
+        self.random_lock = threading.Lock()
+
+    @property
+    def basis_url(self) -> str:
+        host, poort = self.server_address[:2]
+        return f"http://{host}:{poort}"
+
+    def lokale_url(self, url:str) -> str:
+        """Zet een url van de website om naar dezelfde pagina op deze server"""
+        return self.basis_url + _pad(url)
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    server: ReplayServer
+    protocol_version = 'HTTP/1.1'     # keep-alive, zoals de echte website
+    disable_nagle_algorithm = True    # anders wacht de body van een klein antwoord op de (vertraagde) ACK van de headers
+
+    def do_GET(self):
+        instellingen = self.server.instellingen
+        with self.server.random_lock:
+            wachttijd = instellingen.latentie + self.server.random.uniform(0, instellingen.jitter)
+            toeval = self.server.random.random()
+        if wachttijd > 0:
+            time.sleep(wachttijd)
+        gesplitst = urllib.parse.urlsplit(self.path)
+        status = _gevraagde_status(gesplitst.query, gesplitst.path, instellingen, toeval)
+        pad = gesplitst.path + (f"?{_zonder_status(gesplitst.query)}" if _zonder_status(gesplitst.query) else '')
+        if status is not None:
+            self._stuur_leeg(status, {'Retry-After': str(RETRY_AFTER)} if status == 429 else {})
+            return
+        pagina = self.server.paginas.get(pad)
+        if pagina is None:
+            self._stuur_leeg(404)
+            return
+        if pagina.redirect_pad is not None:
+            self._stuur_leeg(301, {'Location': self.server.basis_url + pagina.redirect_pad})
+            return
+        if _niet_gewijzigd(self.headers.get('If-Modified-Since'), pagina.laatste_wijziging):
+            self._stuur_leeg(304)
+            return
+        inhoud = lees_inhoud(self.server.cachedir, pagina.bestandsnaam)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(inhoud)))
+        self.send_header('Last-Modified', pagina.laatste_wijziging)
+        self.end_headers()
+        if instellingen.bandbreedte <= 0:
+            self.wfile.write(inhoud)
+            return
+        for start in range(0, len(inhoud), CHUNK_GROOTTE):
+            chunk = inhoud[start:start + CHUNK_GROOTTE]
+            self.wfile.write(chunk)
+            time.sleep(len(chunk) / instellingen.bandbreedte)
+
+    def _stuur_leeg(self, status:int, headers:Optional[dict[str, str]]=None) -> None:
+        self.send_response(status)
+        for naam, waarde in (headers or {}).items():
+            self.send_header(naam, waarde)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        logger.debug("%s " + format, self.address_string(), *args)
+
+class Belastingsresultaat(NamedTuple):
+    aantal_requests: int
+    aantal_fouten: int
+    duur: float
+    requests_per_s: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    metrics: dict
+
+def lees_replay_paginas(cachedir:str) -> dict[str, ReplayPagina]:
+    """Leest de index van de cache en geeft per pad (met query) de pagina die de server aanbiedt
+
+    Een url waarvan de redirect_url verschilt, verwijst met 301 naar het pad van de redirect_url.
+    """
+    paginas:dict[str, ReplayPagina] = {}
+    with sqlite3.connect(os.path.join(cachedir, INDEX_DB_NAME)) as conn:
+        rijen = conn.execute(SQL_SELECT_CACHE_INDEX).fetchall()
+    for url, bestandsnaam, laatste_wijziging, redirect_url in rijen:
+        paginas.setdefault(_pad(redirect_url), ReplayPagina(bestandsnaam, laatste_wijziging, None))
+    for url, bestandsnaam, laatste_wijziging, redirect_url in rijen:
+        if _pad(url) != _pad(redirect_url):
+            paginas[_pad(url)] = ReplayPagina(bestandsnaam, laatste_wijziging, _pad(redirect_url))
+    logger.info("%d pagina's uit %s", len(paginas), cachedir)
+    return paginas
+
+def start_server(cachedir:Optional[str]=None, instellingen:ReplayInstellingen=ReplayInstellingen(), host='127.0.0.1', poort=0) -> ReplayServer:
+    """Start de replay server in een achtergrondthread
+
+    Parameters
+    ----------
+    cachedir: str, optional
+         de cache met de pagina's (standaard thuis_http_utils.cache_dir())
+    instellingen: ReplayInstellingen, optional
+         latentie, bandbreedte en fouten
+    poort: int, optional
+         0 => een vrije poort (zie server.basis_url)
+
+    Returns
+    -------
+    ReplayServer
+         stop de server met server.shutdown()
+    """
+    if cachedir is None:
+        cachedir = thuis_http_utils.cache_dir()
+    server = ReplayServer((host, poort), cachedir, lees_replay_paginas(cachedir), instellingen)
+    threading.Thread(target=server.serve_forever, name='replay-server', daemon=True).start()
+    logger.info("replay server luistert op %s", server.basis_url)
+    return server
+
+def belastingstest(server:ReplayServer, herhalingen:int=2, max_workers:int=thuis_http_utils.MAX_WORKERS,
+                   max_per_host:int=thuis_http_utils.MAX_PER_HOST) -> list[Belastingsresultaat]:
+    """Haalt alle pagina's van de server op met thuis_http_utils in een lege, tijdelijke cache
+
+    De eerste herhaling downloadt alles (200), de volgende herhalingen controleren enkel (304).
+    De echte cache wordt niet gebruikt.
+
+    Returns
+    -------
+    list[Belastingsresultaat]
+         per herhaling het aantal requests en fouten, de doorvoer, de percentielen van de duur per pagina
+         en de metrics (cache hits, 200/304, bytes)
+    """
+    urls = [server.basis_url + pad for pad in server.paginas]
+    resultaten = []
+    oude_cache_dir = thuis_http_utils.CACHE_DIR_PATH
+    was_actief = thuis_metrics_utils.is_actief()
+    thuis_metrics_utils.activeer()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        thuis_http_utils.CACHE_DIR_PATH = os.path.join(tmp_dir, CACHE_DIR_NAME)
+        try:
+            for herhaling in range(herhalingen):
+                thuis_metrics_utils.reset()
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    metingen = list(executor.map(lambda url: _meet_download(url, max_per_host), urls))
+                duur = time.perf_counter() - start
+                tijden = sorted(tijd for tijd, gelukt in metingen)
+                resultaat = Belastingsresultaat(len(urls), sum(1 for tijd, gelukt in metingen if not gelukt), duur,
+                                                len(urls) / duur if duur > 0 else 0.0, _percentiel(tijden, 50),
+                                                _percentiel(tijden, 95), _percentiel(tijden, 99), thuis_metrics_utils.samenvatting()['tellers'])
+                logger.info("herhaling %d: %s", herhaling + 1, resultaat)
+                resultaten.append(resultaat)
+        finally:
+            thuis_http_utils.CACHE_DIR_PATH = oude_cache_dir
+            thuis_metrics_utils.activeer(was_actief)
+    return resultaten
+
+def _meet_download(url:str, max_per_host:int) -> tuple[float, bool]:
+    start = time.perf_counter()
+    try:
+        get_fileinfo(url, download=True, max_per_host=max_per_host)
+        gelukt = True
+    except Exception as error:
+        logger.debug("%s mislukt: %s", url, error)
+        gelukt = False
+    return (time.perf_counter() - start) * 1000, gelukt
+
+def _percentiel(gesorteerd:list[float], percentiel:int) -> float:
+    if len(gesorteerd) == 0:
+        return 0.0
+    return gesorteerd[min(len(gesorteerd) - 1, len(gesorteerd) * percentiel // 100)]
+
+def _pad(url:str) -> str:
+    gesplitst = urllib.parse.urlsplit(url)
+    return gesplitst.path + (f"?{gesplitst.query}" if gesplitst.query else '')
+
+def _zonder_status(query:str) -> str:
+    return urllib.parse.urlencode([(naam, waarde) for naam, waarde in urllib.parse.parse_qsl(query) if naam != STATUS_PARAMETER])
+
+def _gevraagde_status(query:str, pad:str, instellingen:ReplayInstellingen, toeval:float) -> Optional[int]:
+    """Geeft de foutstatus voor dit request (geforceerd of willekeurig volgens de kansen) of None"""
+    for naam, waarde in urllib.parse.parse_qsl(query):
+        if naam == STATUS_PARAMETER:
+            return int(waarde)
+    if pad in instellingen.geforceerd:
+        return instellingen.geforceerd[pad]
+    grens = 0.0
+    for status, kans in instellingen.fouten.items():
+        grens += kans
+        if toeval < grens:
+            return status
+    return None
+
+def _niet_gewijzigd(if_modified_since:Optional[str], laatste_wijziging:str) -> bool:
+    if if_modified_since is None:
+        return False
+    try:
+        return parsedate_to_datetime(laatste_wijziging) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+def _lees_fouten(waarden:list[str]) -> dict[int, float]:
+    fouten = {}
+    for waarde in waarden:
+        status, kans = waarde.split('=')
+        fouten[int(status)] = float(kans)
+    return fouten
+
+def main(argumenten:Optional[list[str]]=None) -> None:
+    parser = argparse.ArgumentParser(description="Biedt de pagina's uit .filecachedir aan als lokale vervanger van de fandom website")
+    parser.add_argument('--cachedir', default=thuis_http_utils.cache_dir())
+    parser.add_argument('--poort', type=int, default=8080)
+    parser.add_argument('--latentie', type=float, default=0.0, help="wachttijd in seconden per antwoord")
+    parser.add_argument('--jitter', type=float, default=0.0, help="bijkomende willekeurige wachttijd in seconden")
+    parser.add_argument('--bandbreedte', type=int, default=0, help="bytes per seconde per antwoord (0 = onbeperkt)")
+    parser.add_argument('--fout', action='append', default=[], metavar='STATUS=KANS', help="bv. --fout 503=0.01 --fout 429=0.02")
+    parser.add_argument('--belastingstest', action='store_true', help="haal alle pagina's op met thuis_http_utils en toon de doorvoer")
+    parser.add_argument('--herhalingen', type=int, default=2)
+    parser.add_argument('--max-workers', type=int, default=thuis_http_utils.MAX_WORKERS)
+    args = parser.parse_args(argumenten)
+    logging.basicConfig(level=logging.INFO)
+    instellingen = ReplayInstellingen(args.latentie, args.jitter, args.bandbreedte, _lees_fouten(args.fout))
+    if args.belastingstest:
+        server = start_server(args.cachedir, instellingen, poort=0)
+        try:
+            for herhaling, resultaat in enumerate(belastingstest(server, args.herhalingen, args.max_workers), 1):
+                print(f"herhaling {herhaling}: {resultaat.aantal_requests} requests, {resultaat.aantal_fouten} fouten, "
+                      f"{resultaat.requests_per_s:.1f} requests/s, p50 {resultaat.p50_ms:.1f} ms, p95 {resultaat.p95_ms:.1f} ms, "
+                      f"p99 {resultaat.p99_ms:.1f} ms, {resultaat.metrics}")
+        finally:
+            server.shutdown()
+        return
+    server = ReplayServer(('127.0.0.1', args.poort), args.cachedir, lees_replay_paginas(args.cachedir), instellingen)
+    logger.info("replay server luistert op %s", server.basis_url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+import logging
+from typing import Iterable, Optional
+
+import numpy as np
+
+from thuis_typing import SeizoenMasker
+
+# Seizoenen als bits: bit s staat aan wanneer een personage in seizoen s speelt (bit 0 blijft leeg).
+# Voor één personage is dat een Python int (SeizoenMasker, zonder limiet op het aantal seizoenen), voor alle
+# personages samen een array (aantal personages, woorden) met uint64-woorden. Lidmaatschap is dan één
+# shift en and, overlap één and en een popcount.
+BITS_PER_WOORD = 64
+COPRESENTIE_BLOK = 256       # aantal rijen van de co-presence matrix dat tegelijk berekend wordt
+
+logger = logging.getLogger(__name__)
+
+_POPCOUNT_BYTE = np.array([bin(waarde).count('1') for waarde in range(256)], dtype=np.uint8)
+
+def naar_masker(seizoenen:Optional[Iterable[int]]) -> SeizoenMasker:
+    """Zet een lijst seizoenen om naar een bitmasker (None of een lege lijst => 0)"""
+    masker = 0
+    for seizoen in seizoenen or ():
+        masker |= 1 << int(seizoen)
+    return masker
+
+def naar_seizoenen(masker:SeizoenMasker) -> list[int]:
+    """Geeft de seizoenen van een bitmasker, oplopend"""
+    seizoenen = []
+    while masker:
+        laagste = masker & -masker
+        seizoenen.append(laagste.bit_length() - 1)
+        masker ^= laagste
+    return seizoenen
+
+def speelt_in(masker:SeizoenMasker, seizoen:int) -> bool:
+    return (masker >> seizoen) & 1 == 1
+
+def aantal_gemeenschappelijk(masker1:SeizoenMasker, masker2:SeizoenMasker) -> int:
+    """Geeft het aantal seizoenen waarin beide personages spelen"""
+    return bin(masker1 & masker2).count('1')
+
+def maak_seizoen_bits(seizoenen_per_personage:Iterable[Optional[Iterable[int]]], aantal_seizoenen:Optional[int]=None) -> np.ndarray:
+    """Maakt de bitarray (aantal personages, woorden) van de seizoenen van elk personage
+
+    Parameters
+    ----------
+    seizoenen_per_personage: Iterable
+         per personagenummer de lijst met seizoenen (None voor een nummer zonder personage)
+    aantal_seizoenen: int, optional
+         het hoogste seizoen. Standaard het hoogste seizoen in de lijsten
+    """
+    rijen, seizoenen = [], []
+    aantal_personages = 0
+    for nr, lijst in enumerate(seizoenen_per_personage):
+        aantal_personages = nr + 1
+        for seizoen in lijst or ():
+            rijen.append(nr)
+            seizoenen.append(int(seizoen))
+    return _zet_bits(np.array(rijen, dtype=np.int64), np.array(seizoenen, dtype=np.int64), aantal_personages, aantal_seizoenen)
+
+def seizoen_bits_uit_paren(persoon_nrs:np.ndarray, seizoenen:np.ndarray, aantal_personages:int,
+                           aantal_seizoenen:Optional[int]=None) -> np.ndarray:
+    """Maakt de bitarray uit paren (personagenummer, seizoen), bv. de tabel PERSONAGE_SEIZOEN"""
+    return _zet_bits(np.asarray(persoon_nrs, dtype=np.int64), np.asarray(seizoenen, dtype=np.int64), aantal_personages, aantal_seizoenen)
+
+def speelt_in_bits(bits:np.ndarray, seizoen:int) -> np.ndarray:
+    """Geeft voor elk personage of het in het seizoen speelt (bool-array)"""
+    woord, bit = divmod(seizoen, BITS_PER_WOORD)
+    if woord >= bits.shape[1]:
+        return np.zeros(len(bits), dtype=bool)
+    return (bits[:, woord] >> np.uint64(bit)) & np.uint64(1) == 1
+
+def aantal_seizoenen_bits(bits:np.ndarray) -> np.ndarray:
+    """Geeft het aantal seizoenen per personage"""
+    return _popcount(bits).sum(axis=1, dtype=np.int64)
+
+def copresentie_matrix(bits:np.ndarray) -> np.ndarray:
+    """Geeft voor elk paar personages het aantal seizoenen waarin ze allebei speelden
+
+    Per blok van COPRESENTIE_BLOK rijen: een and van de woorden van elke rij met alle rijen en een popcount,
+    zonder lus over de personages. De diagonaal is het aantal seizoenen van elk personage.
+
+    Returns
+    -------
+    np.ndarray
+         symmetrische matrix (aantal personages, aantal personages), uint8 bij minder dan 256 seizoenen
+    """
+    n, woorden = bits.shape
+    matrix = np.empty((n, n), dtype=np.uint8 if woorden * BITS_PER_WOORD <= 256 else np.uint16)
+    for begin in range(0, n, COPRESENTIE_BLOK):
+        blok = bits[begin:begin + COPRESENTIE_BLOK]
+        matrix[begin:begin + len(blok)] = _popcount(blok[:, None, :] & bits[None, :, :]).sum(axis=2, dtype=matrix.dtype)
+    return matrix
+
+def copresentie_paren(bits:np.ndarray, min_seizoenen:int=1) -> np.ndarray:
+    """Geeft de paren personages die minstens min_seizoenen seizoenen samen speelden, zonder de volledige matrix te bewaren
+
+    Returns
+    -------
+    np.ndarray
+         array (aantal paren, 3) met persoon_nr1 < persoon_nr2 en het aantal gedeelde seizoenen,
+         gesorteerd van veel naar weinig gedeelde seizoenen
+    """
+    resultaten = [np.empty((0, 3), dtype=np.int64)]
+    for begin in range(0, len(bits), COPRESENTIE_BLOK):
+        #enkel de kolommen vanaf begin: de paren met een lager personage zitten in een vorig blok
+        blok = bits[begin:begin + COPRESENTIE_BLOK]
+        aantallen = _popcount(blok[:, None, :] & bits[None, begin:, :]).sum(axis=2, dtype=np.int64)
+        rij, kolom = np.nonzero(aantallen >= min_seizoenen)
+        boven = rij < kolom
+        rij, kolom = rij[boven], kolom[boven]
+        resultaten.append(np.column_stack((rij + begin, kolom + begin, aantallen[rij, kolom])))
+    paren = np.concatenate(resultaten)
+    return paren[np.lexsort((paren[:, 1], paren[:, 0], -paren[:, 2]))]
+
+def meest_samen_gespeeld(bits:np.ndarray, k:int=10) -> np.ndarray:
+    """Geeft de k paren personages met de meeste gedeelde seizoenen (zoals copresentie_paren, maar per blok enkel de beste k)"""
+    beste = np.empty((0, 3), dtype=np.int64)
+    for begin in range(0, len(bits), COPRESENTIE_BLOK):
+        blok = bits[begin:begin + COPRESENTIE_BLOK]
+        aantallen = _popcount(blok[:, None, :] & bits[None, begin:, :]).sum(axis=2, dtype=np.int64)
+        aantallen[np.tril_indices(len(blok), m=aantallen.shape[1])] = 0
+        plat = aantallen.ravel()
+        #alles boven de k-de waarde, en bij gelijke waarden de eerste in (persoon_nr1, persoon_nr2)-volgorde
+        drempel = max(int(np.partition(plat, -k)[-k]) if len(plat) > k else 0, 1)
+        boven = np.flatnonzero(plat > drempel)
+        kandidaten = np.concatenate((boven, np.flatnonzero(plat == drempel)[:k - len(boven)]))
+        rij, kolom = np.divmod(kandidaten, aantallen.shape[1])
+        beste = np.concatenate((beste, np.column_stack((rij + begin, kolom + begin, plat[kandidaten]))))
+        beste = beste[np.lexsort((beste[:, 1], beste[:, 0], -beste[:, 2]))][:k]
+    return beste
+
+def _zet_bits(persoon_nrs:np.ndarray, seizoenen:np.ndarray, aantal_personages:int, aantal_seizoenen:Optional[int]) -> np.ndarray:
+    if aantal_seizoenen is None:
+        aantal_seizoenen = int(seizoenen.max()) if len(seizoenen) > 0 else 0
+    bits = np.zeros((aantal_personages, aantal_seizoenen // BITS_PER_WOORD + 1), dtype=np.uint64)
+    np.bitwise_or.at(bits, (persoon_nrs, seizoenen // BITS_PER_WOORD), np.left_shift(np.uint64(1), (seizoenen % BITS_PER_WOORD).astype(np.uint64)))
+    return bits
+
+def _popcount(woorden:np.ndarray) -> np.ndarray:
+    #aantal bits per uint64-woord (np.bitwise_count vanaf numpy 2.0, anders een tabel per byte)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(woorden)
+    per_byte = _POPCOUNT_BYTE[np.ascontiguousarray(woorden).view(np.uint8)]
+    return per_byte.reshape(*woorden.shape, 8).sum(axis=-1, dtype=np.uint8)
@@ -0,0 +1,119 @@
+import json
+import logging
+import os
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from thuis_db_utils import lees_personages
+from thuis_graaf_utils import lees_relatie_arr, KOLOM_SEIZOEN, KOLOM_PERSOON_NR1, KOLOM_PERSOON_NR2, _kleinste_dtype
+from thuis_seizoen_utils import maak_seizoen_bits
+
+# Eén .npy-bestand per kolom: np.load(mmap_mode='r') leest de bestanden niet in, het besturingssysteem
+# laadt enkel de pagina's die gebruikt worden en deelt ze tussen processen
+SNAPSHOT_DIR = 'snapshot'
+SNAPSHOT_VERSIE = 2
+META_JSON = 'meta.json'
+KOLOMMEN = ('seizoen', 'persoon_nr1', 'persoon_nr2', 'voornaam', 'achternaam', 'seizoen_bits')
+
+logger = logging.getLogger(__name__)
+
+class Snapshot(NamedTuple):
+    """De relaties (seizoen, persoon_nr1, persoon_nr2) en de namen en seizoenen per personagenummer (ID in de databank - 1)
+
+    seizoen_bits zijn de seizoenen van elk personage als bitarray (zie thuis_seizoen_utils)
+    """
+    seizoen: np.ndarray
+    persoon_nr1: np.ndarray
+    persoon_nr2: np.ndarray
+    voornaam: np.ndarray
+    achternaam: np.ndarray
+    seizoen_bits: np.ndarray
+
+    @property
+    def relatie_arr(self) -> np.ndarray:
+        """De relaties als één array (aantal relaties, 3) zoals thuis_graaf_utils.lees_relatie_arr (maakt een kopie)"""
+        kolommen = (self.seizoen, self.persoon_nr1, self.persoon_nr2)
+        relatie_arr = np.empty((len(self.seizoen), 3), dtype=np.result_type(*kolommen))
+        relatie_arr[:, KOLOM_SEIZOEN] = self.seizoen
+        relatie_arr[:, KOLOM_PERSOON_NR1] = self.persoon_nr1
+        relatie_arr[:, KOLOM_PERSOON_NR2] = self.persoon_nr2
+        return relatie_arr
+
+    def naam(self, persoon_nr:int) -> str:
+        return f"{self.voornaam[persoon_nr]} {self.achternaam[persoon_nr]}".strip()
+
+    def namen(self) -> list[str]:
+        """De volledige naam per personagenummer (een lege tekst voor een nummer zonder personage)"""
+        return [f"{voornaam} {achternaam}".strip() for voornaam, achternaam in zip(self.voornaam.tolist(), self.achternaam.tolist())]
+
+def maak_snapshot(relatie_arr:Optional[np.ndarray]=None, personages:Optional[list[dict]]=None, pad:str=SNAPSHOT_DIR) -> None:
+    """Bewaart de relaties en de namen en seizoenen van de personages in .npy-bestanden (één per kolom)
+
+    Elke kolom krijgt het kleinste integer type waarin alle waarden passen; de namen worden bewaard als
+    unicode-tekst met vaste lengte, zodat ook die kolommen gemapt kunnen worden.
+
+    Parameters
+    ----------
+    relatie_arr: np.ndarray, optional
+         de relaties (seizoen, persoon_nr1, persoon_nr2). Wordt gelezen uit relaties_nrs.csv wanneer ze niet meegegeven wordt
+    personages: list[dict], optional
+         de personages met hun ID. Worden gelezen uit de databank wanneer ze niet meegegeven worden
+    pad: str, optional
+         de map waarin de bestanden bewaard worden
+    """
+    if relatie_arr is None:
+        relatie_arr = lees_relatie_arr()
+    if personages is None:
+        personages = lees_personages()
+    aantal_personages = max([personage['id'] for personage in personages], default=0)
+    voornamen = [''] * aantal_personages
+    achternamen = [''] * aantal_personages
+    seizoenen:list = [None] * aantal_personages
+    for personage in personages:
+        voornamen[personage['id'] - 1] = personage['voornaam'] or ''
+        achternamen[personage['id'] - 1] = personage['achternaam'] or ''
+        seizoenen[personage['id'] - 1] = personage['seizoenen']
+    kolommen = {
+        'seizoen': relatie_arr[:, KOLOM_SEIZOEN],
+        'persoon_nr1': relatie_arr[:, KOLOM_PERSOON_NR1],
+        'persoon_nr2': relatie_arr[:, KOLOM_PERSOON_NR2],
+        'voornaam': np.array(voornamen, dtype=str),
+        'achternaam': np.array(achternamen, dtype=str),
+        'seizoen_bits': maak_seizoen_bits(seizoenen)
+    }
+    os.makedirs(pad, exist_ok=True)
+    for kolom, waarden in kolommen.items():
+        if waarden.dtype.kind in 'iu' and waarden.ndim == 1:
+            waarden = waarden.astype(_kleinste_dtype(waarden), copy=False)
+        bestand = os.path.join(pad, kolom + '.npy')
+        with open(bestand + '.tmp', mode='wb') as f:
+            np.save(f, np.ascontiguousarray(waarden))
+        os.replace(bestand + '.tmp', bestand)
+    meta = {'versie': SNAPSHOT_VERSIE, 'aantal_relaties': len(relatie_arr), 'aantal_personages': aantal_personages}
+    with open(os.path.join(pad, META_JSON), mode='w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    logger.info("snapshot met %d relaties en %d personages bewaard in %s", len(relatie_arr), aantal_personages, pad)
+
+def laad_snapshot(pad:str=SNAPSHOT_DIR, mmap_mode:Optional[str]='r') -> Snapshot:
+    """Laadt een snapshot van maak_snapshot zonder de bestanden in te lezen
+
+    Parameters
+    ----------
+    pad: str, optional
+         de map met de bestanden
+    mmap_mode: str, optional
+         'r' => alleen-lezen memory map (gedeeld tussen processen), None => alles inlezen
+
+    Raises
+    ------
+    FileNotFoundError
+         wanneer de snapshot niet bestaat
+    ValueError
+         wanneer de snapshot met een andere versie gemaakt is
+    """
+    with open(os.path.join(pad, META_JSON), mode='r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('versie') != SNAPSHOT_VERSIE:
+        raise ValueError(f"snapshot in {pad} heeft versie {meta.get('versie')}, verwacht {SNAPSHOT_VERSIE}")
+    return Snapshot(*(np.load(os.path.join(pad, kolom + '.npy'), mmap_mode=mmap_mode) for kolom in KOLOMMEN))
@@ -16,7 +16,43 @@ class RelatiePersoonData(TypedDict):
     persoon_1: str
     persoon_2: str
 
+SeizoenMasker = int     # bit s staat aan wanneer het personage in seizoen s speelt (zie thuis_seizoen_utils)
+
 class PersonageData(TypedDict):
     voornaam: str
     achternaam: str
-    seizoenen: list[int]
\ No newline at end of file
+    seizoenen: list[int]
+
+class PersonageRecord(PersonageData):
+    id: int
+    seizoen_masker: SeizoenMasker
+
+class OpslagRapport(TypedDict):
+    aantal_bestanden: int
+    aantal_objecten: int
+    bytes_ruw: int
+    bytes_objecten: int
+    besparing: float
+    mb_per_s_ruw: float
+    mb_per_s_objecten: float
+
+class RelatieNrsData(TypedDict):
+    seizoen: int
+    persoon_nr1: int
+    persoon_nr2: int
+
+class OnopgelostPersonage(TypedDict):
+    voornaam: str
+    seizoen: int
+    kandidaten: list[int]
+
+
+class VerversRapport(TypedDict):
+    volledig: bool
+    gewijzigde_paginas: list[str]
+    personages_aangepast: list[int]
+    personages_toegevoegd: list[int]
+    personages_verwijderd: list[int]
+    seizoenen: list[int]
+    csv_bestanden: list[str]
+    duur: float
@@ -0,0 +1,80 @@
+import logging
+import unicodedata
+from functools import lru_cache
+from itertools import chain
+from typing import Callable, Iterable
+
+from thuis_typing import RelatiePersoonData, PersonageData
+
+# De gegevens op de fandom website zijn niet volledig of consequent. Deze uitzonderingen worden
+# door alle parsers (thuis_html_utils en thuis_html_lxml_utils) op dezelfde manier toegepast.
+
+# Andere schrijfwijzen van een voornaam (alias, naam). De aliassen worden opgezocht zonder accenten en
+# hoofdletters, dus 'Angele' dekt ook 'angele' en 'Angéle'. Geldt voor de personages én de relaties.
+ALIASSEN = (
+    ('Angele', 'Angèle'),
+    ('Aisha', 'Aïsha'),
+    ('Britney', 'Britt'),
+    ('Franky', 'Kaat'),     #Geen dead naming
+    ('Kazàn', 'Kasper'),
+    ('Rogerke', 'Roger'),
+)
+
+# Correcties op de seizoenen van een personage (voornaam, achternaam)
+SEIZOEN_CORRECTIES: dict[tuple[str, str], Callable[[list[int]], list[int]]] = {
+    ('Nand', 'Reimers'): lambda seizoenen: [10, 11, 12, 13],
+    ('Stijn', 'De Belder'): lambda seizoenen: [16, 17],
+    ('Tim', 'Cremers'): lambda seizoenen: [13] + seizoenen,     #relatie met Katrien begint in seizoen 13
+    ('Claire', 'Bastiaens'): lambda seizoenen: seizoenen + [15],
+}
+
+logger = logging.getLogger(__name__)
+
+def _normaliseer(naam:str) -> str:
+    #zonder accenten (NFKD splitst 'è' in 'e' en een combinerend teken) en zonder hoofdletters
+    return ''.join(teken for teken in unicodedata.normalize('NFKD', naam) if not unicodedata.combining(teken)).casefold().strip()
+
+_ALIAS_INDEX = {_normaliseer(alias): naam for alias, naam in ALIASSEN}
+
+@lru_cache(maxsize=None)
+def canonieke_naam(naam:str) -> str:
+    """Geeft de naam van het personage voor een alias (zie ALIASSEN), anders de naam zelf"""
+    return _ALIAS_INDEX.get(_normaliseer(naam), naam)
+
+@lru_cache(maxsize=None)
+def naam_sleutel(naam:str) -> str:
+    """Geeft de sleutel waarmee een voornaam opgezocht wordt: de canonieke naam zonder accenten en hoofdletters"""
+    return _normaliseer(canonieke_naam(naam))
+
+def canonieke_namen(namen:Iterable[str]) -> dict[str, str]:
+    """Geeft de canonieke naam van elke verschillende naam"""
+    return {naam: canonieke_naam(naam) for naam in set(namen)}
+
+def naam_sleutels(namen:Iterable[str]) -> dict[str, str]:
+    """Geeft de sleutel (zie naam_sleutel) van elke verschillende naam"""
+    return {naam: naam_sleutel(naam) for naam in set(namen)}
+
+def pas_aliassen_toe(relaties:list[RelatiePersoonData]) -> list[RelatiePersoonData]:
+    """Vervangt de aliassen in een lijst relaties door de naam van het personage
+
+    Elke verschillende naam wordt één keer opgezocht, daarna is het per relatie een opzoeking in een dict.
+    """
+    namen = canonieke_namen(chain.from_iterable((relatie['persoon_1'], relatie['persoon_2']) for relatie in relaties))
+    return [{'seizoen': relatie['seizoen'], 'persoon_1': namen[relatie['persoon_1']], 'persoon_2': namen[relatie['persoon_2']]}
+            for relatie in relaties]
+
+def _verwerk_personage_details_uitzonderingen(naam:str, seizoenen:list[int]) -> PersonageData:
+    naam_details = naam.split(' ', maxsplit=1)
+    voornaam = naam_details[0]
+    achternaam = naam_details[1] if len(naam_details) == 2 else 'Onbekend'   #Er zijn personages zonder achternaam
+    correctie = SEIZOEN_CORRECTIES.get((voornaam, achternaam))
+    if correctie is not None:
+        seizoenen = correctie(seizoenen)
+    return {'voornaam':canonieke_naam(voornaam), 'achternaam':achternaam, 'seizoenen':seizoenen}
+
+def _verwerk_nevenpersonage_urls_uitzonderingen(urls:list[str], url:str) -> list[str]:
+    if url == '/nl/wiki/Pips':
+        logger.debug("Uitzondering voor url Pips")
+        return urls  #Pips heeft geen detailspagina
+    urls.append(url)
+    return urls
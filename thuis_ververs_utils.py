@@ -0,0 +1,276 @@
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Optional
+
+from thuis_db_utils import (RELATIES_NRS_CSV, init_db, bewaar_personage_lijst, werk_personages_bij, zoek_relatie_nrs,
+                            bewaar_relaties, vervang_relaties_seizoenen, lees_vingerafdruk)
+from thuis_html_utils import (BASIS_URL, RELATIE_URL, HOOFDPERSONAGES_URL, NEVENERSONAGES_URL, PARSER_BS4, PARSER_VERSIE,
+                              HOOFDPERSONAGE_CSV, NEVENPERSONAGE_CSV, GASTPERSONAGE_CSV, RELATIES_NAMEN_CSV,
+                              PERSONAGE_HEADERS, RELATIE_HEADERS, _get_parser, _lees_gastpersonages,
+                              _lees_personage_details_lijst, _schrijf_csv)
+from thuis_http_utils import get_fileinfos, MAX_WORKERS
+from thuis_memo_utils import memoiseer
+from thuis_metrics_utils import is_actief, rapporteer, bewaar_metrics
+from thuis_snapshot_utils import maak_snapshot
+from thuis_typing import CacheInfoType, PersonageData, RelatieNrsData, RelatiePersoonData, VerversRapport
+from thuis_uitzonderingen_utils import naam_sleutel
+
+# Bewaart van welke versie van elke pagina (bestandsnaam, laatste_wijziging) de CSV-rijen, de databankrijen
+# en de relaties per seizoen afgeleid zijn, en de vingerafdruk van de databank na het verversen
+TOESTAND_JSON = 'ververs_toestand.json'
+TOESTAND_VERSIE = 2
+
+BRON_HOOFD = 'hoofd'
+BRON_NEVEN = 'neven'
+BRON_GAST = 'gast'
+
+RELATIE_NRS_HEADERS = list(RelatieNrsData.__annotations__.keys())
+
+logger = logging.getLogger(__name__)
+
+def ververs(download=True, max_workers=MAX_WORKERS, parser=PARSER_BS4, volledig=False) -> VerversRapport:
+    """Werkt de CSV-bestanden, de databank en relaties_nrs.csv bij voor de pagina's die gewijzigd zijn
+
+    Voor elke pagina wordt bijgehouden van welke versie in de cache (laatste_wijziging) de afgeleide gegevens
+    komen. Enkel de personages van gewijzigde detailpagina's worden opnieuw geparset en in de databank aangepast
+    (op basis van hun ID, de andere ID's blijven dus behouden). De relaties worden enkel opnieuw gekoppeld aan
+    personagenummers voor de seizoenen die geraakt worden door een gewijzigd personage of een gewijzigde relatie.
+    Wanneer er iets gewijzigd is, wordt ook de snapshot (thuis_snapshot_utils) opnieuw gemaakt.
+    Wanneer de databank sinds de vorige oproep op een andere manier gewijzigd is (bv. door laad_personages_csv
+    of de stap databank van thuis_pipeline), kloppen de bewaarde ID's niet meer en wordt alles opnieuw opgebouwd.
+
+    Parameters
+    ----------
+    download: bool, optional
+              Moet er contact worden opgenomen met de website om te controleren of de bestanden gewijzigd zijn
+    max_workers: int, optional
+              Het aantal pagina's dat gelijktijdig wordt opgehaald
+    parser: str, optional
+              PARSER_BS4 of PARSER_LXML
+    volledig: bool, optional
+              True => alles opnieuw opbouwen (gebeurt ook wanneer er nog geen toestand bewaard is of wanneer
+              de databank niet meer overeenkomt met de toestand)
+
+    Returns
+    -------
+    VerversRapport
+         wat er opnieuw berekend is. De seizoenen in het rapport zijn de seizoenen waarvan de relaties
+         (en dus de adjacency-matrices, zie thuis_graaf_utils.werk_csr_per_seizoen_bij) gewijzigd kunnen zijn
+    """
+    start = time.perf_counter()
+    toestand = None if volledig else _lees_toestand()
+    if toestand is not None and toestand.get('databank') != lees_vingerafdruk():
+        logger.info("databank komt niet overeen met %s, alles wordt opnieuw opgebouwd", TOESTAND_JSON)
+        toestand = None
+    if toestand is None:
+        rapport = _bouw_volledig(download, max_workers, parser)
+    else:
+        rapport = _bouw_incrementeel(toestand, download, max_workers, parser)
+    if len(rapport['csv_bestanden']) > 0:
+        maak_snapshot()
+    rapport['duur'] = time.perf_counter() - start
+    logger.info("ververst in %.2fs: %d pagina's gewijzigd, %d personages aangepast, %d toegevoegd, %d verwijderd, seizoenen %s",
+                rapport['duur'], len(rapport['gewijzigde_paginas']), len(rapport['personages_aangepast']),
+                len(rapport['personages_toegevoegd']), len(rapport['personages_verwijderd']), rapport['seizoenen'])
+    if is_actief():
+        rapporteer(resultaat=bewaar_metrics())
+    return rapport
+
+def _bouw_volledig(download:bool, max_workers:int, parser:str) -> VerversRapport:
+    module = _get_parser(parser)
+    lijst_infos = dict(zip((HOOFDPERSONAGES_URL, NEVENERSONAGES_URL, RELATIE_URL),
+                           get_fileinfos([HOOFDPERSONAGES_URL, NEVENERSONAGES_URL, RELATIE_URL], download, max_workers)))
+    personages = []
+    paginas = {url: _versie(info) for url, info in lijst_infos.items()}
+    for bron, lijst_url, functie in ((BRON_HOOFD, HOOFDPERSONAGES_URL, module._lees_hoofdpersonage_urls),
+                                     (BRON_NEVEN, NEVENERSONAGES_URL, module._lees_nevenpersonage_urls)):
+        urls = [BASIS_URL + url for url in memoiseer(lijst_infos[lijst_url], functie, PARSER_VERSIE)]
+        fileinfos = get_fileinfos(urls, download, max_workers)
+        for url, fileinfo, data in zip(urls, fileinfos, _lees_personage_details_lijst(fileinfos, parser, 1)):
+            paginas[url] = _versie(fileinfo)
+            personages.append(_maak_record(bron, url, data))
+    personages.extend(_maak_record(BRON_GAST, None, data) for data in _lees_gastpersonages())
+    relaties = memoiseer(lijst_infos[RELATIE_URL], module._lees_relaties, PARSER_VERSIE)
+
+    init_db()
+    bewaar_personage_lijst(personages)
+    _controleer_ids(personages)
+    relatie_nrs, _ = zoek_relatie_nrs(relaties, _maak_index(personages))
+    bewaar_relaties(relatie_nrs)
+    csv_bestanden = _schrijf_personage_csv(personages, {BRON_HOOFD, BRON_NEVEN, BRON_GAST})
+    _schrijf_csv(RELATIES_NAMEN_CSV, RELATIE_HEADERS, relaties)
+    _schrijf_csv(RELATIES_NRS_CSV, RELATIE_NRS_HEADERS, relatie_nrs)
+    _bewaar_toestand({'versie': TOESTAND_VERSIE, 'parser_versie': PARSER_VERSIE, 'paginas': paginas,
+                      'personages': personages, 'relaties': relaties, 'relatie_nrs': relatie_nrs,
+                      'databank': lees_vingerafdruk()})
+    return {
+        'volledig': True,
+        'gewijzigde_paginas': list(paginas),
+        'personages_aangepast': [],
+        'personages_toegevoegd': [personage['id'] for personage in personages],
+        'personages_verwijderd': [],
+        'seizoenen': sorted({relatie['seizoen'] for relatie in relatie_nrs}),
+        'csv_bestanden': csv_bestanden + [RELATIES_NAMEN_CSV, RELATIES_NRS_CSV],
+        'duur': 0.0
+    }
+
+def _bouw_incrementeel(toestand:dict, download:bool, max_workers:int, parser:str) -> VerversRapport:
+    module = _get_parser(parser)
+    paginas:dict[str, str] = toestand['paginas']
+    lijst_infos = dict(zip((HOOFDPERSONAGES_URL, NEVENERSONAGES_URL, RELATIE_URL),
+                           get_fileinfos([HOOFDPERSONAGES_URL, NEVENERSONAGES_URL, RELATIE_URL], download, max_workers)))
+    gewijzigde_paginas = [url for url, info in lijst_infos.items() if paginas.get(url) != _versie(info)]
+    #de lijstpagina's zelf zijn gememoiseerd: een ongewijzigde lijst wordt niet opnieuw geparset
+    detail_urls = {}
+    for bron, lijst_url, functie in ((BRON_HOOFD, HOOFDPERSONAGES_URL, module._lees_hoofdpersonage_urls),
+                                     (BRON_NEVEN, NEVENERSONAGES_URL, module._lees_nevenpersonage_urls)):
+        detail_urls[bron] = [BASIS_URL + url for url in memoiseer(lijst_infos[lijst_url], functie, PARSER_VERSIE)]
+    alle_urls = list(dict.fromkeys(detail_urls[BRON_HOOFD] + detail_urls[BRON_NEVEN]))
+    fileinfos:dict[str, CacheInfoType] = dict(zip(alle_urls, get_fileinfos(alle_urls, download, max_workers)))
+    gewijzigde_urls = [url for url in alle_urls if paginas.get(url) != _versie(fileinfos[url])]
+    gewijzigde_paginas.extend(gewijzigde_urls)
+    personages:list[dict] = toestand['personages']
+    #ook een ongewijzigde pagina die nieuw is in een lijst moet gelezen worden (uit de memo)
+    bekend = {(personage['bron'], personage['url']) for personage in personages}
+    nieuw_in_lijst = {url for bron, urls in detail_urls.items() for url in urls if (bron, url) not in bekend}
+    te_lezen = [url for url in alle_urls if url in nieuw_in_lijst or paginas.get(url) != _versie(fileinfos[url])]
+    nieuwe_data = dict(zip(te_lezen, _lees_personage_details_lijst([fileinfos[url] for url in te_lezen], parser, 1)))
+
+    per_sleutel = {(personage['bron'], personage['url']): personage for personage in personages if personage['bron'] != BRON_GAST}
+    aangepast, toegevoegd, bijgewerkte_lijst = [], [], []
+    geraakte_seizoenen:set[int] = set()
+    gewijzigde_bronnen = set()
+    for bron in (BRON_HOOFD, BRON_NEVEN):
+        for url in detail_urls[bron]:
+            personage = per_sleutel.pop((bron, url), None)
+            if personage is None:
+                personage = _maak_record(bron, url, nieuwe_data[url])
+                toegevoegd.append(personage)
+                geraakte_seizoenen.update(personage['seizoenen'])
+            elif url in nieuwe_data and _gegevens(personage) != _gegevens(nieuwe_data[url]):
+                geraakte_seizoenen.update(personage['seizoenen'])
+                personage.update(_gegevens(nieuwe_data[url]))
+                geraakte_seizoenen.update(personage['seizoenen'])
+                aangepast.append(personage)
+            bijgewerkte_lijst.append(personage)
+    verwijderd = list(per_sleutel.values())
+    for personage in verwijderd:
+        geraakte_seizoenen.update(personage['seizoenen'])
+    for personage in aangepast + toegevoegd + verwijderd:
+        gewijzigde_bronnen.add(personage['bron'])
+    for bron in (BRON_HOOFD, BRON_NEVEN):
+        #een andere volgorde in de lijstpagina verandert ook het CSV-bestand
+        if [p['url'] for p in personages if p['bron'] == bron] != [p['url'] for p in bijgewerkte_lijst if p['bron'] == bron]:
+            gewijzigde_bronnen.add(bron)
+    bijgewerkte_lijst.extend(personage for personage in personages if personage['bron'] == BRON_GAST)
+
+    relaties:list[RelatiePersoonData] = toestand['relaties']
+    csv_bestanden = []
+    if RELATIE_URL in gewijzigde_paginas:
+        nieuwe_relaties = memoiseer(lijst_infos[RELATIE_URL], module._lees_relaties, PARSER_VERSIE)
+        geraakte_seizoenen.update(_gewijzigde_seizoenen(relaties, nieuwe_relaties))
+        if nieuwe_relaties != relaties:
+            relaties = nieuwe_relaties
+            _schrijf_csv(RELATIES_NAMEN_CSV, RELATIE_HEADERS, relaties)
+            csv_bestanden.append(RELATIES_NAMEN_CSV)
+
+    if len(toegevoegd) > 0:
+        bewaar_personage_lijst(toegevoegd)
+        _controleer_ids(toegevoegd)
+    if len(aangepast) > 0 or len(verwijderd) > 0:
+        werk_personages_bij(aangepast, [personage['id'] for personage in verwijderd])
+    csv_bestanden = _schrijf_personage_csv(bijgewerkte_lijst, gewijzigde_bronnen) + csv_bestanden
+
+    relatie_nrs:list[RelatieNrsData] = toestand['relatie_nrs']
+    seizoenen = sorted(geraakte_seizoenen)
+    if len(seizoenen) > 0:
+        #enkel de relaties van de geraakte seizoenen opnieuw koppelen aan personagenummers
+        te_koppelen = [relatie for relatie in relaties if int(relatie['seizoen']) in geraakte_seizoenen]
+        nieuwe_nrs, _ = zoek_relatie_nrs(te_koppelen, _maak_index(bijgewerkte_lijst))
+        oude_nrs = [relatie for relatie in relatie_nrs if relatie['seizoen'] in geraakte_seizoenen]
+        if nieuwe_nrs != oude_nrs:
+            relatie_nrs = sorted([relatie for relatie in relatie_nrs if relatie['seizoen'] not in geraakte_seizoenen] + nieuwe_nrs,
+                                 key=lambda relatie: relatie['seizoen'])
+            vervang_relaties_seizoenen(seizoenen, nieuwe_nrs)
+            _schrijf_csv(RELATIES_NRS_CSV, RELATIE_NRS_HEADERS, relatie_nrs)
+            csv_bestanden.append(RELATIES_NRS_CSV)
+        else:
+            seizoenen = []
+
+    for url in gewijzigde_paginas:
+        info = lijst_infos.get(url) or fileinfos[url]
+        paginas[url] = _versie(info)
+    for personage in verwijderd:
+        paginas.pop(personage['url'], None)
+    _bewaar_toestand(toestand | {'paginas': paginas, 'personages': bijgewerkte_lijst, 'relaties': relaties,
+                                 'relatie_nrs': relatie_nrs, 'databank': lees_vingerafdruk()})
+    return {
+        'volledig': False,
+        'gewijzigde_paginas': gewijzigde_paginas,
+        'personages_aangepast': [personage['id'] for personage in aangepast],
+        'personages_toegevoegd': [personage['id'] for personage in toegevoegd],
+        'personages_verwijderd': [personage['id'] for personage in verwijderd],
+        'seizoenen': seizoenen,
+        'csv_bestanden': csv_bestanden,
+        'duur': 0.0
+    }
+
+def _gewijzigde_seizoenen(oud:list[RelatiePersoonData], nieuw:list[RelatiePersoonData]) -> set[int]:
+    """Geeft de seizoenen waarvan de relaties verschillen"""
+    per_seizoen = defaultdict(lambda: ([], []))
+    for relatie in oud:
+        per_seizoen[int(relatie['seizoen'])][0].append(relatie)
+    for relatie in nieuw:
+        per_seizoen[int(relatie['seizoen'])][1].append(relatie)
+    return {seizoen for seizoen, (voor, na) in per_seizoen.items() if voor != na}
+
+def _schrijf_personage_csv(personages:list[dict], bronnen:set[str]) -> list[str]:
+    """Schrijft enkel de CSV-bestanden van de bronnen (hoofd, neven, gast) met een gewijzigd personage"""
+    csv_bestanden = []
+    for bron, bestandsnaam in ((BRON_HOOFD, HOOFDPERSONAGE_CSV), (BRON_NEVEN, NEVENPERSONAGE_CSV), (BRON_GAST, GASTPERSONAGE_CSV)):
+        if bron in bronnen:
+            _schrijf_csv(bestandsnaam, PERSONAGE_HEADERS, [_gegevens(personage) for personage in personages if personage['bron'] == bron])
+            csv_bestanden.append(bestandsnaam)
+    return csv_bestanden
+
+def _controleer_ids(personages:list[dict]) -> None:
+    #bewaar_personage_lijst meldt een fout in de databank enkel in de log: zonder ID kan er niets gekoppeld worden
+    zonder_id = [f"{personage['voornaam']} {personage['achternaam']}" for personage in personages if 'id' not in personage]
+    if len(zonder_id) > 0:
+        raise ValueError(f"{len(zonder_id)} personages niet bewaard in de databank (geen ID): {zonder_id[:5]}")
+
+def _maak_index(personages:list[dict]) -> dict[tuple[str, int], list[int]]:
+    """Zelfde index als thuis_db_utils.lees_personage_index, maar zonder de databank te lezen"""
+    index = defaultdict(list)
+    for personage in sorted(personages, key=lambda personage: personage['id']):
+        for seizoen in personage['seizoenen']:
+            index[(naam_sleutel(personage['voornaam']), seizoen)].append(personage['id'] - 1)
+    return dict(index)
+
+def _maak_record(bron:str, url:Optional[str], data:PersonageData) -> dict:
+    return {'bron': bron, 'url': url} | _gegevens(data)
+
+def _gegevens(personage) -> PersonageData:
+    return {'voornaam': personage['voornaam'], 'achternaam': personage['achternaam'], 'seizoenen': list(personage['seizoenen'])}
+
+def _versie(fileinfo:CacheInfoType) -> str:
+    return f"{fileinfo['bestandsnaam']}|{fileinfo['laatste_wijziging']}"
+
+def _lees_toestand() -> Optional[dict]:
+    if not os.path.exists(TOESTAND_JSON):
+        return None
+    with open(TOESTAND_JSON, mode='r', encoding='utf-8') as f:
+        toestand = json.load(f)
+    if toestand.get('versie') != TOESTAND_VERSIE or toestand.get('parser_versie') != PARSER_VERSIE:
+        logger.info("toestand %s is verouderd, alles wordt opnieuw opgebouwd", TOESTAND_JSON)
+        return None
+    return toestand
+
+def _bewaar_toestand(toestand:dict) -> None:
+    tijdelijk = TOESTAND_JSON + '.tmp'
+    with open(tijdelijk, mode='w', encoding='utf-8') as f:
+        json.dump(toestand, f, ensure_ascii=False)
+    os.replace(tijdelijk, TOESTAND_JSON)